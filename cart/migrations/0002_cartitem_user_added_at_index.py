@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-18 22:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0001_initial'),
+        ('dashboard', '0014_product_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(fields=['user', 'added_at'], name='cart_cartit_user_id_134365_idx'),
+        ),
+    ]
@@ -14,6 +14,9 @@ class CartItem(models.Model):
 
     class Meta:
         unique_together = ('user', 'product')
+        indexes = [
+            models.Index(fields=['user', 'added_at']),
+        ]
 
     def get_total(self):
         """Return total price for this cart item."""
@@ -1,17 +1,77 @@
+from decimal import Decimal
+from django.core.cache import cache
 from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
 from cart.models import CartItem
 from dashboard.models import Product
+from dashboard.services.image_services import variant_url
 from django.contrib.auth.models import User
-from shop.recommendations import record_product_interest
+from shop.recommendations import _invalidate_user_recs_cache, record_product_interest
+
+
+def _cart_summary_key(user_id):
+    return f"cart:summary:u:{user_id}"
+
+
+def invalidate_cart_summary(user_id):
+    cache.delete(_cart_summary_key(user_id))
+
+
+def get_session_cart(request):
+    """
+    Returns the anonymous cart as {product_id: quantity}.
+    The session stores only {"<product_id>": quantity}; names, prices and
+    images are read from the catalog when the cart is displayed. Carts saved
+    in the old format (a dict per line) are converted on read.
+    """
+    raw = request.session.get('cart') or {}
+    cart = {}
+    if not isinstance(raw, dict):
+        return cart
+    for product_id, value in raw.items():
+        if isinstance(value, dict):
+            value = value.get('quantity')
+        try:
+            product_id, quantity = int(product_id), int(value)
+        except (TypeError, ValueError):
+            continue
+        if quantity > 0:
+            cart[product_id] = quantity
+    return cart
+
+
+def _save_session_cart(request, cart):
+    request.session['cart'] = {str(product_id): quantity for product_id, quantity in cart.items()}
+    request.session.modified = True
+
+
+def _increment_cart_item(user, product_id):
+    """
+    Atomically bumps the cart line by one, only while it stays within stock.
+    The stock check runs in the UPDATE itself (no read-modify-write).
+    Returns the number of rows updated (0 or 1).
+    """
+    stock = Product.objects.filter(pk=OuterRef('product_id')).values('quantity')[:1]
+    return CartItem.objects.filter(
+        user=user,
+        product_id=product_id,
+        quantity__lt=Subquery(stock),
+    ).update(quantity=F('quantity') + 1)
 
 
 def add_product_to_cart_service(request, product_id):
     if request.user.is_authenticated:
         try:
-            with transaction.atomic():
-                product= Product.objects.get(id=product_id)
-                cart_item,created = CartItem.objects.get_or_create(
-                    user=request.user, 
+            product = Product.objects.only('id', 'name', 'price', 'quantity').get(id=product_id)
+        except Product.DoesNotExist:
+            return False, 'Product Does Not Exist'
+        with transaction.atomic():
+            updated = _increment_cart_item(request.user, product.id)
+            if not updated:
+                if product.quantity < 1:
+                    return False, 'Product Out Of Stock'
+                _cart_item, created = CartItem.objects.get_or_create(
+                    user=request.user,
                     product=product,
                     defaults={
                         'product_name': product.name,
@@ -19,64 +79,31 @@ def add_product_to_cart_service(request, product_id):
                         'quantity': 1,
                     }
                 )
-                if not created:
-                    if cart_item.quantity <= product.quantity:
-                        cart_item.quantity += 1
-                        cart_item.save()
-                        record_product_interest(request.user, product, weight=1)
-                        return True, 'Product Added To Cart'
-                    else:
-                        return False, 'Product Quantity Exceeded'
-        except Product.DoesNotExist:
-            return False, 'Product Does Not Exist'
+                # Lost a race with a concurrent first add: retry the increment.
+                if not created and not _increment_cart_item(request.user, product.id):
+                    return False, 'Product Quantity Exceeded'
+        invalidate_cart_summary(request.user.id)
         record_product_interest(request.user, product, weight=1)
         return True, 'Product Added To Cart'
     else:
-        # Get existing cart from session or initialize empty dict if not found
-        cart= request.session.get('cart',{})
-        product_id_str = str(product_id) # Ensure key is a string for consistent session storage
-        if product_id_str in cart:
-            get_product = cart.get(product_id_str)
-            # Sometimes users may tamper with session (via browser tools), 
-            # so you should ensure cart item is well-formed before using .
-            # get() on it.
-            if not isinstance(get_product,dict):
-                return False, 'Cart Data Is Corrupted'
-            # Safely update quantity and total price
-            quantity = int(get_product.get('quantity'))+1
-            price = float(get_product.get('price'))
-            total= float(price*quantity)
-            cart[product_id_str]['quantity'] = quantity
-            cart[product_id_str]['total'] = total
-            # Save updated cart back to session
-            request.session['cart'] = cart
-            request.session.modified = True # Mark session as changed for saving
+        cart = get_session_cart(request)
+        product_id = int(product_id)
+        stock = Product.objects.filter(id=product_id).values_list('quantity', flat=True).first()
+        if stock is None:
+            return False, 'Product Does Not Exist'
+        quantity = cart.get(product_id, 0) + 1
+        if quantity > stock:
+            return False, 'Product Out Of Stock' if stock < 1 else 'Product Quantity Exceeded'
+        cart[product_id] = quantity
+        _save_session_cart(request, cart)
+        if quantity > 1:
             return True, 'Quantity is Increased,Product Is Already In Cart'
-        else:
-            # Product not in cart — fetch from DB
-            try:
-                product= Product.objects.get(id=product_id)
-            except Product.DoesNotExist:
-                return False, 'Product Does Not Exist'
-            # Add product to cart with initial quantity of 1
-            quantity=1
-            price= float(product.price)
-            cart[product_id_str] = {
-                'id': product.pk,
-                'name': product.name,
-                'price': price,
-                'quantity': quantity,
-                'total': float(price*quantity),
-                'image': product.image.url
-            }
-            request.session['cart'] = cart
-    request.session.modified = True  # Ensure Django saves session even if object not reassigned
-    return True, 'Product Added To Cart'
+        return True, 'Product Added To Cart'
 
 
 def get_user_cart(request):
     if request.user.is_authenticated:
-        cart_items = CartItem.objects.filter(user=request.user)
+        cart_items = CartItem.objects.filter(user=request.user).select_related('product')
         items = []
         total = 0
         for item in cart_items:
@@ -88,13 +115,26 @@ def get_user_cart(request):
                 'price': item.product_price,
                 'quantity': item.quantity,
                 'total': item_total,
-                'image': item.product.image.url
+                'image': variant_url(item.product.image, 'thumb')
             })
     else:
-        cart = request.session.get('cart', {})
-        items = list(cart.values())
-        total = sum(float(item['total']) for item in items)
-        
+        cart = get_session_cart(request)
+        products = Product.objects.filter(id__in=cart.keys()).only('id', 'name', 'price', 'image')
+        items = []
+        total = Decimal('0.00')
+        for product in products:
+            quantity = cart[product.id]
+            item_total = product.price * quantity
+            total += item_total
+            items.append({
+                'id': product.id,
+                'name': product.name,
+                'price': product.price,
+                'quantity': quantity,
+                'total': item_total,
+                'image': variant_url(product.image, 'thumb')
+            })
+
     return items, total
 
 
@@ -107,18 +147,145 @@ def delete_product_from_cart_service(request, product_id):
         except CartItem.DoesNotExist:
             return False, 'Product Does Not Exist'
     else:
-        cart= request.session.get('cart',{})
-        product_id_str = str(product_id) # Ensure key is a string for consistent session storage
-        if product_id_str in cart:
-            get_product = cart.get(product_id_str)
-            # Sometimes users may tamper with session (via browser tools), 
-            # so you should ensure cart item is well-formed before using .
-            # get() on it.
-            if not isinstance(get_product,dict):
-                return False, 'Cart Data Is Corrupted'
-            del cart[product_id_str]
-            request.session['cart'] = cart
-            request.session.modified = True # Mark session as changed for saving
-            return True, 'Product Removed From Cart'
-        else:
+        cart = get_session_cart(request)
+        if cart.pop(int(product_id), None) is None:
             return False, 'Product Does Not Exist'
+        _save_session_cart(request, cart)
+        return True, 'Product Removed From Cart'
+
+
+def set_cart_quantities_service(request, quantities):
+    """
+    Applies several quantity changes in one go: `quantities` maps product id to
+    the wanted quantity. Quantities are clamped to stock; 0 removes the line.
+    Returns (success, message).
+    """
+    wanted = {}
+    for product_id, quantity in (quantities or {}).items():
+        try:
+            wanted[int(product_id)] = max(0, int(quantity))
+        except (TypeError, ValueError):
+            return False, 'Invalid Quantity'
+    if not wanted:
+        return False, 'Nothing To Update'
+
+    clamped = False
+    if request.user.is_authenticated:
+        with transaction.atomic():
+            items = list(
+                CartItem.objects.select_for_update()
+                .filter(user=request.user, product_id__in=wanted.keys())
+                .select_related('product')
+            )
+            to_update, to_delete = [], []
+            for item in items:
+                quantity = min(wanted[item.product_id], max(0, item.product.quantity))
+                clamped = clamped or quantity != wanted[item.product_id]
+                if quantity <= 0:
+                    to_delete.append(item.id)
+                elif quantity != item.quantity:
+                    item.quantity = quantity
+                    to_update.append(item)
+            if to_update:
+                CartItem.objects.bulk_update(to_update, ['quantity'])
+            if to_delete:
+                CartItem.objects.filter(id__in=to_delete).delete()
+        invalidate_cart_summary(request.user.id)
+        _invalidate_user_recs_cache(request.user.id)
+    else:
+        cart = get_session_cart(request)
+        stock = dict(
+            Product.objects.filter(id__in=wanted.keys()).values_list('id', 'quantity')
+        )
+        for product_id, quantity in wanted.items():
+            if product_id not in cart:
+                continue
+            quantity = min(quantity, max(0, stock.get(product_id, 0)))
+            clamped = clamped or quantity != wanted[product_id]
+            if quantity <= 0:
+                del cart[product_id]
+            else:
+                cart[product_id] = quantity
+        _save_session_cart(request, cart)
+    if clamped:
+        return True, 'Cart Updated, Some Quantities Were Limited To Stock'
+    return True, 'Cart Updated'
+
+
+def get_cart_summary(request):
+    """
+    Returns {'count': <cart lines>, 'total': Decimal} for the header badge.
+    Cached per user and invalidated by the CartItem signals.
+    """
+    if request.user.is_authenticated:
+        key = _cart_summary_key(request.user.id)
+        summary = cache.get(key)
+        if summary is None:
+            totals = CartItem.objects.filter(user=request.user).aggregate(
+                count=Count('id'),
+                total=Sum(F('product_price') * F('quantity')),
+            )
+            summary = {
+                'count': totals['count'] or 0,
+                'total': Decimal(totals['total'] or 0).quantize(Decimal('0.01')),
+            }
+            cache.set(key, summary)
+        return summary
+    cart = get_session_cart(request)
+    total = Decimal('0.00')
+    if cart:
+        prices = Product.objects.filter(id__in=cart.keys()).values_list('id', 'price')
+        total = sum((price * cart[product_id] for product_id, price in prices), total)
+    return {'count': len(cart), 'total': total}
+
+
+def get_cart_count(request):
+    """Number of cart lines, without pricing the anonymous cart."""
+    if request.user.is_authenticated:
+        return get_cart_summary(request)['count']
+    return len(get_session_cart(request))
+
+
+def merge_session_cart_into_user(request, user):
+    """
+    Moves the anonymous session cart into the user's CartItem rows on login.
+    Quantities for products already in the user's cart are added together;
+    everything is clamped to stock. One read of the products, one bulk_create
+    and one bulk_update.
+    """
+    cart = get_session_cart(request)
+    if not cart:
+        return
+    products = Product.objects.only('id', 'name', 'price', 'quantity').in_bulk(cart.keys())
+    with transaction.atomic():
+        existing = {
+            item.product_id: item
+            for item in CartItem.objects.select_for_update().filter(user=user, product_id__in=cart.keys())
+        }
+        to_create, to_update = [], []
+        for product_id, quantity in cart.items():
+            product = products.get(product_id)
+            if product is None or product.quantity < 1:
+                continue
+            item = existing.get(product_id)
+            if item is None:
+                to_create.append(CartItem(
+                    user=user,
+                    product=product,
+                    product_name=product.name,
+                    product_price=product.price,
+                    quantity=min(quantity, product.quantity),
+                ))
+                continue
+            merged = min(item.quantity + quantity, product.quantity)
+            if merged != item.quantity:
+                item.quantity = merged
+                to_update.append(item)
+        if to_create:
+            CartItem.objects.bulk_create(to_create)
+        if to_update:
+            CartItem.objects.bulk_update(to_update, ['quantity'])
+    request.session.pop('cart', None)
+    request.session.modified = True
+    invalidate_cart_summary(user.id)
+    _invalidate_user_recs_cache(user.id)
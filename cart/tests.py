@@ -1,3 +1,139 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from cart.models import CartItem
+from cart.services.cart_services import (
+    add_product_to_cart_service,
+    get_cart_summary,
+    get_user_cart,
+)
+from dashboard.models import Category, Product
 
 # Create your tests here.
+
+
+class CartSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="buyer", password="pw-12345")
+        category = Category.objects.create(name="Cat S", slug="cat-s")
+        self.pen = Product.objects.create(
+            name="Pen", slug="pen", description="pen", price="2.50", quantity=10, category=category
+        )
+        self.pad = Product.objects.create(
+            name="Pad", slug="pad", description="pad", price="4.00", quantity=10, category=category
+        )
+
+    def test_summary_is_cached_and_invalidated_by_cart_changes(self):
+        CartItem.objects.create(
+            user=self.user, product=self.pen, product_name="Pen", product_price="2.50", quantity=2
+        )
+        request = RequestFactory().get("/")
+        request.user = self.user
+        self.assertEqual(get_cart_summary(request)["count"], 1)
+        with self.assertNumQueries(0):
+            summary = get_cart_summary(request)
+        self.assertEqual(str(summary["total"]), "5.00")
+
+        CartItem.objects.create(
+            user=self.user, product=self.pad, product_name="Pad", product_price="4.00", quantity=1
+        )
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("cart_summary"))
+        self.assertEqual(response.json(), {"count": 2, "total": "9.00"})
+
+
+@override_settings(IMAGE_DERIVATIVES_LAZY=False)
+class CartQuantityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="shopper", password="pw-12345")
+        category = Category.objects.create(name="Cat Q", slug="cat-q")
+        self.mug = Product.objects.create(
+            name="Mug", slug="mug", description="mug", price="3.00", quantity=2,
+            category=category, image="product/mug.png",
+        )
+        self.cup = Product.objects.create(
+            name="Cup", slug="cup", description="cup", price="1.50", quantity=5,
+            category=category, image="product/cup.png",
+        )
+        self.request = RequestFactory().get("/")
+        self.request.user = self.user
+
+    def test_add_stops_at_stock(self):
+        self.assertTrue(add_product_to_cart_service(self.request, self.mug.id)[0])
+        self.assertTrue(add_product_to_cart_service(self.request, self.mug.id)[0])
+        self.assertEqual(
+            add_product_to_cart_service(self.request, self.mug.id),
+            (False, "Product Quantity Exceeded"),
+        )
+        self.assertEqual(CartItem.objects.get(user=self.user, product=self.mug).quantity, 2)
+
+    def test_get_user_cart_is_a_single_query(self):
+        add_product_to_cart_service(self.request, self.mug.id)
+        add_product_to_cart_service(self.request, self.cup.id)
+        with self.assertNumQueries(1):
+            items, total = get_user_cart(self.request)
+        self.assertEqual(len(items), 2)
+        self.assertEqual(str(total), "4.50")
+
+    def test_update_clamps_to_stock_and_removes_zero_lines(self):
+        add_product_to_cart_service(self.request, self.mug.id)
+        add_product_to_cart_service(self.request, self.cup.id)
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse("cart_update"),
+            data={"quantities": {str(self.mug.id): 9, str(self.cup.id): 0}},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 1)
+        self.assertEqual(response.json()["total"], "6.00")
+        self.assertFalse(CartItem.objects.filter(user=self.user, product=self.cup).exists())
+
+
+@override_settings(IMAGE_DERIVATIVES_LAZY=False)
+class SessionCartTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="guest", password="pw-12345")
+        category = Category.objects.create(name="Cat G", slug="cat-g")
+        self.bowl = Product.objects.create(
+            name="Bowl", slug="bowl", description="bowl", price="6.00", quantity=3,
+            category=category, image="product/bowl.png",
+        )
+        self.plate = Product.objects.create(
+            name="Plate", slug="plate", description="plate", price="2.00", quantity=4,
+            category=category, image="product/plate.png",
+        )
+
+    def test_session_stores_only_quantities(self):
+        self.client.get(reverse("cart_add", args=[self.bowl.id]))
+        self.client.get(reverse("cart_add", args=[self.bowl.id]))
+        self.assertEqual(self.client.session["cart"], {str(self.bowl.id): 2})
+
+        self.bowl.price = "7.00"
+        self.bowl.save()
+        response = self.client.get(reverse("cart"))
+        self.assertEqual(str(response.context["cart_total"]), "14.00")
+
+    def test_legacy_session_cart_is_read(self):
+        session = self.client.session
+        session["cart"] = {str(self.plate.id): {"id": self.plate.id, "price": 1.0, "quantity": 2, "total": 2.0}}
+        session.save()
+        response = self.client.get(reverse("cart_summary"))
+        self.assertEqual(response.json(), {"count": 1, "total": "4.00"})
+
+    def test_login_merges_session_cart(self):
+        CartItem.objects.create(
+            user=self.user, product=self.bowl, product_name="Bowl", product_price="6.00", quantity=2
+        )
+        for product in (self.bowl, self.bowl, self.plate):
+            self.client.get(reverse("cart_add", args=[product.id]))
+        self.client.post(reverse("login"), {"username": "guest", "password": "pw-12345"})
+
+        lines = dict(CartItem.objects.filter(user=self.user).values_list("product_id", "quantity"))
+        self.assertEqual(lines, {self.bowl.id: 3, self.plate.id: 1})
+        self.assertNotIn("cart", self.client.session)
@@ -3,6 +3,8 @@ from . import views
 
 urlpatterns = [
     path('', views.cart, name='cart'),
+    path('summary.json', views.cart_summary, name='cart_summary'),
+    path('update/', views.update_cart, name='cart_update'),
     path('add/<int:product_id>/', views.add_product_to_cart, name='cart_add'),
     path('add-product-to-cart/<int:product_id>', views.add_product_to_cart, name='add_product_to_cart'),
     path('remove-product-from-cart/<int:product_id>', views.remove_product_from_cart, name='remove_product_from_cart'),
@@ -2,11 +2,16 @@ from django.shortcuts import render
 from dashboard.models import Product
 from django.contrib import messages
 from django.shortcuts import redirect
+from django.http import JsonResponse
 from .models import CartItem
 from django.db import transaction
+from django.views.decorators.http import require_POST
+import json
 from cart.services.cart_services import (add_product_to_cart_service, 
                                          get_user_cart,
                                          delete_product_from_cart_service,
+                                         get_cart_summary,
+                                         set_cart_quantities_service,
                                          )
 # Create your views here.
 
@@ -20,6 +25,52 @@ def cart(request):
     return render(request, 'cart/cart.html', context)
         
 
+def cart_summary(request):
+    summary = get_cart_summary(request)
+    return JsonResponse({
+        'count': summary['count'],
+        'total': f"{summary['total']:.2f}",
+    })
+
+
+@require_POST
+def update_cart(request):
+    """
+    Sets several cart quantities in one request.
+    Form posts send `quantity-<product_id>` fields and get redirected back to
+    the cart; JSON posts send {"quantities": {"<product_id>": n}} and get the
+    new cart summary back.
+    """
+    if request.content_type == 'application/json':
+        try:
+            payload = json.loads((request.body or b'{}').decode('utf-8'))
+        except (ValueError, UnicodeDecodeError):
+            return JsonResponse({'success': False, 'message': 'Invalid request.'}, status=400)
+        quantities = payload.get('quantities') if isinstance(payload, dict) else None
+        if not isinstance(quantities, dict):
+            return JsonResponse({'success': False, 'message': 'Invalid request.'}, status=400)
+        success, message = set_cart_quantities_service(request, quantities)
+        summary = get_cart_summary(request)
+        return JsonResponse({
+            'success': success,
+            'message': message,
+            'count': summary['count'],
+            'total': f"{summary['total']:.2f}",
+        }, status=200 if success else 400)
+
+    quantities = {
+        key[len('quantity-'):]: value
+        for key, value in request.POST.items()
+        if key.startswith('quantity-')
+    }
+    success, message = set_cart_quantities_service(request, quantities)
+    if success:
+        messages.success(request, message)
+    else:
+        messages.error(request, message)
+    return redirect('cart')
+
+
 def add_product_to_cart(request, product_id):
     success, message = add_product_to_cart_service(request, product_id)
     if success:
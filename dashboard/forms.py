@@ -118,6 +118,14 @@ class productForm(forms.ModelForm):
         return category
 
 
+class ProductImportForm(forms.Form):
+    file = forms.FileField(
+        help_text="CSV or JSONL with columns: slug, name, description, price, quantity, category, image.",
+        widget=forms.FileInput(attrs={'class': 'form-control', 'accept': '.csv,.jsonl,.ndjson'}),
+    )
+    dry_run = forms.BooleanField(required=False, label="Validate only")
+
+
 class UserProfileForm(forms.ModelForm):
     class Meta:
         model = UserProfile
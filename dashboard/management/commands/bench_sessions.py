@@ -0,0 +1,147 @@
+import json
+import statistics
+import threading
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+
+# Session payloads that mirror what the storefront keeps per visitor.
+def _cart_flow(session, step):
+    cart = session.get('cart') or {}
+    key = str(step % 8 + 1)
+    cart[key] = cart.get(key, 0) + 1
+    session['cart'] = cart
+
+
+def _checkout_flow(session, step):
+    cart = session.get('cart') or {str(i): 1 for i in range(1, 6)}
+    if step % 2:
+        session.pop('cart', None)
+    else:
+        session['cart'] = cart
+
+
+def _messages_flow(session, step):
+    if session.get('_messages'):
+        session.pop('_messages', None)
+    else:
+        session['_messages'] = json.dumps([["__json_message", 0, 25, "Product Added To Cart"]])
+
+
+FLOWS = {
+    'cart': _cart_flow,
+    'checkout': _checkout_flow,
+    'messages': _messages_flow,
+}
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = "Benchmark session read/write latency and lock errors per session engine."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--engines', default=','.join(settings.SESSION_ENGINE_CHOICES))
+        parser.add_argument('--flows', default=','.join(FLOWS))
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+
+    def handle(self, *args, **options):
+        engines = [e.strip() for e in options['engines'].split(',') if e.strip()]
+        flows = [f.strip() for f in options['flows'].split(',') if f.strip()]
+        unknown = [e for e in engines if e not in settings.SESSION_ENGINE_CHOICES]
+        unknown += [f for f in flows if f not in FLOWS]
+        if unknown:
+            raise CommandError(f"Unknown engine/flow: {', '.join(unknown)}")
+
+        results = []
+        for engine in engines:
+            store_class = import_module(settings.SESSION_ENGINE_CHOICES[engine]).SessionStore
+            for flow in flows:
+                results.append(self._run(store_class, engine, flow, options['threads'], options['iterations']))
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f"{'engine':<15}{'flow':<10}{'read p50':>10}{'read p95':>10}"
+            f"{'write p50':>11}{'write p95':>11}{'locked':>9}{'bytes':>8}"
+        )
+        for row in results:
+            self.stdout.write(
+                f"{row['engine']:<15}{row['flow']:<10}"
+                f"{row['read_p50_ms']:>10.2f}{row['read_p95_ms']:>10.2f}"
+                f"{row['write_p50_ms']:>11.2f}{row['write_p95_ms']:>11.2f}"
+                f"{row['lock_error_rate']:>8.1%} {row['max_payload_bytes']:>7}"
+            )
+
+    def _run(self, store_class, engine, flow, threads, iterations):
+        step_func = FLOWS[flow]
+        reads, writes, payloads = [], [], []
+        errors = []
+        lock = threading.Lock()
+
+        def visitor(worker):
+            local_reads, local_writes, local_payloads, local_errors = [], [], [], 0
+            session = store_class()
+            session['cart'] = {str(worker): 1}
+            try:
+                session.save()
+                for step in range(iterations):
+                    session = store_class(session_key=session.session_key)
+                    started = time.perf_counter()
+                    try:
+                        session.get('cart')
+                        local_reads.append(time.perf_counter() - started)
+                        step_func(session, step)
+                        started = time.perf_counter()
+                        session.save()
+                        local_writes.append(time.perf_counter() - started)
+                    except OperationalError:
+                        local_errors += 1
+                    local_payloads.append(len(session.encode(dict(session.items()))))
+                try:
+                    session.delete()
+                except OperationalError:
+                    pass
+            finally:
+                connection.close()
+                with lock:
+                    reads.extend(local_reads)
+                    writes.extend(local_writes)
+                    payloads.extend(local_payloads)
+                    errors.append(local_errors)
+
+        workers = [threading.Thread(target=visitor, args=(i,)) for i in range(threads)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        operations = threads * iterations
+        return {
+            'engine': engine,
+            'flow': flow,
+            'operations': operations,
+            'seconds': round(elapsed, 3),
+            'read_p50_ms': statistics.median(reads) * 1000 if reads else 0.0,
+            'read_p95_ms': _percentile(reads, 95) * 1000,
+            'write_p50_ms': statistics.median(writes) * 1000 if writes else 0.0,
+            'write_p95_ms': _percentile(writes, 95) * 1000,
+            'lock_errors': sum(errors),
+            'lock_error_rate': sum(errors) / operations if operations else 0.0,
+            'max_payload_bytes': max(payloads, default=0),
+        }
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.services.bulk_update_services import apply_stock_price_updates
+from dashboard.services.product_io import FORMATS, detect_format, iter_rows, text_stream
+
+
+class Command(BaseCommand):
+    help = "Apply price/stock changes from a CSV or JSONL file (columns: id or slug, price, quantity) in one transaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS, help="Defaults to the file extension.")
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help="Report what would change; write nothing.")
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or detect_format(options['path'])
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as fh:
+                changes = []
+                for line, row, error in iter_rows(text_stream(fh), fmt):
+                    if error:
+                        raise CommandError(f"line {line}: {error}")
+                    changes.append(row)
+        except FileNotFoundError as exc:
+            raise CommandError(str(exc))
+
+        result = apply_stock_price_updates(changes, chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+        for error in result.errors[:50]:
+            self.stderr.write(f"row {error['index'] + 1}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{result.received} changes in {time.perf_counter() - started:.1f}s: {result.updated} updated, "
+            f"{result.unchanged} unchanged, {result.failed} failed{' (dry run)' if options['dry_run'] else ''}."
+        ))
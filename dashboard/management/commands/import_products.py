@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.services.product_io import FORMATS, ProductImporter, detect_format, text_stream
+
+
+class Command(BaseCommand):
+    help = "Stream products from a CSV or JSONL file: existing slugs are updated, other rows created."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS, help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--errors', help="Write rejected rows (line, slug, name, error) to this CSV file.")
+        parser.add_argument('--dry-run', action='store_true', help="Validate only; write nothing.")
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or detect_format(options['path'])
+        started = time.perf_counter()
+
+        def progress(result):
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{result.processed} rows ({result.processed / elapsed if elapsed else 0:.0f}/s): "
+                f"{result.created} created, {result.updated} updated, {result.failed} failed"
+            )
+
+        errors_out = open(options['errors'], 'w', newline='', encoding='utf-8') if options['errors'] else None
+        try:
+            with open(options['path'], 'rb') as fh:
+                result = ProductImporter(
+                    batch_size=options['batch_size'], errors_out=errors_out,
+                    progress=progress, dry_run=options['dry_run'],
+                ).run(text_stream(fh), fmt)
+        except FileNotFoundError as exc:
+            raise CommandError(str(exc))
+        except UnicodeDecodeError as exc:
+            raise CommandError(f"{options['path']} is not UTF-8: {exc}")
+        finally:
+            if errors_out:
+                errors_out.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done in {time.perf_counter() - started:.1f}s: {result.processed} rows, "
+            f"{result.created} created, {result.updated} updated, {result.failed} failed."
+        ))
+        if result.failed and not errors_out:
+            for error in result.errors[:20]:
+                self.stderr.write(f"line {error['line']}: {error['error']}")
@@ -0,0 +1,37 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from minishop import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        "Run weighted storefront scenarios (browse, search, product, like, cart, "
+        "checkout, assistant) from concurrent virtual users and report RPS, latency "
+        "percentiles and DB queries per endpoint."
+    )
+
+    def add_arguments(self, parser):
+        loadtest.add_arguments(parser)
+        parser.add_argument(
+            "--compare", nargs=2, metavar=("REV_A", "REV_B"),
+            help="Run the same load against two git revisions (SQLite databases are copied per run).",
+        )
+
+    def handle(self, *args, **options):
+        if options["compare"]:
+            rev_a, rev_b = options["compare"]
+            report_a, report_b = loadtest.compare_revisions(rev_a, rev_b, options, log=self.stdout.write)
+            self.stdout.write(loadtest.format_comparison(rev_a, report_a, rev_b, report_b))
+            report = {"A": {"rev": rev_a, **report_a}, "B": {"rev": rev_b, **report_b}}
+        else:
+            try:
+                report = loadtest.run_load(options)
+            except (ValueError, RuntimeError) as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(loadtest.format_report(report))
+
+        if options["json_out"]:
+            with open(options["json_out"], "w", encoding="utf-8") as fh:
+                json.dump(report, fh, indent=2)
@@ -0,0 +1,106 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import PurePosixPath
+
+import django
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from PIL import Image, UnidentifiedImageError
+
+from dashboard.services.image_services import build_derivatives
+
+
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp', '.tif', '.tiff'}
+DEFAULT_DIRS = ('product', 'banner', 'category')
+
+
+def walk_images(storage, directory):
+    """Yields image names under `directory` one at a time, skipping derivatives."""
+    try:
+        dirs, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in sorted(files):
+        if PurePosixPath(name).suffix.lower() in IMAGE_SUFFIXES:
+            yield f"{directory}/{name}" if directory else name
+    for sub in sorted(dirs):
+        path = f"{directory}/{sub}" if directory else sub
+        if path.strip('/') != settings.IMAGE_DERIVATIVES_DIR.strip('/'):
+            yield from walk_images(storage, path)
+
+
+def _init_worker():
+    if not django.apps.apps.ready:
+        django.setup()
+
+
+def process_image(name, force=False):
+    """Worker entry point: returns (name, status, source bytes, error)."""
+    try:
+        size = default_storage.size(name)
+        _, built = build_derivatives(name, force=force)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as exc:
+        return name, 'failed', 0, str(exc)
+    return name, 'built' if built else 'skipped', size, ''
+
+
+class Command(BaseCommand):
+    help = "Build WebP derivatives for existing uploads in parallel, skipping unchanged files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('dirs', nargs='*', default=list(DEFAULT_DIRS),
+                            help="Media directories to walk (default: product banner category).")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Worker processes; 1 processes images in this process.")
+        parser.add_argument('--force', action='store_true', help="Rebuild even when the content hash is unchanged.")
+        parser.add_argument('--progress-every', type=int, default=500)
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if workers < 1:
+            raise CommandError("--workers must be at least 1.")
+        names = (name for directory in options['dirs'] for name in walk_images(default_storage, directory.strip('/')))
+        counts = {'built': 0, 'skipped': 0, 'failed': 0}
+        self.total_bytes = 0
+        self.started = time.perf_counter()
+
+        if workers == 1:
+            for name in names:
+                self._record(process_image(name, options['force']), counts, options['progress_every'])
+        else:
+            # Forked workers must not share the parent's database connections.
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                # Keep a bounded window of submissions so huge trees are never listed up front.
+                window = workers * 4
+                pending = set()
+                for name in names:
+                    pending.add(pool.submit(process_image, name, options['force']))
+                    if len(pending) >= window:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            self._record(future.result(), counts, options['progress_every'])
+                for future in wait(pending).done:
+                    self._record(future.result(), counts, options['progress_every'])
+
+        elapsed = time.perf_counter() - self.started
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} images in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.1f}/s, "
+            f"{self.total_bytes / 1024 / 1024 / elapsed if elapsed else 0:.1f} MB/s): "
+            f"{counts['built']} built, {counts['skipped']} unchanged, {counts['failed']} failed."
+        ))
+
+    def _record(self, result, counts, progress_every):
+        name, status, size, error = result
+        counts[status] += 1
+        self.total_bytes += size
+        if error:
+            self.stderr.write(f"{name}: {error}")
+        total = sum(counts.values())
+        if progress_every and total % progress_every == 0:
+            elapsed = time.perf_counter() - self.started
+            self.stdout.write(f"{total} images, {total / elapsed if elapsed else 0:.1f}/s")
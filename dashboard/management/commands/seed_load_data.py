@@ -0,0 +1,308 @@
+import bisect
+import random
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from dashboard.models import Category, Product
+from payment.models import Address, Order, OrderItem, Payment
+from shop.cache_versions import bump_catalog_version, bump_category_tree_version
+from shop.models import LikedProduct, ProductInterest
+
+
+ADJECTIVES = [
+    "classic", "compact", "deluxe", "eco", "ergonomic", "lightweight", "modern", "portable",
+    "premium", "rugged", "smart", "soft", "vintage", "wireless", "waterproof", "slim",
+]
+NOUNS = [
+    "backpack", "blender", "bottle", "candle", "chair", "desk lamp", "headphones", "jacket",
+    "kettle", "keyboard", "mug", "notebook", "pillow", "sneakers", "speaker", "tent",
+    "towel", "watch", "wallet", "yoga mat",
+]
+ORDER_STATUSES = ["PENDING", "PROCESSING", "SHIPPED", "COMPLETED", "CANCELLED", "RETURNED"]
+ORDER_STATUS_WEIGHTS = [5, 10, 15, 60, 6, 4]
+
+
+class ZipfSampler:
+    """Draws items with probability proportional to 1 / rank**exponent."""
+
+    def __init__(self, items, exponent, rng):
+        self.items = items
+        self.rng = rng
+        self.cumulative = []
+        total = 0.0
+        for rank in range(1, len(items) + 1):
+            total += 1.0 / rank ** exponent
+            self.cumulative.append(total)
+        self.total = total
+
+    def sample(self):
+        return self.items[bisect.bisect_left(self.cumulative, self.rng.random() * self.total)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-generate a large synthetic dataset for load testing: categories, products, "
+        "users, orders with items, interests and likes, with Zipf-skewed popularity."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=100_000)
+        parser.add_argument("--users", type=int, default=50_000)
+        parser.add_argument("--orders", type=int, default=250_000, help="~4 items each, so ~1M order items.")
+        parser.add_argument("--max-items", type=int, default=7, help="Max items per order.")
+        parser.add_argument("--interests", type=int, default=500_000)
+        parser.add_argument("--likes", type=int, default=200_000)
+        parser.add_argument("--categories", type=int, default=10, help="Parent categories (5 children each).")
+        parser.add_argument("--zipf", type=float, default=1.1, help="Popularity skew exponent.")
+        parser.add_argument("--days", type=int, default=365, help="Spread orders over this many days.")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=5_000)
+        parser.add_argument("--prefix", default="load", help="Slug/username prefix for generated rows.")
+        parser.add_argument(
+            "--image", default="product/placeholder.png", help="Image name stored on every product (no file I/O)."
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch_size = max(1, options["batch_size"])
+        self.prefix = options["prefix"]
+        if Product.objects.filter(slug__startswith=f"{self.prefix}-").exists():
+            raise CommandError(f"Rows with prefix '{self.prefix}' already exist; pick another --prefix.")
+
+        started = time.perf_counter()
+        categories = self._seed_categories(options["categories"])
+        product_ids = self._seed_products(options["products"], categories, options["image"])
+        user_ids = self._seed_users(options["users"])
+
+        # Popularity rank is a shuffled order, so ids carry no signal.
+        popular = list(product_ids)
+        self.rng.shuffle(popular)
+        products = ZipfSampler(popular, options["zipf"], self.rng)
+        active = list(user_ids)
+        self.rng.shuffle(active)
+        buyers = ZipfSampler(active, 0.8, self.rng)
+
+        self._seed_orders(options["orders"], options["max_items"], options["days"], products, buyers)
+        self._seed_pairs(ProductInterest, options["interests"], products, buyers, with_score=True)
+        self._seed_pairs(LikedProduct, options["likes"], products, buyers)
+
+        # bulk_create skips the model signals, so invalidate caches once here.
+        bump_category_tree_version()
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f"Seeded load data in {time.perf_counter() - started:.1f}s"))
+
+    def _report(self, label, count, started):
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        self.stdout.write(f"{label}: {count} rows in {elapsed:.1f}s ({count / elapsed:,.0f}/s)")
+
+    def _batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield start, min(total, start + self.batch_size)
+
+    def _bulk_create(self, model, objs, key_field):
+        """bulk_create that always leaves primary keys set (MySQL does not return them)."""
+        model.objects.bulk_create(objs, batch_size=self.batch_size)
+        if objs and objs[0].pk is None:
+            ids = dict(
+                model.objects.filter(**{f"{key_field}__in": [getattr(o, key_field) for o in objs]})
+                .values_list(key_field, "id")
+            )
+            for obj in objs:
+                obj.pk = ids[getattr(obj, key_field)]
+        return objs
+
+    def _seed_categories(self, parents):
+        started = time.perf_counter()
+        with transaction.atomic():
+            roots = self._bulk_create(
+                Category,
+                [
+                    Category(name=f"{self.prefix.title()} Department {i}", slug=f"{self.prefix}-dept-{i}")
+                    for i in range(parents)
+                ],
+                "slug",
+            )
+            children = self._bulk_create(
+                Category,
+                [
+                    Category(
+                        name=f"{root.name} {noun.title()}",
+                        slug=f"{root.slug}-{noun.replace(' ', '-')}",
+                        parent=root,
+                    )
+                    for root in roots
+                    for noun in self.rng.sample(NOUNS, 5)
+                ],
+                "slug",
+            )
+        self._report("categories", len(roots) + len(children), started)
+        return children or roots
+
+    def _seed_products(self, total, categories, image):
+        started = time.perf_counter()
+        ids = []
+        for start, end in self._batches(total):
+            batch = []
+            for i in range(start, end):
+                category = self.rng.choice(categories)
+                name = f"{self.rng.choice(ADJECTIVES).title()} {self.rng.choice(NOUNS).title()} {i}"
+                batch.append(Product(
+                    name=name[:100],
+                    slug=f"{self.prefix}-p{i}",
+                    description=f"{category.name} item"[:100],
+                    # Log-normal prices: many cheap items, a long expensive tail.
+                    price=Decimal(str(round(min(max(self.rng.lognormvariate(3.2, 0.9), 0.5), 99_999), 2))),
+                    quantity=0 if self.rng.random() < 0.05 else self.rng.randint(1, 200),
+                    category=category,
+                    image=image,
+                ))
+            with transaction.atomic():
+                ids.extend(p.pk for p in self._bulk_create(Product, batch, "slug"))
+        self._report("products", len(ids), started)
+        return ids
+
+    def _seed_users(self, total):
+        started = time.perf_counter()
+        # One hash for every account: hashing dominates otherwise.
+        password = make_password("loadtest-password")
+        now = timezone.now()
+        ids = []
+        for start, end in self._batches(total):
+            batch = [
+                User(
+                    username=f"{self.prefix}_user{i}",
+                    email=f"{self.prefix}_user{i}@example.com",
+                    password=password,
+                    date_joined=now - timedelta(days=self.rng.randint(0, 730)),
+                )
+                for i in range(start, end)
+            ]
+            with transaction.atomic():
+                users = self._bulk_create(User, batch, "username")
+                addresses = [
+                    Address(
+                        user_id=user.pk,
+                        first_name="Load",
+                        last_name=f"User{user.pk}",
+                        phone="5550100",
+                        email=user.email,
+                        country="Testland",
+                        city=self.rng.choice(["North", "South", "East", "West"]) + " City",
+                        postal_code=f"{self.rng.randint(10000, 99999)}",
+                        address=f"{self.rng.randint(1, 999)} Main Street",
+                        payment_draft="APPROVED",
+                        terms_accepted=True,
+                        method="COD",
+                    )
+                    for user in users
+                ]
+                Address.objects.bulk_create(addresses, batch_size=self.batch_size)
+            ids.extend(user.pk for user in users)
+        self._report("users", len(ids), started)
+        return ids
+
+    def _seed_orders(self, total, max_items, days, products, buyers):
+        started = time.perf_counter()
+        if not total:
+            return
+        address_ids = dict(
+            Address.objects.filter(user__username__startswith=f"{self.prefix}_user").values_list("user_id", "id")
+        )
+        prices = dict(Product.objects.filter(slug__startswith=f"{self.prefix}-").values_list("id", "price"))
+        # Continue the ORD-###### sequence that Order.save() parses.
+        last = Order.objects.order_by("-id").values_list("order_number", flat=True).first()
+        next_number = int(last.replace("ORD-", "")) + 1 if last and last.startswith("ORD-") else 1
+        midday = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        item_count = 0
+
+        for start, end in self._batches(total):
+            drafts = []
+            for n in range(start, end):
+                lines = {}
+                for _ in range(self.rng.randint(1, max_items)):
+                    product_id = products.sample()
+                    lines[product_id] = lines.get(product_id, 0) + self.rng.randint(1, 3)
+                # Oldest first, so ids follow time and a batch spans only a few days.
+                created_at = midday - timedelta(days=days - n * (days + 1) // total)
+                drafts.append((buyers.sample(), lines, created_at))
+
+            with transaction.atomic():
+                payments = self._bulk_create(
+                    Payment,
+                    [
+                        Payment(
+                            transaction_id=f"{self.prefix}_{next_number + n}",
+                            is_paid=True,
+                            amount=sum(prices[p] * q for p, q in lines.items()),
+                            paid_at=created_at,
+                        )
+                        for n, (_user_id, lines, created_at) in enumerate(drafts)
+                    ],
+                    "transaction_id",
+                )
+                orders = self._bulk_create(
+                    Order,
+                    [
+                        Order(
+                            order_uuid=uuid.uuid5(uuid.NAMESPACE_URL, f"minishop-load:{self.prefix}:{next_number + n}"),
+                            order_number=f"ORD-{next_number + n:06d}",
+                            user_id=user_id,
+                            address_id=address_ids[user_id],
+                            payment=payment,
+                            status=self.rng.choices(ORDER_STATUSES, ORDER_STATUS_WEIGHTS)[0],
+                            total_price=payment.amount,
+                        )
+                        for n, ((user_id, _lines, _created_at), payment) in enumerate(zip(drafts, payments))
+                    ],
+                    "order_number",
+                )
+                items = [
+                    OrderItem(
+                        order=order,
+                        product_id=product_id,
+                        quantity=quantity,
+                        price=prices[product_id],
+                        total=prices[product_id] * quantity,
+                    )
+                    for order, (_user_id, lines, _created_at) in zip(orders, drafts)
+                    for product_id, quantity in lines.items()
+                ]
+                OrderItem.objects.bulk_create(items, batch_size=self.batch_size)
+                # created_at is auto_now_add, which bulk_create overrides; backdate per day.
+                by_day = {}
+                for order, (_user_id, _lines, created_at) in zip(orders, drafts):
+                    by_day.setdefault(created_at, []).append(order.pk)
+                for day, order_ids in by_day.items():
+                    Order.objects.filter(id__in=order_ids).update(created_at=day, updated_at=day)
+            next_number += len(drafts)
+            item_count += len(items)
+        self._report("orders", total, started)
+        self.stdout.write(f"order items: {item_count}")
+
+    def _seed_pairs(self, model, total, products, buyers, with_score=False):
+        started = time.perf_counter()
+        seen = set()
+        created = 0
+        for start, end in self._batches(total):
+            batch = []
+            for _ in range(start, end):
+                pair = (buyers.sample(), products.sample())
+                if pair in seen:
+                    continue
+                seen.add(pair)
+                row = model(user_id=pair[0], product_id=pair[1])
+                if with_score:
+                    row.score = self.rng.randint(1, 20)
+                batch.append(row)
+            with transaction.atomic():
+                model.objects.bulk_create(batch, batch_size=self.batch_size, ignore_conflicts=True)
+            created += len(batch)
+        self._report(model._meta.verbose_name_plural, created, started)
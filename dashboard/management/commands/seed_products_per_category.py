@@ -7,7 +7,6 @@ from django.conf import settings
 from django.core.files.base import ContentFile
 from django.core.management.base import BaseCommand
 from django.db import transaction
-from django.utils.text import slugify
 
 from dashboard.models import Category, Product
 
@@ -67,25 +66,14 @@ class Command(BaseCommand):
                 return ContentFile(handle.read(), name=filename)
 
         def unique_product_name(category_name):
-            # Ensure unique slug, since Product.save() doesn't resolve conflicts.
             token = secrets.token_hex(3)
             return f"{category_name} {token}".title()
 
-        def unique_slug(name):
-            base = slugify(name)[:45] or secrets.token_hex(3)
-            slug = base
-            counter = 1
-            while Product.objects.filter(slug=slug).exists():
-                slug = f"{base}-{counter}"
-                counter += 1
-            return slug
-
         def create_product_for_category(category):
             name = unique_product_name(category.name)
             product = Product(
                 category=category,
                 name=name,
-                slug=unique_slug(name),
                 description=f"Popular {category.name} item.",
                 price=Decimal(random.randint(199, 9999)) / Decimal(100),
                 quantity=random.randint(1, 20),
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-18 22:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0013_category_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['updated_at', 'quantity'], name='dashboard_p_updated_7472d7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'updated_at', 'quantity'], name='dashboard_p_categor_41bcd0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['created_at', 'quantity'], name='dashboard_p_created_30bd32_idx'),
+        ),
+    ]
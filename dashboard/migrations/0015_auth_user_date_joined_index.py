@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+# auth.User belongs to django.contrib, so its index is added here rather than
+# in Meta. The dashboard customer cards filter users by date_joined.
+USER_DATE_JOINED_INDEX = models.Index(fields=['date_joined'], name='auth_user_date_joined_idx')
+
+
+def add_index(apps, schema_editor):
+    schema_editor.add_index(apps.get_model('auth', 'User'), USER_DATE_JOINED_INDEX)
+
+
+def remove_index(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model('auth', 'User'), USER_DATE_JOINED_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('dashboard', '0014_product_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_index, remove_index),
+    ]
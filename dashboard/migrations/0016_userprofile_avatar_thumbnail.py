@@ -0,0 +1,30 @@
+# Generated by Django 5.2.1 on 2026-10-18 22:48
+
+from django.db import migrations, models
+
+
+# Profiles are now created on registration; give existing users theirs too.
+def create_missing_profiles(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    UserProfile = apps.get_model('dashboard', 'UserProfile')
+    missing = User.objects.filter(profile__isnull=True).values_list('id', flat=True)
+    UserProfile.objects.bulk_create(
+        [UserProfile(user_id=user_id) for user_id in missing.iterator()], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('dashboard', '0015_auth_user_date_joined_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='avatar_thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='avatars/thumbs/'),
+        ),
+        migrations.RunPython(create_missing_profiles, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,12 @@
 from django.db import models
-from django.utils.text import slugify
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.urls import reverse
+
+from dashboard.slugs import save_with_slug
 # Create your models here.
 class navbar(models.Model):
     name = models.CharField(max_length=100)
@@ -89,16 +90,7 @@ class Category(models.Model):
                 )
 
         # Auto-generate slug if not provided
-        if not self.slug:
-            base_slug = slugify(self.name)
-            slug = base_slug
-            counter = 1
-            while Category.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = slug
-
-        super().save(*args, **kwargs)
+        save_with_slug(self, lambda: super(Category, self).save(*args, **kwargs), source="name")
     
 class Product(models.Model):
     name = models.CharField(max_length=100)
@@ -116,14 +108,20 @@ class Product(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # In-stock products by recency: recommendations, similar products, search.
+            models.Index(fields=['updated_at', 'quantity']),
+            models.Index(fields=['category', 'updated_at', 'quantity']),
+            models.Index(fields=['created_at', 'quantity']),
+        ]
     
     def __str__(self):
         return self.name
     
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
+        save_with_slug(self, lambda: super(Product, self).save(*args, **kwargs), source="name")
 
 class Notification(models.Model):
     class Meta:
@@ -175,6 +173,7 @@ class Notification(models.Model):
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="profile")
     avatar = models.ImageField(upload_to="avatars/", blank=True, null=True)
+    avatar_thumbnail = models.ImageField(upload_to="avatars/thumbs/", blank=True, null=True, editable=False)
 
     def __str__(self):
         return f"Profile: {self.user.username}"
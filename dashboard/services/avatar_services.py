@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import logging
+from io import BytesIO
+from pathlib import PurePath
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.templatetags.static import static
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from dashboard.models import UserProfile
+
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_AVATAR = "home/images/person_1.jpg"
+# Covers the 40px header icon and the 72px profile picture at 2x.
+AVATAR_THUMBNAIL_SIZE = 144
+
+
+def _avatar_cache_key(user_id: int) -> str:
+    return f"avatar:u:{user_id}"
+
+
+def invalidate_avatar_url(user_id: int) -> None:
+    cache.delete(_avatar_cache_key(user_id))
+
+
+def build_avatar_thumbnail(profile: UserProfile) -> bool:
+    """Stores a square JPEG thumbnail of `profile.avatar` on `profile.avatar_thumbnail` (unsaved)."""
+    if not profile.avatar:
+        profile.avatar_thumbnail = None
+        return False
+    try:
+        profile.avatar.open("rb")
+        with Image.open(profile.avatar) as image:
+            image = ImageOps.exif_transpose(image)
+            thumb = ImageOps.fit(image.convert("RGB"), (AVATAR_THUMBNAIL_SIZE, AVATAR_THUMBNAIL_SIZE))
+    except (OSError, UnidentifiedImageError):
+        _LOGGER.warning("Could not build avatar thumbnail for user %s", profile.user_id, exc_info=True)
+        return False
+    buffer = BytesIO()
+    thumb.save(buffer, format="JPEG", quality=85, optimize=True)
+    name = f"{PurePath(profile.avatar.name).stem}.jpg"
+    profile.avatar_thumbnail.save(name, ContentFile(buffer.getvalue()), save=False)
+    return True
+
+
+def _profile_avatar_url(user_id: int) -> str:
+    profile = UserProfile.objects.filter(user_id=user_id).only("id", "user_id", "avatar", "avatar_thumbnail").first()
+    if profile is None or not profile.avatar:
+        return static(DEFAULT_AVATAR)
+    if not profile.avatar_thumbnail and build_avatar_thumbnail(profile):
+        # Uploads from before thumbnails existed: build once, skip the save signals.
+        UserProfile.objects.filter(pk=profile.pk).update(avatar_thumbnail=profile.avatar_thumbnail.name)
+    try:
+        return (profile.avatar_thumbnail or profile.avatar).url
+    except ValueError:
+        return static(DEFAULT_AVATAR)
+
+
+def avatar_url_for(user: User | AnonymousUser | None) -> str:
+    """Thumbnail URL for the user's avatar, cached until their UserProfile changes."""
+    if not user or isinstance(user, AnonymousUser) or not getattr(user, "is_authenticated", False):
+        return static(DEFAULT_AVATAR)
+    key = _avatar_cache_key(user.id)
+    url = cache.get(key)
+    if url is None:
+        url = _profile_avatar_url(user.id)
+        cache.set(key, url)
+    return url
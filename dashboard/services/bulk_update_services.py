@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from dashboard.models import Product
+from dashboard.signals import products_bulk_changed
+
+
+UPDATABLE_FIELDS = ("price", "quantity")
+
+
+@dataclass
+class BulkUpdateResult:
+    received: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    failed: int = 0
+    errors: list[dict] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {
+            "received": self.received,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+
+def _clean_change(change: dict) -> tuple[str, object, dict]:
+    if not isinstance(change, dict):
+        raise ValueError("expected an object")
+    raw_id, slug = change.get("id"), change.get("slug")
+    if raw_id not in (None, ""):
+        try:
+            key = ("id", int(raw_id))
+        except (TypeError, ValueError):
+            raise ValueError("id: must be an integer")
+    elif slug:
+        key = ("slug", str(slug).strip())
+    else:
+        raise ValueError("id or slug is required")
+
+    values = {}
+    for name in UPDATABLE_FIELDS:
+        value = change.get(name)
+        if value in (None, ""):
+            continue
+        try:
+            values[name] = Product._meta.get_field(name).clean(str(value).strip(), None)
+        except ValidationError as exc:
+            raise ValueError(f"{name}: {' '.join(exc.messages)}")
+        if values[name] < 0:
+            raise ValueError(f"{name}: must not be negative")
+    if not values:
+        raise ValueError("nothing to update (price or quantity)")
+    return key[0], key[1], values
+
+
+def apply_stock_price_updates(changes: Iterable[dict], chunk_size: int = 500, dry_run: bool = False) -> BulkUpdateResult:
+    """
+    Applies (id or slug, price, quantity) changes: products are loaded and
+    written in chunks with bulk_update inside one transaction, and a single
+    products_bulk_changed event is sent after commit. Any invalid row is
+    reported and skipped; the valid ones still apply. Later changes to the
+    same product win.
+    """
+    result = BulkUpdateResult()
+    by_id: dict[int, tuple[int, dict]] = {}
+    by_slug: dict[str, tuple[int, dict]] = {}
+    for index, change in enumerate(changes):
+        result.received += 1
+        try:
+            kind, key, values = _clean_change(change)
+        except ValueError as exc:
+            result.failed += 1
+            result.errors.append({"index": index, "error": str(exc)})
+            continue
+        (by_id if kind == "id" else by_slug)[key] = (index, values)
+
+    now = timezone.now()
+    with transaction.atomic():
+        products: dict[int, Product] = {}
+        ids, slugs = list(by_id), list(by_slug)
+        for start in range(0, max(len(ids), len(slugs)), chunk_size):
+            chunk = (
+                Product.objects.select_for_update()
+                .filter(Q(id__in=ids[start:start + chunk_size]) | Q(slug__in=slugs[start:start + chunk_size]))
+                .only("id", "slug", "price", "quantity", "updated_at")
+            )
+            products.update((product.id, product) for product in chunk)
+
+        found_slugs = {product.slug for product in products.values()}
+        missing = [(index, f"unknown id {key}") for key, (index, _) in by_id.items() if key not in products]
+        missing += [(index, f"unknown slug '{key}'") for key, (index, _) in by_slug.items() if key not in found_slugs]
+        for index, error in missing:
+            result.failed += 1
+            result.errors.append({"index": index, "error": error})
+        result.errors.sort(key=lambda e: e["index"])
+
+        dirty, changed_fields = [], set()
+        for product in products.values():
+            matches = [m for m in (by_id.get(product.id), by_slug.get(product.slug)) if m]
+            # id and slug rows can both point at one product; apply them in input order.
+            before = {name: getattr(product, name) for name in UPDATABLE_FIELDS}
+            for _, values in sorted(matches, key=lambda m: m[0]):
+                for name, value in values.items():
+                    setattr(product, name, value)
+            changed = {name for name in UPDATABLE_FIELDS if getattr(product, name) != before[name]}
+            if changed:
+                product.updated_at = now
+                changed_fields |= changed
+                dirty.append(product)
+            else:
+                result.unchanged += 1
+        result.updated = len(dirty)
+
+        if dirty and not dry_run:
+            Product.objects.bulk_update(dirty, [*UPDATABLE_FIELDS, "updated_at"], batch_size=chunk_size)
+            changed_ids = [product.id for product in dirty]
+            transaction.on_commit(
+                lambda: products_bulk_changed.send(sender=Product, product_ids=changed_ids, fields=changed_fields)
+            )
+    return result
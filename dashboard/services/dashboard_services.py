@@ -10,6 +10,14 @@ from datetime import  timedelta
 import calendar, datetime
 
 
+def _days_filter(field, first_day, last_day=None):
+    """
+    Lookup kwargs for local calendar days [first_day, last_day] as a half-open
+    datetime range. Unlike `<field>__date`, a plain range can use an index.
+    """
+    start = timezone.make_aware(datetime.datetime.combine(first_day, datetime.time.min))
+    end = timezone.make_aware(datetime.datetime.combine(last_day or first_day, datetime.time.min))
+    return {f'{field}__gte': start, f'{field}__lt': end + timedelta(days=1)}
 
 
 class DashboardServices:
@@ -39,8 +47,8 @@ class DashboardServices:
         compared to yesterday's orders.
         """
         total_orders= Order.objects.count()
-        yesterday_orders= Order.objects.filter(created_at__date = yesterday).count()
-        today_orders= Order.objects.filter(created_at__date = today).count()
+        yesterday_orders= Order.objects.filter(**_days_filter('created_at', yesterday)).count()
+        today_orders= Order.objects.filter(**_days_filter('created_at', today)).count()
         difference_orders= today_orders - yesterday_orders
         
         if yesterday_orders > 0:
@@ -61,8 +69,8 @@ class DashboardServices:
         compared to yesterday's revenue.
         """
         total_revenue= Order.objects.aggregate(total_revenue=Sum('total_price'))['total_revenue']or 0
-        yesterday_revenue= Order.objects.filter(created_at__date = yesterday).aggregate(yesterday_revenue=Sum('total_price'))['yesterday_revenue']or 0
-        today_revenue= Order.objects.filter(created_at__date = today).aggregate(today_revenue=Sum('total_price'))['today_revenue']or 0
+        yesterday_revenue= Order.objects.filter(**_days_filter('created_at', yesterday)).aggregate(yesterday_revenue=Sum('total_price'))['yesterday_revenue']or 0
+        today_revenue= Order.objects.filter(**_days_filter('created_at', today)).aggregate(today_revenue=Sum('total_price'))['today_revenue']or 0
         
         difference_revenue= today_revenue - yesterday_revenue
         
@@ -84,8 +92,8 @@ class DashboardServices:
         compared to yesterday's customers.
         """
         total_customers= User.objects.filter(is_superuser=False).count()
-        yesterday_customers= User.objects.filter(is_superuser=False).filter(date_joined__date = yesterday).count()
-        today_customers= User.objects.filter(is_superuser=False).filter(date_joined__date = today).count()
+        yesterday_customers= User.objects.filter(is_superuser=False).filter(**_days_filter('date_joined', yesterday)).count()
+        today_customers= User.objects.filter(is_superuser=False).filter(**_days_filter('date_joined', today)).count()
         
         difference_customers= today_customers - yesterday_customers
         
@@ -107,8 +115,8 @@ class DashboardServices:
         compared to yesterday's refunds.
         """
         total_refunds= Refund.objects.count()
-        yesterday_refunds= Refund.objects.filter(created_at__date = yesterday).count()
-        today_refunds= Refund.objects.filter(created_at__date = today).count()
+        yesterday_refunds= Refund.objects.filter(**_days_filter('created_at', yesterday)).count()
+        today_refunds= Refund.objects.filter(**_days_filter('created_at', today)).count()
         
         difference_refunds= today_refunds - yesterday_refunds
         
@@ -192,7 +200,7 @@ class DashboardChartsServices:
         # Queryset: Orders grouped by day within this week (Mon to Sun)
         daily_sales = (
             Order.objects
-            .filter(created_at__date__gte=this_monday, created_at__date__lte=this_sunday)
+            .filter(**_days_filter('created_at', this_monday, this_sunday))
             .annotate(day=TruncDay('created_at'))
             .values('day')
             .annotate(total=Sum('total_price'))
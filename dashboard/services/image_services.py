@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+
+_LOGGER = logging.getLogger(__name__)
+
+# Bump when the encoder settings change so manifests built with the old ones are redone.
+PIPELINE_VERSION = 1
+# Upper bound on one source's build; a crashed builder's lock expires after this.
+BUILD_LOCK_TIMEOUT = 120
+
+
+@dataclass(frozen=True)
+class Variant:
+    name: str
+    width: int
+    sizes: str
+
+
+# Each variant fits the image inside a `width` x `width` box, so all variants
+# share the source aspect ratio and can be offered together in one srcset.
+VARIANTS = {
+    "thumb": Variant("thumb", 160, "160px"),
+    "card": Variant("card", 480, "(max-width: 576px) 100vw, 480px"),
+    "detail": Variant("detail", 960, "(max-width: 992px) 100vw, 960px"),
+}
+
+
+def _derived_dir() -> str:
+    return getattr(settings, "IMAGE_DERIVATIVES_DIR", "derived").strip("/")
+
+
+def _source_key(source_name: str) -> str:
+    return hashlib.sha1(source_name.encode()).hexdigest()
+
+
+def _cache_key(source_name: str) -> str:
+    return f"img:{_source_key(source_name)}"
+
+
+def manifest_name(source_name: str) -> str:
+    return f"{_derived_dir()}/manifest/{_source_key(source_name)}.json"
+
+
+def content_hash(source_name: str, storage=default_storage) -> str:
+    """sha256 of the stored file, read in chunks."""
+    digest = hashlib.sha256(f"v{PIPELINE_VERSION}:".encode())
+    with storage.open(source_name, "rb") as fh:
+        for chunk in fh.chunks():
+            digest.update(chunk)
+    return digest.hexdigest()[:24]
+
+
+def load_manifest(source_name: str, storage=default_storage) -> dict | None:
+    try:
+        with storage.open(manifest_name(source_name), "rb") as fh:
+            return json.loads(fh.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _encode(image: Image.Image, variant: Variant) -> tuple[bytes, int, int]:
+    resized = image.copy()
+    resized.thumbnail((variant.width, variant.width), Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    resized.save(buffer, format="WEBP", quality=settings.IMAGE_DERIVATIVE_QUALITY, method=4)
+    return buffer.getvalue(), resized.width, resized.height
+
+
+def build_derivatives(source_name: str, storage=default_storage, force: bool = False) -> tuple[dict, bool]:
+    """
+    Writes the WebP variants of `source_name` under IMAGE_DERIVATIVES_DIR,
+    named by the source's content hash, plus a manifest describing them.
+    Returns (manifest, built); nothing is written when the stored manifest
+    already matches the file's content hash, unless `force` is set.
+    """
+    digest = content_hash(source_name, storage)
+    manifest = None if force else load_manifest(source_name, storage)
+    if manifest and manifest.get("hash") == digest:
+        cache.set(_cache_key(source_name), manifest, settings.IMAGE_DERIVATIVE_CACHE_TIMEOUT)
+        return manifest, False
+
+    with storage.open(source_name, "rb") as fh, Image.open(fh) as image:
+        # JPEGs decode straight to a reduced scale that still covers the largest variant.
+        width, height = image.size
+        largest = max(variant.width for variant in VARIANTS.values())
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        manifest = {"source": source_name, "hash": digest, "width": width, "height": height, "variants": {}}
+        for variant in VARIANTS.values():
+            data, width, height = _encode(image, variant)
+            name = f"{_derived_dir()}/{digest[:2]}/{digest}-{variant.name}.webp"
+            if not storage.exists(name):
+                storage.save(name, ContentFile(data))
+            manifest["variants"][variant.name] = {"name": name, "width": width, "height": height}
+
+    path = manifest_name(source_name)
+    if storage.exists(path):
+        storage.delete(path)
+    storage.save(path, ContentFile(json.dumps(manifest).encode()))
+    cache.set(_cache_key(source_name), manifest, settings.IMAGE_DERIVATIVE_CACHE_TIMEOUT)
+    return manifest, True
+
+
+def derivatives_for(image, build: bool | None = None) -> dict:
+    """
+    Manifest for an ImageField value: from the cache, then the stored
+    manifest, then built on the spot when `build` is set (defaults to
+    IMAGE_DERIVATIVES_LAZY). Returns {} when the image has no usable
+    derivatives, or while another request is building them.
+    """
+    source_name = getattr(image, "name", image) or ""
+    if not source_name:
+        return {}
+    key = _cache_key(source_name)
+    manifest = cache.get(key)
+    if manifest is not None:
+        return manifest
+    storage = getattr(image, "storage", default_storage)
+    manifest = load_manifest(source_name, storage)
+    if build is None:
+        build = settings.IMAGE_DERIVATIVES_LAZY
+    if manifest is None and build:
+        lock = f"{key}:building"
+        if not cache.add(lock, True, BUILD_LOCK_TIMEOUT):
+            # Someone else is encoding this source; serve the original until their manifest lands.
+            return {}
+        try:
+            manifest, _ = build_derivatives(source_name, storage)
+        except FileNotFoundError:
+            # A row pointing at a file that was never uploaded (fixtures, restored dumps): not worth a warning.
+            _LOGGER.debug("No source file for %s; serving the original URL", source_name)
+        except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as exc:
+            _LOGGER.warning("Could not build derivatives for %s: %s", source_name, exc)
+        finally:
+            cache.delete(lock)
+    # Negative results are cached too, so a broken upload is not retried on every render.
+    manifest = manifest or {}
+    cache.set(key, manifest, settings.IMAGE_DERIVATIVE_CACHE_TIMEOUT)
+    return manifest
+
+
+def _original_url(image) -> str:
+    try:
+        return image.url if image else ""
+    except ValueError:
+        return ""
+
+
+def variant_url(image, variant: str = "card") -> str:
+    entry = derivatives_for(image).get("variants", {}).get(variant)
+    if entry is None:
+        return _original_url(image)
+    return getattr(image, "storage", default_storage).url(entry["name"])
+
+
+def srcset(image) -> str:
+    """``url 160w, url 480w, ...`` over the distinct variant widths."""
+    variants = derivatives_for(image).get("variants", {})
+    storage = getattr(image, "storage", default_storage)
+    seen = {}
+    for entry in sorted(variants.values(), key=lambda e: e["width"]):
+        seen.setdefault(entry["width"], storage.url(entry["name"]))
+    return ", ".join(f"{url} {width}w" for width, url in seen.items())
+
+
+def image_field_post_save(sender, instance, field_name: str = "image", **kwargs) -> None:
+    """Builds derivatives right after an upload so the first visitor does not pay for it."""
+    if kwargs.get("raw"):
+        return
+    image = getattr(instance, field_name, None)
+    if image:
+        derivatives_for(image, build=True)
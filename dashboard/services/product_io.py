@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from dashboard.models import Category, Product
+from dashboard.slugs import bulk_create_with_slugs
+from dashboard.signals import products_bulk_changed
+from shop.cache_versions import get_category_tree_version
+
+
+# Column order for both export and import, so an export can be edited and re-imported.
+PRODUCT_FIELDS = ("slug", "name", "description", "price", "quantity", "category", "image")
+ERROR_FIELDS = ("line", "slug", "name", "error")
+FORMATS = ("csv", "jsonl")
+REQUIRED_ON_CREATE = ("name", "price", "quantity")
+
+
+def detect_format(filename: str, default: str = "csv") -> str:
+    suffix = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    if suffix in ("jsonl", "ndjson"):
+        return "jsonl"
+    return "csv" if suffix == "csv" else default
+
+
+def iter_rows(stream: Iterable[str], fmt: str) -> Iterator[tuple[int, dict | None, str]]:
+    """Yields (line, row, parse_error) one record at a time."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, {k.strip(): (v or "").strip() for k, v in row.items() if k}, ""
+        return
+    for line_no, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_no, None, f"Invalid JSON: {exc}"
+            continue
+        if not isinstance(row, dict):
+            yield line_no, None, "Expected a JSON object"
+            continue
+        yield line_no, {k: "" if v is None else str(v).strip() for k, v in row.items()}, ""
+
+
+def category_ids_by_slug() -> dict[str, int]:
+    """slug -> id for every category, cached until the category tree changes."""
+    return cache.get_or_set(
+        f"catslugs:{get_category_tree_version()}",
+        lambda: dict(Category.objects.values_list("slug", "id")),
+    )
+
+
+def _clean_row(row: dict, categories: dict[str, int]) -> dict:
+    cleaned = {}
+    for name in ("slug", "name", "description", "price", "quantity", "image"):
+        value = row.get(name, "")
+        if value == "":
+            continue
+        model_field = Product._meta.get_field(name)
+        try:
+            cleaned[name] = model_field.clean(value, None)
+        except ValidationError as exc:
+            raise ValueError(f"{name}: {' '.join(exc.messages)}")
+    if cleaned.get("price") is not None and cleaned["price"] < 0:
+        raise ValueError("price: must not be negative")
+    if cleaned.get("quantity") is not None and cleaned["quantity"] < 0:
+        raise ValueError("quantity: must not be negative")
+    category = row.get("category", "")
+    if category:
+        if category not in categories:
+            raise ValueError(f"category: unknown slug '{category}'")
+        cleaned["category_id"] = categories[category]
+    return cleaned
+
+
+@dataclass
+class ImportResult:
+    processed: int = 0
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: list[dict] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {k: getattr(self, k) for k in ("processed", "created", "updated", "failed")}
+
+
+class ProductImporter:
+    """
+    Streams rows into Product: rows whose slug exists update that product,
+    others create one (a slug is allocated from the name when missing).
+    Blank cells leave the current value alone. Rows are validated and
+    written in batches, each batch in one transaction with bulk_create /
+    bulk_update; bad rows are reported and skipped.
+    """
+
+    def __init__(self, batch_size: int = 500, errors_out=None, progress: Callable[[ImportResult], None] | None = None,
+                 keep_errors: int = 100, dry_run: bool = False):
+        self.batch_size = batch_size
+        self.errors_writer = csv.DictWriter(errors_out, fieldnames=ERROR_FIELDS) if errors_out is not None else None
+        if self.errors_writer:
+            self.errors_writer.writeheader()
+        self.progress = progress
+        self.keep_errors = keep_errors
+        self.dry_run = dry_run
+        self.result = ImportResult()
+        self.categories = category_ids_by_slug()
+        self.changed_ids: list[int] = []
+        self.changed_fields: set[str] = set()
+
+    def _error(self, line: int, row: dict | None, message: str):
+        row = row or {}
+        error = {"line": line, "slug": row.get("slug", ""), "name": row.get("name", ""), "error": message}
+        self.result.failed += 1
+        if len(self.result.errors) < self.keep_errors:
+            self.result.errors.append(error)
+        if self.errors_writer:
+            self.errors_writer.writerow(error)
+
+    def run(self, stream: Iterable[str], fmt: str) -> ImportResult:
+        batch = []
+        for line, row, parse_error in iter_rows(stream, fmt):
+            self.result.processed += 1
+            if parse_error:
+                self._error(line, row, parse_error)
+                continue
+            try:
+                batch.append((line, row, _clean_row(row, self.categories)))
+            except ValueError as exc:
+                self._error(line, row, str(exc))
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+        if self.changed_fields:
+            products_bulk_changed.send(sender=Product, product_ids=self.changed_ids, fields=self.changed_fields)
+        return self.result
+
+    def _flush(self, batch: list[tuple[int, dict, dict]]):
+        slugs = {cleaned["slug"] for _, _, cleaned in batch if "slug" in cleaned}
+        existing = Product.objects.in_bulk(slugs, field_name="slug") if slugs else {}
+        now = timezone.now()
+        to_create, to_update, update_fields = [], {}, {"updated_at"}
+        pending_slugs = set()
+        unnamed = []
+
+        for line, row, cleaned in batch:
+            product = existing.get(cleaned.get("slug"))
+            if product is not None:
+                for name, value in cleaned.items():
+                    setattr(product, name, value)
+                product.updated_at = now
+                update_fields.update(k for k in cleaned if k != "slug")
+                to_update[product.pk] = product
+                continue
+            missing = [name for name in REQUIRED_ON_CREATE if name not in cleaned]
+            if missing:
+                self._error(line, row, f"missing {', '.join(missing)} for a new product")
+                continue
+            if "slug" in cleaned:
+                if cleaned["slug"] in pending_slugs:
+                    self._error(line, row, f"slug: '{cleaned['slug']}' appears twice in this batch")
+                    continue
+                pending_slugs.add(cleaned["slug"])
+            product = Product(**cleaned)
+            if not product.slug:
+                unnamed.append(product)
+            to_create.append(product)
+
+        if not self.dry_run and (to_create or to_update):
+            with transaction.atomic():
+                if to_create:
+                    bulk_create_with_slugs(
+                        Product, to_create, unnamed, reserved=pending_slugs, batch_size=self.batch_size
+                    )
+                if to_update:
+                    Product.objects.bulk_update(
+                        list(to_update.values()), sorted(update_fields), batch_size=self.batch_size
+                    )
+            self.changed_ids.extend(p.pk for p in to_create)
+            self.changed_ids.extend(to_update)
+            if to_create:
+                self.changed_fields.update(PRODUCT_FIELDS)
+            if to_update:
+                self.changed_fields.update(update_fields)
+        self.result.created += len(to_create)
+        self.result.updated += len(to_update)
+        if self.progress:
+            self.progress(self.result)
+
+
+def import_products(stream: Iterable[str], fmt: str, **kwargs) -> ImportResult:
+    return ProductImporter(**kwargs).run(stream, fmt)
+
+
+def text_stream(binary) -> io.TextIOWrapper:
+    """Decodes an uploaded/opened binary file lazily (BOM tolerant)."""
+    return io.TextIOWrapper(binary, encoding="utf-8-sig", newline="")
+
+
+def export_queryset(category: str = "", query: str = "", in_stock: bool = False):
+    qs = Product.objects.order_by("id")
+    if category:
+        qs = qs.filter(Q(category__slug=category) | Q(category__parent__slug=category))
+    if query:
+        qs = qs.filter(name__icontains=query)
+    if in_stock:
+        qs = qs.filter(quantity__gt=0)
+    return qs.values_list("slug", "name", "description", "price", "quantity", "category__slug", "image")
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def export_lines(rows, fmt: str, chunk_size: int = 2000) -> Iterator[str]:
+    """Encodes export rows one line at a time, reading the queryset in chunks."""
+    values = rows.iterator(chunk_size=chunk_size)
+    if fmt == "jsonl":
+        for row in values:
+            record = dict(zip(PRODUCT_FIELDS, row))
+            record["price"] = str(record["price"])
+            record["category"] = record["category"] or ""
+            yield json.dumps(record) + "\n"
+        return
+    writer = csv.writer(_Echo())
+    yield writer.writerow(PRODUCT_FIELDS)
+    for row in values:
+        yield writer.writerow(["" if value is None else value for value in row])
@@ -0,0 +1,48 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from dashboard.models import Category, Product, UserProfile, banner
+from dashboard.services.avatar_services import build_avatar_thumbnail, invalidate_avatar_url
+from dashboard.services.image_services import image_field_post_save
+
+
+# Sent once (after commit) by bulk writes that bypass Product.save, with
+# `product_ids` and `fields`; receivers invalidate catalog caches in one go.
+products_bulk_changed = Signal()
+
+
+@receiver(post_save, sender=User)
+def create_profile_for_new_user(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserProfile.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=UserProfile)
+def refresh_avatar_thumbnail(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = instance.avatar_thumbnail.name if instance.avatar_thumbnail else None
+    if instance.avatar and not instance.avatar._committed:
+        if not build_avatar_thumbnail(instance):
+            instance.avatar_thumbnail = None
+    elif not instance.avatar and instance.avatar_thumbnail:
+        instance.avatar_thumbnail = None
+    if previous and previous != instance.avatar_thumbnail.name:
+        storage = instance.avatar_thumbnail.storage
+        # Remove the old file only once the row no longer points at it.
+        transaction.on_commit(lambda: storage.delete(previous))
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_avatar_on_profile_change(sender, instance, **kwargs):
+    invalidate_avatar_url(instance.user_id)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=banner)
+def build_image_derivatives(sender, instance, **kwargs):
+    image_field_post_save(sender, instance, **kwargs)
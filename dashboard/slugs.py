@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from typing import Callable, Iterable, Sequence
+
+from django.db import IntegrityError, transaction
+from django.db.models import Model, Q
+from django.utils.text import slugify
+
+
+MAX_ATTEMPTS = 3
+
+
+def slug_base(value: str, max_length: int, fallback: str = "item") -> str:
+    return slugify(value)[:max_length].strip("-") or fallback
+
+
+def _candidate(base: str, counter: int, max_length: int) -> str:
+    if counter == 0:
+        return base
+    suffix = f"-{counter}"
+    return f"{base[: max_length - len(suffix)].rstrip('-')}{suffix}"
+
+
+def _taken_slugs(model: type[Model], bases: Iterable[str], field: str, max_length: int, exclude_pk=None) -> set[str]:
+    prefixes = Q()
+    for base in set(bases):
+        # Near max_length a suffix trims the base, so match on the part that survives.
+        prefixes |= Q(**{f"{field}__startswith": base[: max_length - 8] if len(base) > max_length - 8 else base})
+    qs = model._default_manager.filter(prefixes)
+    if exclude_pk is not None:
+        qs = qs.exclude(pk=exclude_pk)
+    return set(qs.values_list(field, flat=True))
+
+
+def allocate_slugs(model: type[Model], values: Sequence[str], field: str = "slug",
+                   reserved: Iterable[str] = (), exclude_pk=None) -> list[str]:
+    """
+    Free slugs for `values`, in order: one query fetches every existing slug
+    sharing a prefix with them, then suffixes (-1, -2, ...) are picked in
+    memory. Slugs in `reserved` are treated as taken.
+    """
+    if not values:
+        return []
+    max_length = model._meta.get_field(field).max_length
+    fallback = model._meta.model_name
+    bases = [slug_base(value, max_length, fallback) for value in values]
+    taken = _taken_slugs(model, bases, field, max_length, exclude_pk) | set(reserved)
+    next_counter: dict[str, int] = {}
+    slugs = []
+    for base in bases:
+        counter = next_counter.get(base, 0)
+        slug = _candidate(base, counter, max_length)
+        while slug in taken:
+            counter += 1
+            slug = _candidate(base, counter, max_length)
+        next_counter[base] = counter + 1
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+def allocate_slug(model: type[Model], value: str, field: str = "slug", exclude_pk=None) -> str:
+    return allocate_slugs(model, [value], field=field, exclude_pk=exclude_pk)[0]
+
+
+def _slug_collision(model: type[Model], field: str, slugs: Iterable[str]) -> bool:
+    return model._default_manager.filter(**{f"{field}__in": list(slugs)}).exists()
+
+
+def save_with_slug(instance: Model, save: Callable[[], None], source: str, field: str = "slug") -> None:
+    """
+    Allocates `instance.<field>` from `instance.<source>` when it is blank and
+    calls `save`, allocating again if a concurrent insert took the slug first.
+    """
+    if getattr(instance, field):
+        save()
+        return
+    model = type(instance)
+    for attempt in range(MAX_ATTEMPTS):
+        slug = allocate_slug(model, getattr(instance, source), field=field, exclude_pk=instance.pk)
+        setattr(instance, field, slug)
+        try:
+            with transaction.atomic():
+                save()
+            return
+        except IntegrityError:
+            setattr(instance, field, "")
+            if attempt == MAX_ATTEMPTS - 1 or not _slug_collision(model, field, [slug]):
+                raise
+
+
+def bulk_create_with_slugs(model: type[Model], objs: list[Model], unslugged: list[Model], source: str = "name",
+                           field: str = "slug", reserved: Iterable[str] = (), batch_size: int | None = None) -> list[Model]:
+    """
+    bulk_create `objs`, allocating slugs for the `unslugged` subset in one
+    pass. A unique violation from a concurrent writer reallocates those slugs
+    and retries the whole insert. Call inside transaction.atomic().
+    """
+    reserved = set(reserved)
+    for attempt in range(MAX_ATTEMPTS):
+        slugs = allocate_slugs(model, [getattr(obj, source) for obj in unslugged], field=field, reserved=reserved)
+        for obj, slug in zip(unslugged, slugs):
+            setattr(obj, field, slug)
+        try:
+            with transaction.atomic():
+                return model._default_manager.bulk_create(objs, batch_size=batch_size)
+        except IntegrityError:
+            if attempt == MAX_ATTEMPTS - 1 or not _slug_collision(model, field, slugs):
+                raise
+    return []
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from dashboard.services import image_services
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def image_url(image, variant: str = "card") -> str:
+    return image_services.variant_url(image, variant)
+
+
+@register.simple_tag
+def image_srcset(image) -> str:
+    return image_services.srcset(image)
+
+
+@register.simple_tag
+def responsive_img(image, variant: str = "card", sizes: str = "", **attrs):
+    """
+    <img> for an ImageField with the WebP variant as src, every variant in
+    srcset and intrinsic width/height. Extra keyword arguments become
+    attributes; loading/decoding default to lazy/async.
+    """
+    entry = image_services.derivatives_for(image).get("variants", {}).get(variant)
+    attrs = {"loading": "lazy", "decoding": "async", **{k.replace("_", "-"): v for k, v in attrs.items()}}
+    attrs["src"] = image_services.variant_url(image, variant)
+    if entry:
+        attrs.update(
+            srcset=image_services.srcset(image),
+            sizes=sizes or image_services.VARIANTS[variant].sizes,
+            width=entry["width"],
+            height=entry["height"],
+        )
+    return format_html("<img{}>", flatatt(attrs))
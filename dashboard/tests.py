@@ -1,3 +1,600 @@
-from django.test import TestCase
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from collections import Counter
+from datetime import timedelta
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from cart.models import CartItem
+from cart.services.cart_services import get_user_cart
+from dashboard.models import Category, Product, UserProfile
+from dashboard import slugs
+from dashboard.services import image_services, product_io
+from dashboard.services.bulk_update_services import apply_stock_price_updates
+from dashboard.signals import products_bulk_changed
+from dashboard.services.avatar_services import AVATAR_THUMBNAIL_SIZE, avatar_url_for
+from dashboard.services.dashboard_services import DashboardChartsServices, DashboardServices
+from minishop import loadtest, profiling
+from minishop.querywatch import NPlusOneError, sql_template, watch_queries
+from payment.models import Address, Order, OrderItem, Payment, Refund
+from shop.cache_versions import get_catalog_version
+from shop.models import LikedProduct, ProductInterest
+from shop.recommendations import get_recommended_products
 
 # Create your tests here.
+
+
+class BenchSessionsCommandTests(TestCase):
+    def test_reports_every_engine_and_flow(self):
+        out = StringIO()
+        call_command(
+            "bench_sessions", engines="cache,signed_cookies", threads=2, iterations=3, json=True, stdout=out
+        )
+        rows = json.loads(out.getvalue())
+        self.assertEqual(
+            {(row["engine"], row["flow"]) for row in rows},
+            {(engine, flow) for engine in ("cache", "signed_cookies") for flow in ("cart", "checkout", "messages")},
+        )
+        self.assertTrue(all(row["lock_errors"] == 0 and row["max_payload_bytes"] > 0 for row in rows))
+
+
+# "SCAN <table>" with no index is a full table scan in EXPLAIN QUERY PLAN.
+_FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+# Whole-table totals for the dashboard cards; a scan is expected there.
+_TOTAL_QUERIES = (
+    'SELECT COUNT(*) AS "__count" FROM "auth_user" WHERE NOT "auth_user"."is_superuser"',
+)
+
+
+@unittest.skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN output is SQLite specific")
+@override_settings(IMAGE_DERIVATIVES_LAZY=False)
+class HotQueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="planner", password="pw-12345")
+        other = User.objects.create_user(username="other", password="pw-12345")
+        category = Category.objects.create(name="Cat P", slug="cat-p")
+        products = [
+            Product.objects.create(
+                name=f"P{i}", slug=f"p-{i}", description="p", price="5.00", quantity=5,
+                category=category, image="product/p.png",
+            )
+            for i in range(4)
+        ]
+        address = Address.objects.create(
+            first_name="A", last_name="B", phone="1", email="a@example.com",
+            country="X", city="Y", postal_code="1", address="Z",
+        )
+        for buyer in (cls.user, other):
+            order = Order.objects.create(
+                user=buyer, address=address, payment=Payment.objects.create(), total_price="10.00"
+            )
+            for product in products[:2] if buyer == cls.user else products:
+                OrderItem.objects.create(order=order, product=product, price="5.00", quantity=1)
+        CartItem.objects.create(
+            user=cls.user, product=products[3], product_name="P3", product_price="5.00"
+        )
+
+    def _full_scans(self, queries):
+        scans = []
+        with connection.cursor() as cursor:
+            for query in queries:
+                sql = query["sql"]
+                if not sql.startswith("SELECT") or " WHERE " not in sql or sql in _TOTAL_QUERIES:
+                    continue
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                for row in cursor.fetchall():
+                    if _FULL_SCAN.match(row[-1]):
+                        scans.append(f"{row[-1]}: {sql}")
+        return scans
+
+    def test_hot_paths_use_indexes(self):
+        request = RequestFactory().get("/")
+        request.user = self.user
+        now = timezone.now()
+        with CaptureQueriesContext(connection) as ctx:
+            list(get_recommended_products(None, n=5))
+            list(get_recommended_products(self.user, n=5))
+            get_user_cart(request)
+            DashboardServices().get_cards()
+            DashboardChartsServices().get_orders_weekly_chart_data()
+            list(CartItem.objects.filter(user=self.user).order_by("-added_at"))
+            list(Order.objects.filter(created_at__gte=now - timedelta(days=1), status="COMPLETED"))
+            Refund.objects.filter(created_at__gte=now - timedelta(days=1)).count()
+        self.assertEqual(self._full_scans(ctx.captured_queries), [])
+
+
+class SeedLoadDataCommandTests(TestCase):
+    def _seed(self, prefix):
+        call_command(
+            "seed_load_data", products=60, users=8, orders=25, interests=40, likes=20,
+            categories=2, batch_size=7, prefix=prefix, seed=7, stdout=StringIO(),
+        )
+
+    def test_seeds_consistent_reproducible_data(self):
+        self._seed("a")
+        self.assertEqual(Product.objects.filter(slug__startswith="a-").count(), 60)
+        self.assertEqual(Order.objects.count(), 25)
+        self.assertTrue(ProductInterest.objects.exists() and LikedProduct.objects.exists())
+        for order in Order.objects.prefetch_related("items"):
+            self.assertEqual(order.total_price, sum(item.total for item in order.items.all()))
+        self.assertEqual(Order.objects.order_by("-id").first().order_number, "ORD-000025")
+
+        self._seed("b")
+        names = lambda prefix: list(
+            Product.objects.filter(slug__startswith=f"{prefix}-").order_by("id").values_list("name", "price")
+        )
+        self.assertEqual(names("a"), names("b"))
+
+
+class LoadTestCommandTests(TransactionTestCase):
+    # Virtual users run on their own threads/connections, so data must be committed.
+    # One user only: the in-memory test database raises "table is locked" under contention.
+    def test_runs_every_scenario_and_reports_endpoints(self):
+        call_command(
+            "seed_load_data", products=20, users=2, orders=5, interests=5, likes=5,
+            categories=1, prefix="lt", stdout=StringIO(),
+        )
+        report_file = os.path.join(tempfile.mkdtemp(), "loadtest.json")
+        call_command(
+            "loadtest", users=1, iterations=25, anonymous_ratio=0, stripe_latency_ms=0,
+            json_out=report_file, stdout=StringIO(),
+        )
+        with open(report_file, encoding="utf-8") as fh:
+            report = json.load(fh)
+        self.assertEqual(report["errors"], 0)
+        self.assertEqual(report["users"], 1)
+        self.assertTrue(report["endpoints"])
+        for stats in report["endpoints"].values():
+            self.assertGreater(stats["requests"], 0)
+            self.assertGreaterEqual(stats["p95_ms"], stats["p50_ms"])
+            self.assertIsNotNone(stats["queries_avg"])
+
+    def test_failing_scenario_is_counted_as_error(self):
+        def broken(vu):
+            vu.get("missing", vu.reverse("no_such_route"))
+
+        catalog = SimpleNamespace(products=[], in_stock=[])
+        with mock.patch.dict(loadtest.SCENARIOS, {"broken": loadtest.Scenario("broken", 1, broken)}), \
+                mock.patch.object(loadtest, "_load_catalog", return_value=catalog):
+            report = loadtest.run_load({
+                "base_url": "", "scenarios": "broken", "seed": 1, "users": 1, "anonymous_ratio": 1,
+                "duration": 0, "iterations": 3, "stripe_latency_ms": 0,
+            })
+        self.assertEqual(report["requests"], 0)
+        self.assertEqual(report["errors"], 3)
+        self.assertEqual(report["scenario_errors"]["broken"]["count"], 3)
+        self.assertIn("NoReverseMatch", report["scenario_errors"]["broken"]["error"])
+        self.assertIn("scenario broken failed 3x", loadtest.format_report(report))
+
+
+def _busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(200))
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.profiles = tempfile.mkdtemp()
+        self.settings_override = override_settings(PROFILING_DIR=self.profiles, PROFILING_INTERVAL_MS=1)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.admin = User.objects.create_superuser(username="profiler", password="pw-12345")
+
+    def test_sampler_collects_collapsed_stacks(self):
+        with profiling.SamplingProfiler(threading.get_ident(), interval=0.001) as profiler:
+            _busy(0.1)
+        self.assertGreater(profiler.samples, 0)
+        self.assertTrue(any("dashboard.tests:_busy" in stack for stack in profiler.stacks))
+
+    def test_only_superusers_can_request_a_profile(self):
+        customer = User.objects.create_user(username="shopper", password="pw-12345")
+        self.client.force_login(customer)
+        self.assertNotIn("X-Profile", self.client.get(reverse("home") + "?_profile=1"))
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse("home"), HTTP_X_PROFILE="1")
+        self.assertRegex(response["X-Profile"], r'route="home"; samples=\d+; dur=[\d.]+')
+
+    def test_max_bytes_caps_appends_and_zero_means_unlimited(self):
+        stacks = Counter({"a:view": 1})
+        with override_settings(PROFILING_MAX_BYTES=1):
+            self.assertTrue(profiling.save_profile("capped", stacks))
+            self.assertFalse(profiling.save_profile("capped", stacks))
+        with override_settings(PROFILING_MAX_BYTES=0):
+            self.assertTrue(profiling.save_profile("capped", stacks))
+            self.assertTrue(profiling.save_profile("capped", stacks))
+
+    def test_dashboard_lists_and_downloads_profiles(self):
+        profiling.save_profile("product_public", Counter({"a:view;b:render": 3, "a:view;c:query": 1}))
+        self.client.force_login(self.admin)
+        self.assertContains(self.client.get(reverse("profiles_list")), "product_public")
+
+        svg = self.client.get(reverse("profile_download", args=["product_public", "svg"]))
+        self.assertEqual(svg["Content-Type"], "image/svg+xml")
+        self.assertIn(b"b:render (3 samples, 75.0%)", svg.content)
+        folded = self.client.get(reverse("profile_download", args=["product_public", "folded"]))
+        self.assertEqual(folded.content.decode(), "a:view;b:render 3\na:view;c:query 1\n")
+
+        self.client.get(reverse("profile_delete", args=["product_public"]))
+        self.assertEqual(self.client.get(reverse("profile_download", args=["product_public", "svg"])).status_code, 404)
+
+
+class QueryWatchTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Cat Q", slug="cat-q")
+        for i in range(6):
+            Product.objects.create(
+                name=f"Q{i}", slug=f"q-{i}", description="q", price="3.00", quantity=2, category=category
+            )
+
+    def test_repeated_query_template_is_reported_with_its_stack(self):
+        with watch_queries(threshold=3, strict=False) as watch:
+            names = [product.category.name for product in Product.objects.all()]
+        self.assertEqual(len(names), 6)
+        [finding] = watch.repeated.values()
+        self.assertEqual(finding.count, 6)
+        self.assertIn('FROM "dashboard_category" WHERE', finding.sql)
+        self.assertTrue(any("test_repeated_query_template_is_reported_with_its_stack" in f for f in finding.stack))
+
+    def test_strict_mode_raises_and_select_related_passes(self):
+        with self.assertRaises(NPlusOneError):
+            with watch_queries(threshold=3, strict=True):
+                [product.category.name for product in Product.objects.all()]
+        with watch_queries(threshold=3, strict=True) as watch:
+            [product.category.name for product in Product.objects.select_related("category")]
+        self.assertEqual(watch.repeated, {})
+
+    def test_in_lists_of_any_length_share_a_template(self):
+        self.assertEqual(
+            sql_template('SELECT 1 FROM "t" WHERE "id" IN (%s, %s) AND "name" = \'x\' LIMIT 21'),
+            sql_template('SELECT 1 FROM "t" WHERE "id" IN (%s, %s, %s) AND "name" = \'y\' LIMIT 5'),
+        )
+        self.assertEqual(
+            sql_template('SELECT 1 FROM "t" WHERE "id" IN (%s)'),
+            sql_template('SELECT 1 FROM "t" WHERE "id" IN (%s, %s)'),
+        )
+
+
+def _png_upload(name="face.png", size=(400, 300)):
+    buffer = BytesIO()
+    Image.new("RGBA", size, (200, 40, 40, 255)).save(buffer, format="PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+class AvatarTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.user = User.objects.create_user(username="avatar-user", password="pw-12345")
+
+    def test_profile_is_created_with_the_user(self):
+        self.assertTrue(UserProfile.objects.filter(user=self.user).exists())
+
+    def test_avatar_url_is_cached_and_reads_never_write(self):
+        with CaptureQueriesContext(connection) as first:
+            url = avatar_url_for(self.user)
+        self.assertTrue(url.endswith("home/images/person_1.jpg"))
+        self.assertEqual(len(first), 1)
+        self.assertTrue(first[0]["sql"].startswith("SELECT"))
+        with self.assertNumQueries(0):
+            self.assertEqual(avatar_url_for(self.user), url)
+
+    def test_upload_builds_thumbnail_and_invalidates_url(self):
+        avatar_url_for(self.user)
+        profile = self.user.profile
+        profile.avatar = _png_upload()
+        profile.save()
+
+        profile.refresh_from_db()
+        with Image.open(profile.avatar_thumbnail.path) as thumb:
+            self.assertEqual(thumb.size, (AVATAR_THUMBNAIL_SIZE, AVATAR_THUMBNAIL_SIZE))
+            self.assertEqual(thumb.format, "JPEG")
+        self.assertEqual(avatar_url_for(self.user), profile.avatar_thumbnail.url)
+
+        profile.avatar = None
+        profile.save()
+        profile.refresh_from_db()
+        self.assertFalse(profile.avatar_thumbnail)
+        self.assertTrue(avatar_url_for(self.user).endswith("home/images/person_1.jpg"))
+
+    def test_replacing_or_clearing_avatar_deletes_old_thumbnail(self):
+        profile = self.user.profile
+        profile.avatar = _png_upload()
+        profile.save()
+        first = profile.avatar_thumbnail.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.avatar = _png_upload()
+            profile.save()
+        second = profile.avatar_thumbnail.path
+        self.assertNotEqual(first, second)
+        self.assertFalse(os.path.exists(first))
+        self.assertTrue(os.path.exists(second))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.avatar = None
+            profile.save()
+        self.assertFalse(os.path.exists(second))
+
+    def test_existing_avatar_without_thumbnail_is_backfilled_once(self):
+        profile = self.user.profile
+        profile.avatar.save("legacy.png", _png_upload(), save=False)
+        UserProfile.objects.filter(pk=profile.pk).update(avatar=profile.avatar.name, avatar_thumbnail=None)
+        cache.clear()
+
+        url = avatar_url_for(self.user)
+        profile.refresh_from_db()
+        self.assertTrue(profile.avatar_thumbnail)
+        self.assertEqual(url, profile.avatar_thumbnail.url)
+
+    def test_profile_page_upload(self):
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse("user_profile"),
+            {"first_name": "Ava", "last_name": "Tar", "avatar": _png_upload()},
+        )
+        self.assertRedirects(response, reverse("user_profile"))
+        self.assertContains(self.client.get(reverse("user_profile")), "avatars/thumbs/face")
+
+
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.settings_override = override_settings(MEDIA_ROOT=tempfile.mkdtemp(), IMAGE_DERIVATIVES_LAZY=True)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        category = Category.objects.create(name="Cat I", slug="cat-i")
+        self.product = Product.objects.create(
+            name="Pic", slug="pic", description="d", price="5.00", quantity=3, category=category,
+            image=_png_upload("pic.png", size=(1200, 800)),
+        )
+
+    def test_upload_builds_content_hashed_webp_variants(self):
+        manifest = image_services.load_manifest(self.product.image.name)
+        self.assertEqual(set(manifest["variants"]), {"thumb", "card", "detail"})
+        detail = manifest["variants"]["detail"]
+        self.assertEqual((detail["width"], detail["height"]), (960, 640))
+        self.assertIn(manifest["hash"], detail["name"])
+        with default_storage.open(detail["name"]) as fh, Image.open(fh) as image:
+            self.assertEqual(image.format, "WEBP")
+
+        _, built = image_services.build_derivatives(self.product.image.name)
+        self.assertFalse(built)
+
+    def test_srcset_tag_renders_variants_without_queries(self):
+        template = Template('{% load image_tags %}{% responsive_img product.image "card" alt=product.name %}')
+        with self.assertNumQueries(0):
+            html = template.render(Context({"product": self.product}))
+        self.assertIn('srcset="/media/derived/', html)
+        self.assertIn("160w", html)
+        self.assertIn("960w", html)
+        self.assertIn('height="320"', html)
+        self.assertIn('width="480"', html)
+        self.assertIn('loading="lazy"', html)
+
+    def test_concurrent_lazy_build_serves_original_until_built(self):
+        image = self.product.image
+        image.name = default_storage.save("product/late.png", _png_upload(size=(600, 400)))
+        lock = f"{image_services._cache_key(image.name)}:building"
+        cache.add(lock, True)
+        with mock.patch.object(image_services, "build_derivatives") as build:
+            self.assertEqual(image_services.variant_url(image, "card"), image.url)
+            self.assertEqual(image_services.derivatives_for(image), {})
+        build.assert_not_called()
+
+        cache.delete(lock)
+        self.assertIn("card", image_services.derivatives_for(image)["variants"])
+        self.assertIsNone(cache.get(lock))
+
+    def test_missing_source_falls_back_to_original_url(self):
+        self.product.image.name = "product/missing.png"
+        with self.assertNoLogs(image_services.__name__, "WARNING"):
+            self.assertEqual(image_services.variant_url(self.product.image, "thumb"), "/media/product/missing.png")
+        self.assertEqual(image_services.derivatives_for(self.product.image), {})
+
+
+class ProcessMediaImagesCommandTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.settings_override = override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        for i in range(3):
+            default_storage.save(f"product/legacy-{i}.png", _png_upload(size=(300 + i, 200)))
+        default_storage.save("banner/hero.png", _png_upload())
+        default_storage.save("banner/broken.jpg", SimpleUploadedFile("broken.jpg", b"not an image"))
+
+    def _run(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command("process_media_images", *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_builds_then_skips_unchanged_images(self):
+        out, err = self._run("--workers", "1")
+        self.assertIn("5 images", out)
+        self.assertIn("4 built, 0 unchanged, 1 failed", out)
+        self.assertIn("banner/broken.jpg", err)
+        self.assertIsNotNone(image_services.load_manifest("product/legacy-2.png"))
+
+        out, _ = self._run("product", "--workers", "1")
+        self.assertIn("0 built, 3 unchanged, 0 failed", out)
+
+    def test_process_pool(self):
+        out, _ = self._run("product", "--workers", "2", "--force")
+        self.assertIn("3 built, 0 unchanged, 0 failed", out)
+        self.assertIsNotNone(image_services.load_manifest("product/legacy-0.png"))
+
+
+class ProductImportExportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name="Tools", slug="tools")
+        Product.objects.create(name="Hammer", slug="hammer", description="d", price="9.00", quantity=1, category=self.category)
+
+    def test_import_creates_updates_and_reports_bad_rows(self):
+        data = (
+            "slug,name,description,price,quantity,category,image\n"
+            "hammer,,,12.50,40,,\n"
+            ",Hammer,steel,5.00,3,tools,\n"
+            ",Hammer,wood,6.00,4,tools,\n"
+            ",Saw,,abc,1,tools,\n"
+            ",Drill,,30,2,garden,\n"
+            ",Level,,,5,,\n"
+        )
+        errors = StringIO()
+        with self.assertNumQueries(9):
+            result = product_io.import_products(StringIO(data), "csv", batch_size=3, errors_out=errors)
+
+        self.assertEqual(result.as_dict(), {"processed": 6, "created": 2, "updated": 1, "failed": 3})
+        hammer = Product.objects.get(slug="hammer")
+        self.assertEqual((str(hammer.price), hammer.quantity, hammer.description), ("12.50", 40, "d"))
+        self.assertEqual(
+            sorted(Product.objects.filter(name="Hammer").values_list("slug", "description")),
+            [("hammer", "d"), ("hammer-1", "steel"), ("hammer-2", "wood")],
+        )
+        lines = errors.getvalue().splitlines()
+        self.assertEqual(lines[0], "line,slug,name,error")
+        self.assertTrue(lines[1].startswith("5,,Saw,price:"))
+        self.assertIn("unknown slug 'garden'", lines[2])
+        self.assertIn("missing price for a new product", lines[3])
+
+    def test_jsonl_import_and_streaming_export_round_trip(self):
+        admin = User.objects.create_superuser(username="io-admin", password="pw-12345")
+        data = '{"name": "Wrench", "price": "4.25", "quantity": 7, "category": "tools"}\nnot json\n'
+        result = product_io.import_products(StringIO(data), "jsonl")
+        self.assertEqual((result.created, result.failed), (1, 1))
+
+        self.client.force_login(admin)
+        response = self.client.get(reverse("product_export"), {"format": "jsonl", "category": "tools"})
+        self.assertTrue(response.streaming)
+        records = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([r["slug"] for r in records], ["hammer", "wrench"])
+        self.assertEqual(records[1]["price"], "4.25")
+
+        csv_export = b"".join(self.client.get(reverse("product_export")).streaming_content).decode()
+        result = product_io.import_products(StringIO(csv_export), "csv")
+        self.assertEqual((result.created, result.updated, result.failed), (0, 2, 0))
+
+    def test_dashboard_upload_offers_error_file(self):
+        admin = User.objects.create_superuser(username="io-admin", password="pw-12345")
+        self.client.force_login(admin)
+        upload = SimpleUploadedFile("products.csv", b"name,price,quantity\nBolt,1.00,10\nNut,x,1\n")
+        with override_settings(PRODUCT_IMPORT_DIR=tempfile.mkdtemp()):
+            response = self.client.post(reverse("product_import"), {"file": upload})
+            self.assertContains(response, "2 rows: 1 created, 0 updated, 1 failed")
+            errors_name = response.context["errors_name"]
+            download = self.client.get(reverse("product_import_errors", args=[errors_name]))
+            self.assertIn(b"Nut", b"".join(download.streaming_content))
+        self.assertTrue(Product.objects.filter(slug="bolt").exists())
+
+
+class SlugAllocatorTests(TestCase):
+    def test_batch_allocation_uses_one_query(self):
+        Product.objects.create(name="Lamp", description="d", price="1.00", quantity=1)
+        Product.objects.create(name="Lamp", description="d", price="1.00", quantity=1)
+        with self.assertNumQueries(1):
+            allocated = slugs.allocate_slugs(Product, ["Lamp", "Lamp", "Desk", "Lamp Shade"])
+        self.assertEqual(allocated, ["lamp-2", "lamp-3", "desk", "lamp-shade"])
+        self.assertEqual(sorted(Product.objects.values_list("slug", flat=True)), ["lamp", "lamp-1"])
+
+    def test_suffixes_respect_max_length(self):
+        name = "x" * 80
+        first = Category.objects.create(name=name)
+        second = Category.objects.create(name=name, parent=first)
+        self.assertEqual(len(first.slug), 50)
+        self.assertEqual(second.slug, "x" * 48 + "-1")
+
+    def test_save_retries_when_a_concurrent_insert_takes_the_slug(self):
+        Product.objects.create(name="Chair", description="d", price="1.00", quantity=1)
+        real_allocate = slugs.allocate_slug
+        calls = []
+
+        def stale_then_real(*args, **kwargs):
+            calls.append(args)
+            return "chair" if len(calls) == 1 else real_allocate(*args, **kwargs)
+
+        with mock.patch.object(slugs, "allocate_slug", side_effect=stale_then_real):
+            product = Product.objects.create(name="Chair", description="d", price="1.00", quantity=1)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(product.slug, "chair-1")
+
+
+class BulkStockPriceUpdateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.products = [
+            Product.objects.create(name=f"Bulk {i}", description="d", price="10.00", quantity=5) for i in range(4)
+        ]
+        self.admin = User.objects.create_superuser(username="bulk-admin", password="pw-12345")
+
+    def test_endpoint_applies_changes_with_one_invalidation(self):
+        events = []
+        products_bulk_changed.connect(lambda **kw: events.append(kw), weak=False, dispatch_uid="bulk-test")
+        self.addCleanup(products_bulk_changed.disconnect, dispatch_uid="bulk-test")
+        cache.set("recs:anon:5", [1, 2, 3])
+        version = get_catalog_version()
+        first, second, third, _ = self.products
+        changes = [
+            {"id": first.id, "price": "12.00", "quantity": 0},
+            {"slug": second.slug, "quantity": 9},
+            {"id": third.id, "price": "10.00"},
+            {"slug": "nope", "price": "1"},
+            {"id": first.id, "price": "-1"},
+        ]
+        self.client.force_login(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("product_bulk_update"), json.dumps({"changes": changes}), content_type="application/json"
+            )
+        body = response.json()
+        self.assertEqual((body["received"], body["updated"], body["unchanged"], body["failed"]), (5, 2, 1, 2))
+        self.assertEqual([e["index"] for e in body["errors"]], [3, 4])
+
+        first.refresh_from_db()
+        self.assertEqual((str(first.price), first.quantity), ("12.00", 0))
+        self.assertEqual(Product.objects.get(pk=second.pk).quantity, 9)
+        self.assertEqual(len(events), 1)
+        self.assertEqual(sorted(events[0]["product_ids"]), sorted([first.id, second.id]))
+        self.assertEqual(events[0]["fields"], {"price", "quantity"})
+        self.assertGreater(get_catalog_version(), version)
+        self.assertIsNone(cache.get("recs:anon:5"))
+
+    def test_write_query_count_does_not_grow_per_product(self):
+        changes = [{"id": p.id, "quantity": 50} for p in self.products]
+        with CaptureQueriesContext(connection) as ctx:
+            result = apply_stock_price_updates(changes, chunk_size=500)
+        self.assertEqual(result.updated, 4)
+        writes = [q for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(writes), 1)
+
+    def test_command_dry_run_writes_nothing(self):
+        path = os.path.join(tempfile.mkdtemp(), "changes.csv")
+        with open(path, "w") as fh:
+            fh.write(f"slug,price,quantity\n{self.products[0].slug},99.00,\n")
+        out = StringIO()
+        call_command("bulk_update_products", path, "--dry-run", stdout=out)
+        self.assertIn("1 updated, 0 unchanged, 0 failed (dry run)", out.getvalue())
+        self.assertEqual(str(Product.objects.get(pk=self.products[0].pk).price), "10.00")
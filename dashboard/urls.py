@@ -45,6 +45,10 @@ urlpatterns = [
     path('product/create/', views.product_create, name='product_create'),
     path('product/list/', views.product_list_page, name='product_list'),
     path('product/data/', views.ProductList.as_view(), name='product_list_data'),   # JSON Data
+    path('product/import/', views.product_import, name='product_import'),
+    path('product/import/<str:name>/', views.product_import_errors, name='product_import_errors'),
+    path('product/export/', views.product_export, name='product_export'),
+    path('product/bulk-update/', views.product_bulk_update, name='product_bulk_update'),
     path('product/<int:pk>/update/', views.product_update, name='product_update'),
     path('product/<int:pk>/delete/', views.product_delete, name='product_delete'),
     ### Product Section End ###
@@ -54,4 +58,10 @@ urlpatterns = [
     path('orders/data/', views.OrdersListData.as_view(), name='orders_list_data'),   # JSON Data
     path('orders/<uuid:pk>/details/', views.order_details, name='order_details'),
     ### Orders Section End ###
+
+    ### Profiles Section ###
+    path('profiles/', views.profiles_list, name='profiles_list'),
+    path('profiles/<str:name>/delete/', views.profile_delete, name='profile_delete'),
+    path('profiles/<str:name>/<str:fmt>/', views.profile_download, name='profile_download'),
+    ### Profiles Section End ###
 ]
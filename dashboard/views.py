@@ -5,10 +5,14 @@ from django.contrib import messages
 from django.contrib.auth import  login as auth_login, logout as auth_logout
 from .models import (navbar, banner, services, Category, Product )
 from payment.models import Order
-from .forms import (navbarForm, bannerForm, servicesForm, CategoryForm, productForm)
+from .forms import (navbarForm, bannerForm, servicesForm, CategoryForm, productForm, ProductImportForm)
 from django.db.models import Count
 from dashboard.services.orders_services import OrdersServices
 from .services.dashboard_services import DashboardServices, DashboardChartsServices
+from .services.image_services import variant_url
+from .services import product_io
+from .services.bulk_update_services import apply_stock_price_updates
+from django.views.decorators.http import require_POST
 from django_datatables_view.base_datatable_view import BaseDatatableView
 from django.urls import reverse
 from django.utils.html import format_html
@@ -17,12 +21,19 @@ from dashboard.models import Notification
 from django.db.models import Q
 from django.db.models import Sum
 from django.contrib.humanize.templatetags.humanize import intcomma
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.forms import PasswordChangeForm
 
 from .forms import UserProfileDetailsForm, UserProfileForm, UserSettingsForm
 from .models import UserProfile
+import json
+import re
+from datetime import datetime
+from pathlib import Path
+from django.conf import settings
+from django.utils import timezone
+from minishop import profiling
 
 # Create your views here.
 
@@ -93,7 +104,10 @@ def user_profile(request):
     Basic profile page (read-only for now).
     """
     user = request.user
-    profile, _ = UserProfile.objects.get_or_create(user=user)
+    try:
+        profile = user.profile
+    except UserProfile.DoesNotExist:
+        profile = UserProfile.objects.create(user=user)
 
     if request.method == "POST":
         details_form = UserProfileDetailsForm(request.POST, instance=user)
@@ -126,7 +140,6 @@ def user_settings(request):
     Settings page placeholder (keeps nav working; extend later).
     """
     user = request.user
-    UserProfile.objects.get_or_create(user=user)
 
     if request.method == "POST":
         action = (request.POST.get("action") or "").strip()
@@ -389,6 +402,8 @@ class ProductList(BaseDatatableView):
     columns = ['Sno','image', 'title', 'price', 'quantity', 'category', 'created_at', 'updated_at', 'action']
     order_columns = ['id','image', 'name', 'price', 'quantity', 'category', 'created_at', 'updated_at', 'action']
     search_fields = ['name', 'price', 'quantity', 'category__name', 'created_at', 'updated_at']
+    def get_initial_queryset(self):
+        return Product.objects.select_related('category')
     def filter_queryset(self, qs):
         search_value = self.request.GET.get('search[value]', None)
         if search_value:
@@ -413,7 +428,7 @@ class ProductList(BaseDatatableView):
         elif column == 'image':
             return format_html(
                 '<img src="{}" class="img-thumbnail" width="150" alt="Current Image">', 
-                row.image.url
+                variant_url(row.image, "thumb")
             )
         else:
             return super().render_column(row, column)
@@ -465,6 +480,88 @@ def product_update(request, pk):
     }
     return render(request, 'dashboard/admin_pages/product/create.html', context)
 
+@login_required
+@user_passes_test(is_admin)
+def product_import(request):
+    result = None
+    errors_name = None
+    if request.method == "POST":
+        form = ProductImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            import_dir = Path(settings.PRODUCT_IMPORT_DIR)
+            import_dir.mkdir(parents=True, exist_ok=True)
+            errors_name = f"errors-{timezone.now():%Y%m%dT%H%M%S%f}.csv"
+            errors_path = import_dir / errors_name
+            try:
+                with open(errors_path, 'w', newline='', encoding='utf-8') as errors_out:
+                    result = product_io.ProductImporter(
+                        errors_out=errors_out, dry_run=form.cleaned_data['dry_run'],
+                    ).run(product_io.text_stream(upload.file), product_io.detect_format(upload.name))
+            except UnicodeDecodeError:
+                form.add_error('file', "The file must be UTF-8 encoded.")
+            if result is None or not result.failed:
+                errors_path.unlink(missing_ok=True)
+                errors_name = None
+            if result is not None:
+                messages.success(
+                    request,
+                    f"{result.processed} rows: {result.created} created, {result.updated} updated, {result.failed} failed",
+                )
+    else:
+        form = ProductImportForm()
+    context={
+        'form': form,
+        'result': result,
+        'errors_name': errors_name,
+    }
+    return render(request, 'dashboard/admin_pages/product/import.html', context)
+
+@login_required
+@user_passes_test(is_admin)
+def product_import_errors(request, name):
+    if not re.fullmatch(r'errors-\d{8}T\d{12}\.csv', name):
+        raise Http404("No such file")
+    path = Path(settings.PRODUCT_IMPORT_DIR) / name
+    if not path.is_file():
+        raise Http404("No such file")
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=name, content_type='text/csv')
+
+@login_required
+@user_passes_test(is_admin)
+def product_export(request):
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in product_io.FORMATS:
+        raise Http404("Unknown format")
+    rows = product_io.export_queryset(
+        category=request.GET.get('category', ''),
+        query=request.GET.get('q', ''),
+        in_stock=request.GET.get('in_stock') == '1',
+    )
+    content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(product_io.export_lines(rows, fmt), content_type=f'{content_type}; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="products-{timezone.now():%Y%m%d}.{fmt}"'
+    return response
+
+@login_required
+@user_passes_test(is_admin)
+@require_POST
+def product_bulk_update(request):
+    """
+    JSON body: {"changes": [{"id" or "slug", "price", "quantity"}, ...], "dry_run": false}.
+    """
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    changes = payload.get('changes') if isinstance(payload, dict) else None
+    if not isinstance(changes, list):
+        return JsonResponse({'error': '"changes" must be a list'}, status=400)
+    if len(changes) > settings.PRODUCT_BULK_UPDATE_MAX:
+        return JsonResponse({'error': f'At most {settings.PRODUCT_BULK_UPDATE_MAX} changes per request'}, status=400)
+    result = apply_stock_price_updates(changes, dry_run=bool(payload.get('dry_run')))
+    return JsonResponse(result.as_dict())
+
 ### Product Section End ###
 
 
@@ -479,6 +576,8 @@ class OrdersListData(BaseDatatableView):
     columns = ['Sno', 'order', 'customer', 'status', 'payment', 'total', 'date', 'action']
     order_columns = ['id','', 'order_number', 'address__first_name', 'status', 'address__method', 'total_price', 'created_at', ''] 
     search_fields = ['order_number', 'address__first_name', 'address__email', 'status', 'address__method', 'total_price', 'created_at']
+    def get_initial_queryset(self):
+        return Order.objects.select_related('address')
     def filter_queryset(self, qs):
         search_value = self.request.GET.get('search[value]', None)
         if search_value:
@@ -552,3 +651,43 @@ def order_details(request, pk):
     }
     return render(request, 'dashboard/admin_pages/orders/details.html', context)
 ### Orders Section End ###
+
+### Profiles Section ###
+@login_required
+@user_passes_test(is_admin)
+def profiles_list(request):
+    data = profiling.list_profiles()
+    for item in data:
+        item['modified'] = datetime.fromtimestamp(item['modified'], tz=timezone.get_current_timezone())
+    context={
+        'data':data,
+        'sample_every': settings.PROFILING_SAMPLE_EVERY,
+    }
+    return render(request, 'dashboard/admin_pages/profiles/list.html', context)
+
+@login_required
+@user_passes_test(is_admin)
+def profile_download(request, name, fmt):
+    if fmt not in ('svg', 'folded'):
+        raise Http404("Unknown format")
+    try:
+        stacks = profiling.load_profile(name)
+    except FileNotFoundError:
+        raise Http404("No such profile")
+    if fmt == 'svg':
+        response = HttpResponse(profiling.flamegraph_svg(stacks, title=name), content_type='image/svg+xml')
+    else:
+        response = HttpResponse(profiling.folded_text(stacks), content_type='text/plain; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{name}.{fmt}"'
+    return response
+
+@login_required
+@user_passes_test(is_admin)
+def profile_delete(request, name):
+    try:
+        profiling.delete_profile(name)
+    except FileNotFoundError:
+        raise Http404("No such profile")
+    messages.success(request, "Profile Deleted")
+    return redirect('profiles_list')
+### Profiles Section End ###
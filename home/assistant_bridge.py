@@ -1,12 +1,28 @@
 from __future__ import annotations
 
+import hashlib
+import json
 from dataclasses import dataclass
 from decimal import Decimal, InvalidOperation
+from typing import AsyncIterator
 
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
 from django.db.models import Q
 from django.urls import reverse
 
+from cart.services.cart_services import add_product_to_cart_service, get_cart_summary, get_user_cart
 from dashboard.models import Product
+from dashboard.services.image_services import variant_url
+from minishop.db_routers import read_replica
+from shop.cache_versions import get_catalog_version
+
+
+RESULT_CACHE_TIMEOUT = 300
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
+SEARCH_LIMIT = 8
+MAX_INTENTS = 5
+CART_INTENTS = {"cart_show", "cart_add"}
 
 
 @dataclass(frozen=True)
@@ -39,12 +55,62 @@ def _to_int(value) -> int | None:
     return None
 
 
-def _product_url(request, product: Product) -> str:
-    return request.build_absolute_uri(reverse("product_public", kwargs={"slug": product.slug}))
+def _card_key(product_id: int) -> str:
+    return f"assistant:card:{product_id}"
+
+
+def build_product_card(product: Product) -> dict:
+    """Request-independent card payload; URLs are made absolute per request."""
+    return {
+        "id": product.id,
+        "name": product.name,
+        "description": product.description,
+        "price": str(product.price),
+        "image_url": variant_url(product.image, "card") if getattr(product, "image", None) else "",
+        "product_url": reverse("product_public", kwargs={"slug": product.slug}),
+        "add_to_cart_url": reverse("cart_add", kwargs={"product_id": product.id}),
+    }
+
+
+def store_product_card(product: Product) -> None:
+    cache.set(_card_key(product.id), build_product_card(product), CARD_CACHE_TIMEOUT)
+
+
+def invalidate_product_cards(product_ids) -> None:
+    cache.delete_many([_card_key(product_id) for product_id in product_ids])
+
+
+def _product_cards(product_ids: list[int]) -> list[dict]:
+    cached = cache.get_many([_card_key(product_id) for product_id in product_ids])
+    cards = {card["id"]: card for card in cached.values()}
+    missing = [product_id for product_id in product_ids if product_id not in cards]
+    if missing:
+        with read_replica():
+            products = Product.objects.in_bulk(missing)
+        fresh = {product_id: build_product_card(product) for product_id, product in products.items()}
+        cache.set_many({_card_key(product_id): card for product_id, card in fresh.items()}, CARD_CACHE_TIMEOUT)
+        cards.update(fresh)
+    return [cards[product_id] for product_id in product_ids if product_id in cards]
 
 
-def _add_to_cart_url(request, product: Product) -> str:
-    return request.build_absolute_uri(reverse("cart_add", kwargs={"product_id": product.id}))
+def _absolute(request, card: dict) -> dict:
+    card = dict(card)
+    for name in ("image_url", "product_url", "add_to_cart_url"):
+        if card[name]:
+            card[name] = request.build_absolute_uri(card[name])
+    return card
+
+
+def _normalise(value) -> str:
+    if isinstance(value, Decimal):
+        return format(value.normalize(), "f")
+    return " ".join(str(value or "").lower().split())
+
+
+def _result_key(entities: AssistantEntities, query: str, limit: int) -> str:
+    parts = [query, entities.category, entities.min_price, entities.max_price, limit]
+    digest = hashlib.sha1("\x1f".join(_normalise(part) for part in parts).encode()).hexdigest()
+    return f"assistant:q:{get_catalog_version()}:{digest}"
 
 
 def validate_intent(intent: str) -> str:
@@ -77,12 +143,33 @@ def coerce_entities(raw: dict) -> AssistantEntities:
     )
 
 
-def search_products(request, *, entities: AssistantEntities, limit: int = 8) -> list[dict]:
-    q = (entities.query or "").strip()
+def search_product_ids(entities: AssistantEntities, limit: int = 8) -> list[int]:
+    """
+    Ids of matching in-stock products, cached per normalised (query,
+    category, price range) and catalog version.
+    """
+    q = " ".join((entities.query or "").split())
     if not q:
         return []
+    limit = max(1, min(int(limit), 10))
+    key = _result_key(entities, q, limit)
+    product_ids = cache.get(key)
+    if product_ids is None:
+        product_ids = _search_product_ids(entities, q, limit)
+        cache.set(key, product_ids, RESULT_CACHE_TIMEOUT)
+    return product_ids
+
+
+def search_products(request, *, entities: AssistantEntities, limit: int = 8) -> list[dict]:
+    """
+    Matching products as chatbot cards. Result ids and cards are both
+    cached, so a repeated question needs no queries.
+    """
+    return [_absolute(request, card) for card in _product_cards(search_product_ids(entities, limit))]
 
-    qs = Product.objects.select_related("category").filter(quantity__gt=0)
+
+def _search_product_ids(entities: AssistantEntities, q: str, limit: int) -> list[int]:
+    qs = Product.objects.filter(quantity__gt=0)
     if entities.category:
         qs = qs.filter(category__name__icontains=entities.category)
     if entities.min_price is not None:
@@ -94,21 +181,116 @@ def search_products(request, *, entities: AssistantEntities, limit: int = 8) ->
         Q(name__icontains=q) | Q(description__icontains=q) | Q(category__name__icontains=q)
     ).order_by("-updated_at")
 
-    products = list(qs[: max(1, min(int(limit), 10))])
-    payload: list[dict] = []
-    for p in products:
-        image_url = p.image.url if getattr(p, "image", None) else ""
-        if image_url:
-            image_url = request.build_absolute_uri(image_url)
-        payload.append(
+    with read_replica():
+        return list(qs.values_list("id", flat=True)[:limit])
+
+
+def cart_summary_payload(request) -> dict:
+    summary = get_cart_summary(request)
+    return {"count": summary["count"], "total": f"{summary['total']:.2f}"}
+
+
+def _cart_contents(request) -> dict:
+    items, total = get_user_cart(request)
+    return {
+        "count": len(items),
+        "total": f"{total:.2f}",
+        "items": [
             {
-                "id": p.id,
-                "name": p.name,
-                "description": p.description,
-                "price": str(p.price),
-                "image_url": image_url,
-                "product_url": _product_url(request, p),
-                "add_to_cart_url": _add_to_cart_url(request, p),
+                "id": item["id"],
+                "name": item["name"],
+                "quantity": item["quantity"],
+                "price": f"{item['price']:.2f}",
+                "total": f"{item['total']:.2f}",
+                "image_url": request.build_absolute_uri(item["image"]) if item["image"] else "",
             }
+            for item in items
+        ],
+    }
+
+
+def _search_reply(entities: AssistantEntities, found: bool) -> str:
+    if not entities.query:
+        return "Tell me what you’re looking for (for example: “laptops under $500”)."
+    if not found:
+        return "I couldn’t find a matching product. Try different keywords or adjust your budget."
+    return f"Here are the products I found for “{entities.query}”:"
+
+
+def run_intent(request, intent: str, entities: AssistantEntities) -> dict:
+    """
+    Executes one validated intent for the current visitor and returns
+    {"intent", "ok", "reply", "products"} plus "cart" for cart intents.
+    """
+    result = {"intent": intent, "ok": True, "reply": "", "products": []}
+    if intent == "cart_show":
+        cart = _cart_contents(request)
+        result["cart"] = cart
+        result["reply"] = (
+            f"You have {cart['count']} item(s) in your cart, totalling ${cart['total']}."
+            if cart["count"] else "Your cart is empty."
         )
-    return payload
+        return result
+
+    if intent == "cart_add":
+        if entities.product_id is None:
+            result.update(ok=False, reply="Tell me which product to add to your cart.")
+        else:
+            ok, message = add_product_to_cart_service(request, entities.product_id)
+            result.update(ok=ok, reply=message)
+        result["cart"] = cart_summary_payload(request)
+        return result
+
+    result["products"] = search_products(request, entities=entities, limit=SEARCH_LIMIT)
+    result.update(ok=bool(result["products"]), reply=_search_reply(entities, bool(result["products"])))
+    return result
+
+
+def run_intents(request, raw_intents: list) -> dict:
+    """Runs a batch of {"intent", "entities"} objects in order; the cart summary reflects the whole batch."""
+    results = []
+    for raw in raw_intents:
+        raw = raw if isinstance(raw, dict) else {}
+        results.append(run_intent(request, validate_intent(raw.get("intent")), coerce_entities(raw.get("entities"))))
+    response = {"results": results}
+    if any(result["intent"] in CART_INTENTS for result in results):
+        response["cart"] = cart_summary_payload(request)
+    return response
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_result(result: dict) -> AsyncIterator[str]:
+    """Replays an already executed intent as reply, product and done events."""
+    products = result.get("products", [])
+    yield sse_event("reply", {k: v for k, v in result.items() if k != "products"})
+    for card in products:
+        yield sse_event("product", card)
+    yield sse_event("done", {"count": len(products)})
+
+
+async def stream_search(request, entities: AssistantEntities, limit: int = SEARCH_LIMIT) -> AsyncIterator[str]:
+    """
+    Search as server-sent events: the reply goes out once the matching ids
+    are known, then one event per card. Cached cards are sent straight
+    away; the first cache miss resolves the remaining cards in one query.
+    """
+    product_ids = await sync_to_async(search_product_ids)(entities, limit)
+    yield sse_event("reply", {
+        "intent": "search",
+        "ok": bool(product_ids),
+        "reply": _search_reply(entities, bool(product_ids)),
+    })
+    cards = {card["id"]: card for card in (await cache.aget_many([_card_key(pid) for pid in product_ids])).values()}
+    sent, resolved = 0, False
+    for index, product_id in enumerate(product_ids):
+        if product_id not in cards and not resolved:
+            fresh = await sync_to_async(_product_cards)(product_ids[index:])
+            cards.update((card["id"], card) for card in fresh)
+            resolved = True
+        if product_id in cards:
+            sent += 1
+            yield sse_event("product", _absolute(request, cards[product_id]))
+    yield sse_event("done", {"count": sent})
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+
+from django.core.cache import cache
+
+from dashboard.models import Category
+from shop.cache_versions import get_category_tree_version
+
+
+MAX_MESSAGE_LENGTH = 500
+
+_NUMBER = r"\$?\s*(\d{1,3}(?:,\d{3})+|\d+)(?:\.(\d{1,2}))?\s*(k\b)?"
+_RANGE_RE = re.compile(rf"\b(?:between|from)\s+{_NUMBER}\s*(?:and|to|-)\s*{_NUMBER}")
+# "13 to 15" or "20-50" alone could be model numbers or sizes; only a "$" or a price word makes it a price.
+_BARE_RANGE_RE = re.compile(rf"{_NUMBER}\s*(?:-|to)\s*{_NUMBER}")
+_PRICE_WORD_RE = re.compile(r"\b(?:price[sd]?|priced|budget|dollars?|usd|bucks)\b")
+_MAX_RE = re.compile(rf"(?:\b(?:under|below|less\s+than|cheaper\s+than|up\s+to|at\s+most|max(?:imum)?|within)\b|<=?)\s*{_NUMBER}")
+_MIN_RE = re.compile(rf"(?:\b(?:over|above|more\s+than|at\s+least|min(?:imum)?|starting\s+at)\b|>=?)\s*{_NUMBER}")
+
+_CART_SHOW_RE = re.compile(
+    r"\b(?:show|view|see|open|check|display)\b.*\b(?:cart|basket|bag)\b"
+    r"|\bwhat'?s\s+in\s+(?:my\s+)?(?:cart|basket|bag)\b"
+    r"|^\s*(?:my\s+)?(?:cart|basket)\s*\??\s*$"
+)
+_CART_ADD_RE = re.compile(r"\b(?:add|put)\b.*\b(?:cart|basket|bag)\b|^\s*(?:add|buy)\b")
+_PRODUCT_ID_RE = re.compile(r"(?:#|\b(?:product|item|id)\s*#?\s*)(\d+)\b")
+_GREETING_RE = re.compile(r"^\s*(?:hi|hello|hey|thanks|thank\s+you|good\s+(?:morning|afternoon|evening))\b[\s!.]*$")
+
+_FILLER_RE = re.compile(
+    r"\b(?:show|find|search|get|give|want|need|looking|look|buy|recommend|suggest|see|browse|any|some|a|an|the|"
+    r"me|i|i'?m|for|please|pls|do|you|have|got|is|are|there|can|could|would|like|to|in|of|with|on|my|"
+    r"products?|items?|things?|stuff|price[sd]?|priced|budget|dollars?|usd|bucks|cheap|add|cart|basket)\b"
+)
+_PUNCT_RE = re.compile(r"[^\w\s'-]+")
+_SHOPPING_RE = re.compile(r"\b(?:show|find|search|looking|look|need|want|buy|recommend|suggest|browse|any|have|got|get)\b")
+
+
+@dataclass(frozen=True)
+class ParsedMessage:
+    intent: str
+    entities: dict = field(default_factory=dict)
+    confident: bool = False
+
+
+def _amount(whole: str, cents: str | None, thousands: str | None) -> Decimal | None:
+    try:
+        value = Decimal(whole.replace(",", "") + (f".{cents}" if cents else ""))
+    except InvalidOperation:
+        return None
+    return value * 1000 if thousands else value
+
+
+def _price_terms(text: str) -> tuple[Decimal | None, Decimal | None, str]:
+    """(min_price, max_price, text without the matched price phrases)."""
+    min_price = max_price = None
+    match = _RANGE_RE.search(text)
+    if not match:
+        match = _BARE_RANGE_RE.search(text)
+        if match and "$" not in match.group(0) and not _PRICE_WORD_RE.search(text):
+            match = None
+    if match:
+        groups = match.groups()
+        low, high = _amount(*groups[0:3]), _amount(*groups[3:6])
+        if low is not None and high is not None:
+            min_price, max_price = min(low, high), max(low, high)
+        return min_price, max_price, text[:match.start()] + " " + text[match.end():]
+    match = _MAX_RE.search(text)
+    if match:
+        max_price = _amount(*match.groups())
+        text = text[:match.start()] + " " + text[match.end():]
+    match = _MIN_RE.search(text)
+    if match:
+        min_price = _amount(*match.groups())
+        text = text[:match.start()] + " " + text[match.end():]
+    return min_price, max_price, text
+
+
+def _variants(term: str) -> set[str]:
+    variants = {term}
+    if term.endswith("ies"):
+        variants.add(term[:-3] + "y")
+    elif term.endswith("es"):
+        variants.update((term[:-2], term[:-1]))
+    elif term.endswith("s"):
+        variants.add(term[:-1])
+    else:
+        variants.add(term + "s")
+    return {variant for variant in variants if len(variant) > 2}
+
+
+def category_gazetteer() -> dict[str, str]:
+    """term -> category name for every category, cached until the category tree changes."""
+    def build():
+        terms = {}
+        for name, slug in Category.objects.values_list("name", "slug"):
+            for source in (name.lower(), slug.replace("-", " ")):
+                for term in _variants(" ".join(source.split())):
+                    terms.setdefault(term, name)
+        return terms
+
+    return cache.get_or_set(f"assistant:gazetteer:{get_category_tree_version()}", build)
+
+
+@lru_cache(maxsize=4)
+def _gazetteer_pattern(version: int) -> tuple[re.Pattern | None, dict[str, str]]:
+    terms = category_gazetteer()
+    if not terms:
+        return None, terms
+    # Longest terms first so "gaming laptops" wins over "laptops".
+    alternation = "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+    return re.compile(rf"\b(?:{alternation})\b"), terms
+
+
+def _match_category(text: str) -> tuple[str | None, str | None]:
+    pattern, terms = _gazetteer_pattern(get_category_tree_version())
+    match = pattern.search(text) if pattern else None
+    if not match:
+        return None, None
+    return terms[match.group(0)], match.group(0)
+
+
+def parse_message(message: str) -> ParsedMessage:
+    """
+    Extracts intent and entities from free text with regexes and the
+    category gazetteer. `confident` is False when nothing actionable was
+    found, so the caller can fall back to the remote model.
+    """
+    text = " ".join(str(message or "")[:MAX_MESSAGE_LENGTH].lower().split())
+    if not text or _GREETING_RE.match(text):
+        return ParsedMessage("search", {"query": None}, confident=bool(text))
+
+    if _CART_SHOW_RE.search(text) and not _CART_ADD_RE.search(text):
+        return ParsedMessage("cart_show", {}, confident=True)
+
+    if _CART_ADD_RE.search(text):
+        match = _PRODUCT_ID_RE.search(text)
+        if match:
+            return ParsedMessage("cart_add", {"product_id": int(match.group(1))}, confident=True)
+
+    min_price, max_price, rest = _price_terms(text)
+    category, term = _match_category(rest)
+    query = " ".join(_FILLER_RE.sub(" ", _PUNCT_RE.sub(" ", rest)).split()) or term
+    # Only filter by category when it is all that was asked for ("laptop bags" is not a Laptops search);
+    # the query then becomes the category name, since "laptops" need not appear in a Laptop product's text.
+    category_only = bool(term) and query == term
+    entities = {
+        "query": category if category_only else query or None,
+        "category": category if category_only else None,
+        "min_price": str(min_price) if min_price is not None else None,
+        "max_price": str(max_price) if max_price is not None else None,
+    }
+    # A bare phrase ("tell me a joke") is left to the remote model unless it reads like shopping.
+    shopping = term or min_price is not None or max_price is not None or _SHOPPING_RE.search(text)
+    return ParsedMessage("search", entities, confident=bool(query and shopping))
@@ -1,11 +1,16 @@
-from django.conf import settings
-from cart.models import CartItem
+from django.utils.functional import SimpleLazyObject
+from cart.services.cart_services import get_cart_count, get_cart_summary
+from home.page_cache import CART_COUNT_HOLE, CSRF_TOKEN_HOLE, is_filling_page_cache
 def landing_page(request):
-    if request.user.is_authenticated:
-        count= CartItem.objects.filter(user=request.user).count()
-    else:    
-        cart = request.session.get('cart', {})
-        count = len(cart)
+    if is_filling_page_cache(request):
+        # Rendering a shared anonymous page: leave holes for per-visitor values.
+        return {
+            'cart_count': CART_COUNT_HOLE,
+            'csrf_token': CSRF_TOKEN_HOLE,
+        }
+    # Lazy: pages that never show the header badge (dashboard, chatbot iframe)
+    # don't pay for the cart lookup at all.
     return {
-        'cart_count': count
-    }
\ No newline at end of file
+        'cart_count': SimpleLazyObject(lambda: get_cart_count(request)),
+        'cart_summary': SimpleLazyObject(lambda: get_cart_summary(request)),
+    }
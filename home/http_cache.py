@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from dashboard.models import Product
+from shop.cache_versions import (
+    get_catalog_version,
+    get_category_tree_version,
+    get_user_generation,
+    version_to_datetime,
+)
+from shop.recommendations import record_product_interest
+
+
+# Set on responses by the decorators below; read by CacheHeadersMiddleware.
+CACHE_SCOPE_ATTR = "_minishop_cache_scope"
+SCOPE_PAGE = "page"
+SCOPE_SHARED = "shared"
+
+
+def has_pending_messages(request) -> bool:
+    try:
+        return len(get_messages(request)) > 0
+    except Exception:
+        return False
+
+
+def _memoize(request, key: str, func):
+    memo = request.__dict__.setdefault("_minishop_http_cache", {})
+    if key not in memo:
+        memo[key] = func()
+    return memo[key]
+
+
+def _viewer_state(request) -> str | None:
+    """
+    Token for the per-viewer bits of a rendered page (header cart count, likes).
+    Returns None when the page must not be revalidated at all.
+    """
+    return _memoize(request, "viewer", lambda: _compute_viewer_state(request))
+
+
+def _compute_viewer_state(request) -> str | None:
+    if has_pending_messages(request):
+        return None
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"u{user.pk}.{get_user_generation(user.pk)}"
+    session = getattr(request, "session", None)
+    cart = session.get("cart") if session is not None else None
+    if cart:
+        digest = hashlib.sha1(json.dumps(cart, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        return f"a.{digest[:16]}"
+    return "anon"
+
+
+def _etag(*parts) -> str:
+    return hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:32]
+
+
+def _catalog_last_modified(*extra):
+    versions = [get_catalog_version(), get_category_tree_version()]
+    stamps = [version_to_datetime(v) for v in versions]
+    stamps.extend(s for s in extra if s is not None)
+    return max(stamps)
+
+
+def _product_stamp(request, field: str, value):
+    """(id, updated_at) of the product matched by the URL, or None."""
+    return _memoize(
+        request,
+        f"product:{field}:{value}",
+        lambda: Product.objects.filter(**{field: value}).values_list("id", "updated_at").first(),
+    )
+
+
+def _mark_scope(view_func, scope: str):
+    @wraps(view_func)
+    def _wrapped(request, *args, **kwargs):
+        response = view_func(request, *args, **kwargs)
+        setattr(response, CACHE_SCOPE_ATTR, scope)
+        return response
+
+    return _wrapped
+
+
+def catalog_page_condition(view_func):
+    """
+    Conditional GET for catalog listing pages (shop, category).
+    Validators: request URL, catalog/category-tree versions and viewer state.
+    """
+
+    def _etag_func(request, *args, **kwargs):
+        viewer = _viewer_state(request)
+        if viewer is None:
+            return None
+        return _etag(
+            view_func.__name__,
+            request.get_full_path(),
+            get_catalog_version(),
+            get_category_tree_version(),
+            viewer,
+        )
+
+    def _last_modified_func(request, *args, **kwargs):
+        if _viewer_state(request) != "anon":
+            return None
+        return _catalog_last_modified()
+
+    return _mark_scope(
+        condition(etag_func=_etag_func, last_modified_func=_last_modified_func)(view_func),
+        SCOPE_PAGE,
+    )
+
+
+def product_page_condition(lookup: str):
+    """
+    Conditional GET for product detail pages. `lookup` names both the URL kwarg
+    and the Product field it matches (``"slug"`` or ``"id"`` via ``product_id``).
+    """
+    field = "id" if lookup == "product_id" else lookup
+
+    def decorator(view_func):
+        def _etag_func(request, *args, **kwargs):
+            viewer = _viewer_state(request)
+            if viewer is None:
+                return None
+            stamp = _product_stamp(request, field, kwargs.get(lookup))
+            if stamp is None:
+                return None
+            return _etag(
+                view_func.__name__,
+                request.get_full_path(),
+                stamp[1].isoformat(),
+                get_catalog_version(),
+                get_category_tree_version(),
+                viewer,
+            )
+
+        def _last_modified_func(request, *args, **kwargs):
+            if _viewer_state(request) != "anon":
+                return None
+            stamp = _product_stamp(request, field, kwargs.get(lookup))
+            if stamp is None:
+                return None
+            return _catalog_last_modified(stamp[1])
+
+        conditional = condition(etag_func=_etag_func, last_modified_func=_last_modified_func)(view_func)
+
+        @wraps(view_func)
+        def _view(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            # A 304 skips the view body, but a signed-in revisit still counts as interest.
+            if response.status_code == 304 and request.user.is_authenticated:
+                stamp = _product_stamp(request, field, kwargs.get(lookup))
+                if stamp is not None:
+                    record_product_interest(request.user, Product(pk=stamp[0]), weight=1)
+            return response
+
+        return _mark_scope(_view, SCOPE_PAGE)
+
+    return decorator
+
+
+def catalog_api_condition(view_func):
+    """
+    Conditional GET for JSON catalog APIs whose output does not depend on the
+    viewer; responses are marked shareable for every user.
+    """
+
+    def _etag_func(request, *args, **kwargs):
+        return _etag(
+            view_func.__name__,
+            request.get_full_path(),
+            get_catalog_version(),
+            get_category_tree_version(),
+        )
+
+    def _last_modified_func(request, *args, **kwargs):
+        return _catalog_last_modified()
+
+    return _mark_scope(
+        condition(etag_func=_etag_func, last_modified_func=_last_modified_func)(view_func),
+        SCOPE_SHARED,
+    )
+
+
+class CacheHeadersMiddleware:
+    """
+    Adds Cache-Control/Vary to responses produced by the condition decorators.
+
+    Anonymous pages become ``public`` (varying on Cookie) so a reverse proxy or
+    CDN can serve them; signed-in pages stay ``private`` and revalidate.
+    Must sit above SessionMiddleware so cookies set on the way out are visible.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        scope = getattr(response, CACHE_SCOPE_ATTR, None)
+        if scope is None or request.method not in ("GET", "HEAD"):
+            return response
+        if response.status_code not in (200, 304) or response.has_header("Cache-Control"):
+            return response
+
+        max_age = int(getattr(settings, "HTTP_CACHE_MAX_AGE", 60))
+        if response.cookies:
+            patch_cache_control(response, private=True, no_cache=True)
+        elif scope == SCOPE_SHARED:
+            patch_cache_control(response, public=True, max_age=max_age)
+        elif request.user.is_authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, public=True, max_age=max_age)
+            patch_vary_headers(response, ("Cookie",))
+        return response
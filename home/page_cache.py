@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+from cart.services.cart_services import get_cart_count
+from home.http_cache import has_pending_messages
+from shop.cache_versions import get_catalog_version, get_category_tree_version
+
+
+# Per-visitor "holes" rendered into cached pages and filled on every serve
+# (edge-side-include style, but done in-process).
+CART_COUNT_HOLE = "__minishop_cart_count__"
+CSRF_TOKEN_HOLE = "__minishop_csrf_token__"
+
+_FILL_ATTR = "_minishop_page_cache_fill"
+
+
+def is_filling_page_cache(request) -> bool:
+    return bool(getattr(request, _FILL_ATTR, False))
+
+
+def _page_cache_key(request) -> str:
+    url = request.build_absolute_uri()
+    digest = hashlib.sha1(f"{request.method}:{url}".encode("utf-8")).hexdigest()
+    return f"pagecache:{get_catalog_version()}:{get_category_tree_version()}:{digest}"
+
+
+def fill_holes(content: bytes, request) -> bytes:
+    return content.replace(
+        CART_COUNT_HOLE.encode("ascii"), str(get_cart_count(request)).encode("ascii")
+    ).replace(
+        CSRF_TOKEN_HOLE.encode("ascii"), get_token(request).encode("ascii")
+    )
+
+
+def _is_cacheable_request(request) -> bool:
+    if not getattr(settings, "PAGE_CACHE_ENABLED", True):
+        return False
+    if request.method not in ("GET", "HEAD"):
+        return False
+    if request.user.is_authenticated:
+        return False
+    return not has_pending_messages(request)
+
+
+def _is_cacheable_response(response) -> bool:
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and response.get("Content-Type", "").startswith("text/html")
+    )
+
+
+def anonymous_page_cache(view_func):
+    """
+    Full-page cache for anonymous visitors, keyed by URL + querystring and the
+    catalog/category versions (so product and category signals invalidate it).
+    The cart count and CSRF token are rendered as holes and filled per request.
+    """
+
+    @wraps(view_func)
+    def _wrapped(request, *args, **kwargs):
+        if not _is_cacheable_request(request):
+            return view_func(request, *args, **kwargs)
+
+        key = _page_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            response = HttpResponse(fill_holes(cached["content"], request), content_type=cached["content_type"])
+            response["X-Page-Cache"] = "hit"
+            return response
+
+        setattr(request, _FILL_ATTR, True)
+        try:
+            response = view_func(request, *args, **kwargs)
+        finally:
+            setattr(request, _FILL_ATTR, False)
+
+        if _is_cacheable_response(response):
+            cache.set(
+                key,
+                {"content": response.content, "content_type": response["Content-Type"]},
+                timeout=int(getattr(settings, "PAGE_CACHE_TIMEOUT", 300)),
+            )
+            response["X-Page-Cache"] = "miss"
+        if not response.streaming:
+            response.content = fill_holes(response.content, request)
+        return response
+
+    return _wrapped
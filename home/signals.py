@@ -0,0 +1,23 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from dashboard.models import Product
+from dashboard.signals import products_bulk_changed
+from home.assistant_bridge import invalidate_product_cards, store_product_card
+
+
+@receiver(post_save, sender=Product)
+def refresh_assistant_card(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: store_product_card(instance))
+
+
+@receiver(post_delete, sender=Product)
+def drop_assistant_card(sender, instance, **kwargs):
+    invalidate_product_cards([instance.id])
+
+
+@receiver(products_bulk_changed, sender=Product)
+def drop_assistant_cards_on_bulk_change(sender, product_ids, **kwargs):
+    invalidate_product_cards(product_ids)
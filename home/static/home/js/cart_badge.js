@@ -0,0 +1,30 @@
+(function () {
+  "use strict";
+
+  // Refreshes the header cart badge from /cart/summary.json without a page
+  // render (e.g. after the chatbot adds an item, or on back/forward cache restore).
+  function refreshCartBadge() {
+    var badge = document.querySelector("[data-cart-count]");
+    if (!badge) return Promise.resolve();
+    var url = badge.getAttribute("data-cart-summary-url");
+    if (!url) return Promise.resolve();
+
+    return fetch(url, { credentials: "same-origin", headers: { Accept: "application/json" } })
+      .then(function (res) {
+        if (!res.ok) throw new Error("Request failed");
+        return res.json();
+      })
+      .then(function (data) {
+        badge.textContent = "[" + (data.count || 0) + "]";
+      })
+      .catch(function () {
+        // keep the server-rendered count
+      });
+  }
+
+  window.refreshCartBadge = refreshCartBadge;
+
+  window.addEventListener("pageshow", function (e) {
+    if (e.persisted) refreshCartBadge();
+  });
+})();
@@ -1,3 +1,381 @@
-from django.test import TestCase
+import json
+import os
+import random
+import statistics
+import time
+from unittest import skipUnless
+
+import factory.random
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from faker import Faker
+
+from cart.models import CartItem
+from dashboard.factories import ProductFactory
+from dashboard.models import Category, Product
+from dashboard.order_factories import AddressFactory, OrderFactory
+from home.assistant_parser import parse_message
+from minishop import metrics
 
 # Create your tests here.
+
+# Optional path for a JSON report of the measurements, for trend tracking.
+PERF_RESULTS_FILE = os.getenv("PERF_RESULTS_FILE", "")
+# Wall-clock budgets are noisy on shared machines, so they only run with PERF_LATENCY=1.
+PERF_LATENCY = os.getenv("PERF_LATENCY", "").strip().lower() in ("1", "true", "yes", "on")
+PERF_RUNS = int(os.getenv("PERF_RUNS", "5") or 5)
+# Scales every latency budget, e.g. PERF_LATENCY_FACTOR=3 on slow CI machines.
+PERF_LATENCY_FACTOR = float(os.getenv("PERF_LATENCY_FACTOR", "1") or 1)
+
+# name -> (viewer, max queries, p95 budget in ms). Viewers: anon, customer, admin.
+PERF_BUDGETS = {
+    "home": [("anon", 12, 250), ("customer", 32, 300)],
+    "shop": [("anon", 6, 250), ("customer", 9, 300)],
+    "category": [("anon", 5, 250), ("customer", 7, 300)],
+    "search": [("anon", 4, 200), ("customer", 7, 200)],
+    "product": [("anon", 10, 250), ("customer", 28, 300)],
+    "product_by_id": [("anon", 10, 250)],
+    "cart": [("anon", 3, 150), ("customer", 5, 150)],
+    "checkout": [("anon", 4, 200), ("customer", 11, 250)],
+    "my_orders": [("customer", 8, 250)],
+    "user_dashboard": [("customer", 14, 250)],
+    "admin_dashboard": [("admin", 24, 300)],
+    "orders_list": [("admin", 6, 200)],
+    "orders_list_data": [("admin", 4, 300)],
+    "product_list": [("admin", 6, 200)],
+    "product_list_data": [("admin", 4, 250)],
+}
+
+
+@override_settings(
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+    QUERY_WATCH_ENABLED=True,
+    QUERY_WATCH_STRICT=True,
+    IMAGE_DERIVATIVES_LAZY=False,
+)
+class PerformanceBudgetTests(TestCase):
+    """
+    Query-count and (with PERF_LATENCY) p95 latency budgets for the public
+    and dashboard views, against a catalog seeded with the dashboard
+    factories. Every measured request starts from an empty cache, so budgets
+    cover the cold path, and runs with the N+1 detector in strict mode.
+    Results are written to PERF_RESULTS_FILE when it is set.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        random.seed(1234)
+        Faker.seed(1234)
+        factory.random.reseed_random(1234)
+
+        for name in ("Home", "Garden", "Outdoor"):
+            parent = Category.objects.create(name=name)
+            for sub in ("Basics", "Premium"):
+                Category.objects.create(name=f"{name} {sub}", parent=parent)
+        ProductFactory.create_batch(40, image="product/perf.png")
+
+        cls.customer = User.objects.create_user(username="perf-customer", password="pw-12345")
+        cls.admin = User.objects.create_superuser(username="perf-admin", password="pw-12345")
+        OrderFactory.create_batch(6, user=cls.customer, address=AddressFactory(user=cls.customer))
+        OrderFactory.create_batch(10)
+        for product in Product.objects.order_by("id")[:3]:
+            CartItem.objects.create(
+                user=cls.customer, product=product, product_name=product.name, product_price=product.price
+            )
+        cls.product = Product.objects.order_by("id").first()
+        cls.category = Category.objects.filter(parent__isnull=True).order_by("id").first()
+
+    def _url(self, name):
+        return {
+            "home": reverse("home"),
+            "shop": reverse("shop"),
+            "category": reverse("category_products", args=[self.category.slug]),
+            "search": reverse("product_search") + "?q=" + self.product.name.split()[0],
+            "product": reverse("product_public", args=[self.product.slug]),
+            "product_by_id": reverse("product_detail", args=[self.product.id]),
+            "cart": reverse("cart"),
+            "checkout": reverse("checkout"),
+            "my_orders": reverse("my_orders"),
+            "user_dashboard": reverse("user_dashboard"),
+            "admin_dashboard": reverse("admin_dashboard"),
+            "orders_list": reverse("orders_list"),
+            "orders_list_data": reverse("orders_list_data") + "?draw=1&start=0&length=10",
+            "product_list": reverse("product_list"),
+            "product_list_data": reverse("product_list_data") + "?draw=1&start=0&length=10",
+        }[name]
+
+    def _client_for(self, viewer):
+        client = self.client_class()
+        if viewer == "customer":
+            client.force_login(self.customer)
+        elif viewer == "admin":
+            client.force_login(self.admin)
+        else:
+            session = client.session
+            session["cart"] = {str(self.product.id): 1}
+            session.save()
+        return client
+
+    def _measure(self, client, url, runs):
+        queries, timings = 0, []
+        for run in range(runs + 1):
+            cache.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = client.get(url)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+            self.assertEqual(response.status_code, 200, url)
+            queries = max(queries, len(ctx.captured_queries))
+            if run:  # the first request only warms templates and URL resolvers
+                timings.append(elapsed_ms)
+        return queries, sorted(timings)
+
+    def _write_results(self, results, runs):
+        if PERF_RESULTS_FILE:
+            with open(PERF_RESULTS_FILE, "w", encoding="utf-8") as fh:
+                json.dump({"runs": runs, "results": results}, fh, indent=2)
+
+    def test_views_stay_within_query_budgets(self):
+        results = []
+        for name, cases in PERF_BUDGETS.items():
+            url = self._url(name)
+            for viewer, max_queries, _ in cases:
+                queries, _ = self._measure(self._client_for(viewer), url, runs=0)
+                results.append({"view": name, "viewer": viewer, "url": url, "queries": queries, "max_queries": max_queries})
+                with self.subTest(view=name, viewer=viewer):
+                    self.assertLessEqual(queries, max_queries, f"{name} as {viewer}: query budget")
+        if not PERF_LATENCY:
+            self._write_results(results, runs=0)
+
+    @skipUnless(PERF_LATENCY, "set PERF_LATENCY=1 to check latency budgets")
+    def test_views_stay_within_latency_budgets(self):
+        results = []
+        for name, cases in PERF_BUDGETS.items():
+            url = self._url(name)
+            for viewer, max_queries, p95_budget in cases:
+                queries, timings = self._measure(self._client_for(viewer), url, runs=PERF_RUNS)
+                p95 = timings[min(len(timings) - 1, round(0.95 * (len(timings) - 1)))]
+                budget_ms = p95_budget * PERF_LATENCY_FACTOR
+                results.append({
+                    "view": name,
+                    "viewer": viewer,
+                    "url": url,
+                    "queries": queries,
+                    "max_queries": max_queries,
+                    "p50_ms": round(statistics.median(timings), 2),
+                    "p95_ms": round(p95, 2),
+                    "p95_budget_ms": budget_ms,
+                })
+                with self.subTest(view=name, viewer=viewer):
+                    self.assertLessEqual(p95, budget_ms, f"{name} as {viewer}: p95 latency budget")
+        self._write_results(results, runs=PERF_RUNS)
+
+
+class AssistantSearchCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Audio", slug="audio")
+        self.headphones = Product.objects.create(
+            name="Studio Headphones", description="closed back", price="80.00", quantity=4, category=category
+        )
+        Product.objects.create(name="Budget Headphones", description="light", price="20.00", quantity=2, category=category)
+        self.url = reverse("assistant_api")
+
+    def _ask(self, query, **entities):
+        body = {"intent": "search", "entities": {"query": query, **entities}}
+        return self.client.post(self.url, json.dumps(body), content_type="application/json").json()
+
+    def test_repeated_turns_are_served_from_cache(self):
+        first = self._ask("headphones", max_price="100")
+        self.assertEqual([p["name"] for p in first["products"]], ["Budget Headphones", "Studio Headphones"])
+        self.assertTrue(first["products"][0]["product_url"].startswith("http://testserver/"))
+        with self.assertNumQueries(0):
+            again = self._ask("  Headphones ", max_price="100.00")
+        self.assertEqual(again["products"], first["products"])
+
+    def test_product_save_refreshes_cards_and_results(self):
+        self._ask("headphones")
+        self.headphones.name = "Studio Headphones Pro"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.headphones.save()
+        names = [p["name"] for p in self._ask("headphones")["products"]]
+        self.assertEqual(names[0], "Studio Headphones Pro")
+
+        self.headphones.quantity = 0
+        self.headphones.save()
+        names = [p["name"] for p in self._ask("headphones")["products"]]
+        self.assertEqual(names, ["Budget Headphones"])
+
+
+class AssistantIntentTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Audio", slug="audio")
+        self.speaker = Product.objects.create(
+            name="Desk Speaker", description="bluetooth", price="30.00", quantity=2, category=category
+        )
+        self.url = reverse("assistant_api")
+
+    def _post(self, body):
+        return self.client.post(self.url, json.dumps(body), content_type="application/json")
+
+    def test_batch_runs_search_add_and_show_in_order(self):
+        response = self._post({"intents": [
+            {"intent": "search", "entities": {"query": "speaker"}},
+            {"intent": "cart_add", "entities": {"product_id": self.speaker.id}},
+            {"intent": "cart_show"},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        search, add, show = response.json()["results"]
+        self.assertEqual([p["id"] for p in search["products"]], [self.speaker.id])
+        self.assertTrue(add["ok"])
+        self.assertEqual(add["cart"], {"count": 1, "total": "30.00"})
+        self.assertEqual([(i["name"], i["quantity"]) for i in show["cart"]["items"]], [("Desk Speaker", 1)])
+        self.assertEqual(response.json()["cart"], {"count": 1, "total": "30.00"})
+        self.assertEqual(self.client.session["cart"], {str(self.speaker.id): 1})
+
+    def test_cart_add_for_signed_in_user(self):
+        user = User.objects.create_user("shopper", password="pw")
+        self.client.force_login(user)
+        for _ in range(3):
+            result = self._post({"intent": "cart_add", "entities": {"product_id": str(self.speaker.id)}}).json()
+        self.assertFalse(result["ok"])
+        self.assertEqual(result["reply"], "Product Quantity Exceeded")
+        self.assertEqual(CartItem.objects.get(user=user).quantity, 2)
+        self.assertEqual(result["cart"], {"count": 1, "total": "60.00"})
+
+    def test_cart_add_reports_missing_or_unknown_product(self):
+        self.assertFalse(self._post({"intent": "cart_add"}).json()["ok"])
+        result = self._post({"intent": "cart_add", "entities": {"product_id": 999}}).json()
+        self.assertEqual((result["ok"], result["reply"]), (False, "Product Does Not Exist"))
+
+    def test_rejects_bad_batches(self):
+        self.assertEqual(self._post({"intents": []}).status_code, 400)
+        self.assertEqual(self._post({"intents": [{"intent": "cart_show"}] * 6}).status_code, 400)
+        self.assertEqual(self._post(["search"]).status_code, 400)
+
+
+class AssistantStreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Audio", slug="audio")
+        self.products = [
+            Product.objects.create(name=f"Speaker {n}", description="bluetooth", price="30.00", quantity=2, category=category)
+            for n in range(3)
+        ]
+        self.url = reverse("assistant_stream")
+
+    async def _stream(self, body):
+        response = await self.async_client.post(self.url, json.dumps(body), content_type="application/json")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        raw = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        events = []
+        for block in filter(None, raw.split("\n\n")):
+            name, data = block.split("\n")
+            events.append((name.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+        return events
+
+    async def test_reply_comes_first_then_one_event_per_card(self):
+        events = await self._stream({"intent": "search", "entities": {"query": "speaker"}})
+        self.assertEqual([name for name, _ in events], ["reply", "product", "product", "product", "done"])
+        self.assertTrue(events[0][1]["ok"])
+        self.assertEqual({data["name"] for name, data in events if name == "product"}, {p.name for p in self.products})
+        self.assertEqual(events[-1][1], {"count": 3})
+
+        again = await self._stream({"intent": "search", "entities": {"query": "speaker"}})
+        self.assertEqual(again, events)
+
+    async def test_cart_intents_are_saved_before_streaming(self):
+        product_id = self.products[0].id
+        events = await self._stream({"intent": "cart_add", "entities": {"product_id": product_id}})
+        self.assertEqual([name for name, _ in events], ["reply", "done"])
+        self.assertEqual(events[0][1]["cart"], {"count": 1, "total": "30.00"})
+        events = await self._stream({"intent": "cart_show"})
+        self.assertEqual([item["id"] for item in events[0][1]["cart"]["items"]], [product_id])
+
+    async def test_stream_is_recorded_in_metrics_once_it_ends(self):
+        metrics.registry.reset()
+        response = await self.async_client.post(
+            self.url, json.dumps({"intent": "search", "entities": {"query": "speaker"}}), content_type="application/json"
+        )
+        label = 'minishop_requests_total{route="assistant_stream",method="POST",status="2xx"} 1'
+        self.assertNotIn(label, metrics.registry.render())
+        [chunk async for chunk in response.streaming_content]
+        self.assertIn(label, metrics.registry.render())
+
+    async def test_no_match_streams_reply_only(self):
+        events = await self._stream({"intent": "search", "entities": {"query": "fridge"}})
+        self.assertEqual([name for name, _ in events], ["reply", "done"])
+        self.assertFalse(events[0][1]["ok"])
+
+
+class AssistantParserTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Laptops", slug="laptops")
+        self.laptop = Product.objects.create(
+            name="Ultrabook 13", description="light", price="450.00", quantity=3, category=category
+        )
+        Product.objects.create(name="Workstation 17", description="heavy", price="1800.00", quantity=1, category=category)
+        self.url = reverse("assistant_parse_and_search")
+
+    def _post(self, message):
+        return self.client.post(self.url, json.dumps({"message": message}), content_type="application/json")
+
+    def test_extracts_prices_categories_and_intents(self):
+        cases = {
+            "laptops under $500": ("search", {"query": "Laptops", "category": "Laptops", "max_price": "500"}),
+            "show me headphones between 20 and 50": ("search", {"query": "headphones", "min_price": "20", "max_price": "50"}),
+            "phones over 1.5k": ("search", {"query": "phones", "min_price": "1500.0"}),
+            "cheap laptop bags": ("search", {"query": "laptop bags", "category": None}),
+            "show me iphone 13 to 15 cases": ("search", {"query": "iphone 13 15 cases", "min_price": None, "max_price": None}),
+            "speakers $20-$50": ("search", {"query": "speakers", "min_price": "20", "max_price": "50"}),
+            "speakers 20-50 budget": ("search", {"query": "speakers", "min_price": "20", "max_price": "50"}),
+            "what's in my cart?": ("cart_show", {}),
+            "add product 12 to my cart": ("cart_add", {"product_id": 12}),
+        }
+        for message, (intent, expected) in cases.items():
+            with self.subTest(message=message):
+                parsed = parse_message(message)
+                self.assertEqual(parsed.intent, intent)
+                self.assertTrue(parsed.confident)
+                self.assertEqual({k: parsed.entities.get(k) for k in expected}, expected)
+        self.assertFalse(parse_message("tell me a joke").confident)
+
+    def test_gazetteer_follows_category_changes(self):
+        self.assertIsNone(parse_message("any tablets?").entities["category"])
+        Category.objects.create(name="Tablets", slug="tablets")
+        self.assertEqual(parse_message("any tablets?").entities["category"], "Tablets")
+
+    def test_parse_and_search_runs_the_intent(self):
+        body = self._post("laptops under 500").json()
+        self.assertFalse(body["fallback"])
+        self.assertEqual([p["id"] for p in body["products"]], [self.laptop.id])
+
+        body = self._post(f"add product {self.laptop.id} to my cart").json()
+        self.assertTrue(body["ok"])
+        self.assertEqual(body["cart"]["count"], 1)
+
+    def test_category_only_requests_search_the_category(self):
+        self.laptop.category.name = "Laptop"
+        self.laptop.category.save()
+        for message in ("laptops under $500", "show me laptops", "laptop under $500"):
+            with self.subTest(message=message):
+                parsed = parse_message(message)
+                self.assertEqual((parsed.entities["query"], parsed.entities["category"]), ("Laptop", "Laptop"))
+                products = self._post(message).json()["products"]
+                self.assertIn(self.laptop.id, [p["id"] for p in products])
+
+    def test_unparsed_messages_fall_back_to_the_remote_model(self):
+        body = self._post("tell me a joke").json()
+        self.assertTrue(body["fallback"])
+        self.assertEqual(body["products"], [])
+        with override_settings(ASSISTANT_REMOTE_FALLBACK=False):
+            body = self._post("tell me a joke").json()
+        self.assertFalse(body["fallback"])
+        self.assertFalse(body["ok"])
+        self.assertEqual(self.client.post(self.url, "{}", content_type="application/json").status_code, 400)
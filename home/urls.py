@@ -4,6 +4,8 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('chatbot/', views.chatbot, name='chatbot'),
     path('api/assistant/', views.assistant_api, name='assistant_api'),
+    path('api/assistant/stream/', views.assistant_stream, name='assistant_stream'),
+    path('api/assistant/parse-and-search/', views.assistant_parse_and_search, name='assistant_parse_and_search'),
     path('discover/<int:product_id>/', views.discover_product, name='discover_product'),
     path('about/', views.about, name='about'),
     path('contact/', views.contact, name='contact'),
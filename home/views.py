@@ -1,10 +1,7 @@
 from django.shortcuts import get_object_or_404, redirect, render
 from django.conf import settings
-from django.db import connection, reset_queries
+import json
 import logging
-import os
-import time
-import uuid
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from .forms import (SignUpForm, loginForm)
 from django.contrib.auth import authenticate, login as auth_login, logout as auth_logout
@@ -17,7 +14,7 @@ from django.core.cache import cache
 from django.db.models import Case, IntegerField, When
 from django.middleware.csrf import get_token
 from django.views.decorators.clickjacking import xframe_options_sameorigin
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_POST
 
 from dashboard.models import Product
@@ -29,35 +26,21 @@ from shop.recommendations import get_recommended_products, record_product_intere
 from shop.services.like_services import liked_product_ids_for_user
 # Create your views here.
 
-from .assistant_bridge import coerce_entities, search_products, validate_intent
+from asgiref.sync import sync_to_async
 
-_LOGGER = logging.getLogger(__name__)
-
-
-def _obs_enabled() -> bool:
-    return bool(getattr(settings, "DEBUG", False) or os.getenv("RECS_OBS", "").strip() == "1")
+from .assistant_bridge import (
+    MAX_INTENTS, coerce_entities, run_intent, run_intents, stream_result, stream_search, validate_intent,
+)
+from .assistant_parser import parse_message
+from .page_cache import anonymous_page_cache
 
-
-def _get_request_id(request) -> str:
-    return request.META.get("HTTP_X_REQUEST_ID") or uuid.uuid4().hex
+_LOGGER = logging.getLogger(__name__)
 
 
+@anonymous_page_cache
 def home(request):
     hero_products = list(Product.objects.order_by('-id')[:2])
-    if _obs_enabled():
-        request_id = _get_request_id(request)
-        reset_queries()
-        start = time.perf_counter()
-        recommended_products = get_recommended_products(request.user, n=5).select_related("category")
-        elapsed_ms = (time.perf_counter() - start) * 1000.0
-        _LOGGER.info(
-            "recs_obs request_id=%s view=home elapsed_ms=%.2f db_queries=%s",
-            request_id,
-            elapsed_ms,
-            len(connection.queries),
-        )
-    else:
-        recommended_products = get_recommended_products(request.user, n=5).select_related("category")
+    recommended_products = get_recommended_products(request.user, n=5).select_related("category")
     if request.user.is_authenticated:
         has_cart = CartItem.objects.filter(user=request.user).exists()
         has_watchlist = LikedProduct.objects.filter(user=request.user).exists()
@@ -307,41 +290,86 @@ def assistant_api(request):
     """
     Bridge layer endpoint.
     Input JSON: {"intent": "...", "entities": {...}}
-    Output JSON: {"reply": "...", "products": [...]}
+             or {"intents": [{"intent": "...", "entities": {...}}, ...]}
+    Output JSON: {"reply": "...", "products": [...], "cart": {...}}
+              or {"results": [...], "cart": {...}}
+    search, cart_show and cart_add (by entities.product_id) run server-side.
+    """
+    try:
+        payload = json.loads((request.body or b"{}").decode("utf-8"))
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict):
+        return JsonResponse({"reply": "Invalid request.", "products": []}, status=400)
+
+    if "intents" in payload:
+        intents = payload["intents"]
+        if not isinstance(intents, list) or not intents:
+            return JsonResponse({"reply": "Invalid request.", "results": []}, status=400)
+        if len(intents) > MAX_INTENTS:
+            return JsonResponse(
+                {"reply": f"Send at most {MAX_INTENTS} intents per request.", "results": []}, status=400
+            )
+        return JsonResponse(run_intents(request, intents))
+
+    intent = validate_intent(payload.get("intent"))
+    result = run_intent(request, intent, coerce_entities(payload.get("entities")))
+    return JsonResponse(result)
+
+
+@require_POST
+def assistant_parse_and_search(request):
+    """
+    Parses free text locally and runs the resulting intent in one request.
+    Input JSON: {"message": "..."}
+    Output JSON: the assistant_api result plus "parsed" ({"intent", "entities"})
+    and "fallback": when true nothing was run and the caller should ask the
+    remote model instead (only with ASSISTANT_REMOTE_FALLBACK).
     """
     try:
-        import json
+        payload = json.loads((request.body or b"{}").decode("utf-8"))
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict) or not isinstance(payload.get("message"), str):
+        return JsonResponse({"reply": "Invalid request.", "products": []}, status=400)
+
+    parsed = parse_message(payload["message"])
+    response = {"parsed": {"intent": parsed.intent, "entities": parsed.entities}, "fallback": False}
+    if not parsed.confident and settings.ASSISTANT_REMOTE_FALLBACK:
+        response.update(fallback=True, reply="", products=[])
+        return JsonResponse(response)
+    response.update(run_intent(request, parsed.intent, coerce_entities(parsed.entities)))
+    return JsonResponse(response)
+
 
+@require_POST
+async def assistant_stream(request):
+    """
+    Server-sent events variant of assistant_api for one intent.
+    Events: `reply` (the result without products), one `product` per card,
+    then `done`. Cart intents run before the stream starts so their session
+    changes are saved; a search is resolved inside the stream. Under ASGI
+    an open stream holds no worker thread.
+    """
+    try:
         payload = json.loads((request.body or b"{}").decode("utf-8"))
-    except Exception:
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict):
         return JsonResponse({"reply": "Invalid request.", "products": []}, status=400)
 
     intent = validate_intent(payload.get("intent"))
     entities = coerce_entities(payload.get("entities"))
+    if intent == "search" and entities.query:
+        events = stream_search(request, entities)
+    else:
+        events = stream_result(await sync_to_async(run_intent)(request, intent, entities))
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
 
-    if intent != "search":
-        return JsonResponse(
-            {
-                "reply": "Tell me what you’re looking for (for example: “laptops under $500”).",
-                "products": [],
-            }
-        )
 
-    products = search_products(request, entities=entities, limit=8)
-    if not products:
-        return JsonResponse(
-            {
-                "reply": "I couldn’t find a matching product. Try different keywords or adjust your budget.",
-                "products": [],
-            }
-        )
-
-    return JsonResponse(
-        {
-            "reply": f"Here are the products I found for “{entities.query}”:",
-            "products": products,
-        }
-    )
 def login(request):
     if request.method == 'POST':
         form = loginForm(request.POST)
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+
+REPLICA_ALIAS = "replica"
+
+_use_replica: ContextVar[bool] = ContextVar("minishop_use_replica", default=False)
+
+
+@contextmanager
+def read_replica():
+    """
+    Routes reads made inside the block (or decorated function) to the replica.
+    Only for read-heavy paths that tolerate replication lag; writes and reads
+    inside an open transaction still go to the primary.
+    """
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get() or REPLICA_ALIAS not in settings.DATABASES:
+            return None
+        if connections["default"].in_atomic_block:
+            return None
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_ALIAS
@@ -0,0 +1,492 @@
+"""
+Self-contained load generator for the storefront.
+
+Virtual users (threads) run weighted scenarios either in-process through
+Django's test Client (default; also records DB queries per request) or over
+HTTP against a running server (``--base-url``). Reports RPS, latency
+percentiles and query counts per endpoint.
+
+    python manage.py loadtest --users 8 --duration 30
+    python manage.py loadtest --compare main HEAD --duration 20
+
+This file also runs standalone against another checkout, which is how
+``--compare`` measures two git revisions with the same harness:
+
+    python minishop/loadtest.py --project /path/to/checkout --json-out a.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from unittest import mock
+
+
+LOADTEST_PASSWORD = "loadtest-password"  # also used by seed_load_data
+SEARCH_TERMS = ["lamp", "chair", "bottle", "mug", "watch", "shoes", "book", "bag", "phone", "towel"]
+
+
+# ---------------------------------------------------------------- scenarios
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    weight: int
+    func: object
+    login: bool = False
+    in_process_only: bool = False
+
+
+SCENARIOS: dict[str, Scenario] = {}
+
+
+def scenario(name: str, weight: int, *, login: bool = False, in_process_only: bool = False):
+    def register(func):
+        SCENARIOS[name] = Scenario(name, weight, func, login, in_process_only)
+        return func
+
+    return register
+
+
+@scenario("browse_home", 30)
+def _browse_home(vu):
+    vu.get("home", vu.reverse("home"))
+
+
+@scenario("search", 20)
+def _search(vu):
+    term = vu.rng.choice(SEARCH_TERMS)
+    vu.get("product_search", vu.reverse("product_search"), {"q": term})
+    vu.get("api_product_search", vu.reverse("api_product_search"), {"q": term})
+
+
+@scenario("view_product", 25)
+def _view_product(vu):
+    vu.get("product_public", vu.reverse("product_public", args=[vu.pick_product().slug]))
+
+
+@scenario("like", 5, login=True)
+def _like(vu):
+    vu.post("toggle_like", vu.reverse("toggle_like", args=[vu.pick_product().id]))
+
+
+@scenario("add_to_cart", 10)
+def _add_to_cart(vu):
+    vu.get("cart_add", vu.reverse("cart_add", args=[vu.pick_product(in_stock=True).id]))
+    vu.get("cart_summary", vu.reverse("cart_summary"))
+
+
+def _checkout(vu, method):
+    vu.get("cart_add", vu.reverse("cart_add", args=[vu.pick_product(in_stock=True).id]))
+    vu.get("checkout", vu.reverse("checkout"))
+    vu.post(f"checkout_{method.lower()}", vu.reverse("checkout"), {
+        "first_name": "Load", "last_name": "Test", "phone": "5550100", "email": "load@example.com",
+        "country": "Testland", "city": "Bench City", "postal_code": "12345", "address": "1 Main Street",
+        "terms_accepted": "on", "method": method,
+    })
+
+
+@scenario("checkout_cod", 4, login=True)
+def _checkout_cod(vu):
+    _checkout(vu, "COD")
+
+
+@scenario("checkout_stripe", 2, login=True, in_process_only=True)
+def _checkout_stripe(vu):
+    _checkout(vu, "STRIPE")
+
+
+@scenario("assistant", 4)
+def _assistant(vu):
+    vu.post_json("assistant_api", vu.reverse("assistant_api"), {
+        "intent": "search",
+        "entities": {"query": vu.rng.choice(SEARCH_TERMS), "max_price": vu.rng.choice([None, 50, 200])},
+    })
+
+
+# ---------------------------------------------------------------- transports
+
+class InProcessTransport:
+    """Runs requests through the WSGI handler in this process."""
+
+    records_queries = True
+
+    def __init__(self, user=None):
+        from django.test import Client
+
+        self.client = Client()
+        if user is not None:
+            self.client.force_login(user)
+
+    def request(self, method, url, *, params=None, data=None, json_body=None):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            if method == "GET":
+                response = self.client.get(url, params or {})
+            elif json_body is not None:
+                response = self.client.post(url, json.dumps(json_body), content_type="application/json")
+            else:
+                response = self.client.post(url, data or {})
+        return response.status_code, len(ctx.captured_queries)
+
+    def close(self):
+        from django.db import connection
+
+        connection.close()
+
+
+class HttpTransport:
+    """Drives a running server; handles the CSRF cookie/header like a browser."""
+
+    records_queries = False
+
+    def __init__(self, base_url, user=None, login_url="/login/"):
+        import requests
+
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+        if user is not None:
+            self.request("GET", login_url)
+            self.request("POST", login_url, data={"username": user.username, "password": LOADTEST_PASSWORD})
+
+    def request(self, method, url, *, params=None, data=None, json_body=None):
+        headers = {}
+        if method != "GET":
+            headers = {"X-CSRFToken": self.session.cookies.get("csrftoken", ""), "Referer": self.base_url + url}
+        response = self.session.request(
+            method, self.base_url + url, params=params, data=data, json=json_body,
+            headers=headers, allow_redirects=False, timeout=30,
+        )
+        return response.status_code, None
+
+    def close(self):
+        self.session.close()
+
+
+# ---------------------------------------------------------------- recording
+
+@dataclass
+class EndpointStats:
+    latencies_ms: list = field(default_factory=list)
+    queries: list = field(default_factory=list)
+    errors: int = 0
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints: dict[str, EndpointStats] = {}
+        self.scenario_errors: dict[str, dict] = {}
+
+    def record(self, endpoint, elapsed_ms, status, queries):
+        with self._lock:
+            stats = self.endpoints.setdefault(endpoint, EndpointStats())
+            stats.latencies_ms.append(elapsed_ms)
+            if queries is not None:
+                stats.queries.append(queries)
+            if status is None or status >= 500:
+                stats.errors += 1
+
+    def record_scenario_error(self, scenario_name, exc):
+        """A scenario that raised before or between requests (e.g. NoReverseMatch on an older revision)."""
+        with self._lock:
+            entry = self.scenario_errors.setdefault(scenario_name, {"count": 0, "error": f"{type(exc).__name__}: {exc}"})
+            entry["count"] += 1
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+class VirtualUser:
+    def __init__(self, transport, recorder, rng, catalog):
+        from django.urls import reverse
+
+        self.transport = transport
+        self.recorder = recorder
+        self.rng = rng
+        self.catalog = catalog
+        self.reverse = reverse
+
+    def pick_product(self, in_stock=False):
+        pool = self.catalog.in_stock if in_stock and self.catalog.in_stock else self.catalog.products
+        # 80/20 skew towards the head of the list (newest products).
+        head = pool[: max(1, len(pool) // 5)]
+        return self.rng.choice(head if self.rng.random() < 0.8 else pool)
+
+    def _call(self, endpoint, method, url, **kwargs):
+        started = time.perf_counter()
+        try:
+            status, queries = self.transport.request(method, url, **kwargs)
+        except Exception:
+            status, queries = None, None
+        self.recorder.record(endpoint, (time.perf_counter() - started) * 1000, status, queries)
+
+    def get(self, endpoint, url, params=None):
+        self._call(endpoint, "GET", url, params=params)
+
+    def post(self, endpoint, url, data=None):
+        self._call(endpoint, "POST", url, data=data)
+
+    def post_json(self, endpoint, url, body):
+        self._call(endpoint, "POST", url, json_body=body)
+
+
+# ---------------------------------------------------------------- runner
+
+def add_arguments(parser):
+    parser.add_argument("--users", type=int, default=8, help="Concurrent virtual users (threads).")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to run.")
+    parser.add_argument("--iterations", type=int, default=0, help="Scenarios per user; overrides --duration.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenario names.")
+    parser.add_argument("--anonymous-ratio", type=float, default=0.5, help="Share of users that stay signed out.")
+    parser.add_argument("--stripe-latency-ms", type=float, default=150.0, help="Fake Stripe API latency.")
+    parser.add_argument("--base-url", default="", help="Drive a running server instead of running in-process.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json-out", default="", help="Also write the report as JSON to this file.")
+
+
+def _load_catalog(limit=500):
+    from dashboard.models import Product
+
+    products = list(Product.objects.only("id", "slug", "quantity").order_by("-id")[:limit])
+    if not products:
+        raise RuntimeError("No products in the database; seed some first (manage.py seed_load_data).")
+    return SimpleNamespace(products=products, in_stock=[p for p in products if p.quantity > 0])
+
+
+def _load_users(count):
+    from django.contrib.auth.models import User
+
+    users = list(User.objects.filter(is_superuser=False, is_active=True).order_by("id")[:count])
+    for i in range(len(users), count):
+        user, created = User.objects.get_or_create(username=f"loadtest_vu{i}")
+        if created:
+            user.set_password(LOADTEST_PASSWORD)
+            user.save(update_fields=["password"])
+        users.append(user)
+    return users
+
+
+@contextmanager
+def fake_stripe(latency_ms):
+    """Stands in for the Stripe checkout API (in-process runs only)."""
+    import stripe
+
+    def create(**kwargs):
+        time.sleep(latency_ms / 1000)
+        session_id = f"cs_test_{uuid.uuid4().hex}"
+        return SimpleNamespace(id=session_id, url=f"https://checkout.stripe.test/pay/{session_id}")
+
+    secret = os.environ.get("STRIPE_SECRET_KEY") or "sk_test_loadtest"
+    with mock.patch.object(stripe.checkout.Session, "create", side_effect=create), \
+            mock.patch.dict(os.environ, {"STRIPE_SECRET_KEY": secret}):
+        yield
+
+
+def run_load(options):
+    in_process = not options["base_url"]
+    names = [n.strip() for n in options["scenarios"].split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"Unknown scenario(s): {', '.join(unknown)}")
+    scenarios = [SCENARIOS[n] for n in names if in_process or not SCENARIOS[n].in_process_only]
+
+    rng = random.Random(options["seed"])
+    catalog = _load_catalog()
+    vus = max(1, options["users"])
+    signed_in = vus - int(round(vus * options["anonymous_ratio"]))
+    users = _load_users(signed_in) + [None] * (vus - signed_in)
+    recorder = Recorder()
+    deadline = time.perf_counter() + options["duration"]
+
+    def worker(index, user):
+        vu_rng = random.Random(rng.random() + index)
+        transport = InProcessTransport(user) if in_process else HttpTransport(options["base_url"], user)
+        allowed = [s for s in scenarios if user is not None or not s.login]
+        vu = VirtualUser(transport, recorder, vu_rng, catalog)
+        try:
+            done = 0
+            while allowed:
+                if options["iterations"] and done >= options["iterations"]:
+                    break
+                if not options["iterations"] and time.perf_counter() >= deadline:
+                    break
+                chosen = vu_rng.choices(allowed, [s.weight for s in allowed])[0]
+                try:
+                    chosen.func(vu)
+                except Exception as exc:
+                    recorder.record_scenario_error(chosen.name, exc)
+                done += 1
+        finally:
+            transport.close()
+
+    with ExitStack() as stack:
+        if in_process:
+            stack.enter_context(fake_stripe(options["stripe_latency_ms"]))
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(i, user)) for i, user in enumerate(users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+    endpoints = {}
+    for name, stats in sorted(recorder.endpoints.items()):
+        endpoints[name] = {
+            "requests": len(stats.latencies_ms),
+            "errors": stats.errors,
+            "rps": round(len(stats.latencies_ms) / elapsed, 2),
+            "p50_ms": round(_percentile(stats.latencies_ms, 50), 2),
+            "p95_ms": round(_percentile(stats.latencies_ms, 95), 2),
+            "p99_ms": round(_percentile(stats.latencies_ms, 99), 2),
+            "max_ms": round(max(stats.latencies_ms), 2),
+            "queries_avg": round(statistics.mean(stats.queries), 2) if stats.queries else None,
+            "queries_max": max(stats.queries) if stats.queries else None,
+        }
+    total = sum(e["requests"] for e in endpoints.values())
+    return {
+        "mode": "in-process" if in_process else options["base_url"],
+        "users": vus,
+        "seconds": round(elapsed, 2),
+        "requests": total,
+        "rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "errors": sum(e["errors"] for e in endpoints.values())
+        + sum(e["count"] for e in recorder.scenario_errors.values()),
+        "endpoints": endpoints,
+        "scenario_errors": dict(sorted(recorder.scenario_errors.items())),
+    }
+
+
+def format_report(report):
+    lines = [
+        f"{report['requests']} requests in {report['seconds']}s from {report['users']} users "
+        f"({report['mode']}): {report['rps']} req/s, {report['errors']} errors",
+        f"{'endpoint':<22}{'reqs':>7}{'err':>5}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'q avg':>8}{'q max':>7}",
+    ]
+    for name, e in report["endpoints"].items():
+        q_avg = "-" if e["queries_avg"] is None else f"{e['queries_avg']:.1f}"
+        q_max = "-" if e["queries_max"] is None else str(e["queries_max"])
+        lines.append(
+            f"{name:<22}{e['requests']:>7}{e['errors']:>5}{e['rps']:>9.1f}"
+            f"{e['p50_ms']:>9.1f}{e['p95_ms']:>9.1f}{e['p99_ms']:>9.1f}{q_avg:>8}{q_max:>7}"
+        )
+    for name, e in report.get("scenario_errors", {}).items():
+        lines.append(f"scenario {name} failed {e['count']}x: {e['error']}")
+    return "\n".join(lines)
+
+
+def format_comparison(label_a, report_a, label_b, report_b):
+    def delta(a, b):
+        if a in (None, 0) or b is None:
+            return "-"
+        return f"{(b - a) / a * 100:+.0f}%"
+
+    lines = [
+        f"A={label_a}: {report_a['rps']} req/s, {report_a['errors']} errors   "
+        f"B={label_b}: {report_b['rps']} req/s, {report_b['errors']} errors   ({delta(report_a['rps'], report_b['rps'])})",
+        f"{'endpoint':<22}{'p95 A':>9}{'p95 B':>9}{'Δ':>7}{'rps A':>8}{'rps B':>8}{'q A':>7}{'q B':>7}",
+    ]
+    for name in sorted(set(report_a["endpoints"]) | set(report_b["endpoints"])):
+        a = report_a["endpoints"].get(name, {})
+        b = report_b["endpoints"].get(name, {})
+        lines.append(
+            f"{name:<22}{a.get('p95_ms', 0):>9.1f}{b.get('p95_ms', 0):>9.1f}"
+            f"{delta(a.get('p95_ms'), b.get('p95_ms')):>7}{a.get('rps', 0):>8.1f}{b.get('rps', 0):>8.1f}"
+            f"{str(a.get('queries_avg', '-')):>7}{str(b.get('queries_avg', '-')):>7}"
+        )
+    return "\n".join(lines)
+
+
+def _passthrough_args(options):
+    args = [
+        "--users", str(options["users"]), "--duration", str(options["duration"]),
+        "--iterations", str(options["iterations"]), "--scenarios", options["scenarios"],
+        "--anonymous-ratio", str(options["anonymous_ratio"]),
+        "--stripe-latency-ms", str(options["stripe_latency_ms"]), "--seed", str(options["seed"]),
+    ]
+    if options["base_url"]:
+        args += ["--base-url", options["base_url"]]
+    return args
+
+
+def compare_revisions(rev_a, rev_b, options, log=print):
+    """
+    Runs this harness against two git revisions, each in a temporary worktree
+    with its own copy of the SQLite database (migrated to that revision), so
+    both start from the same data.
+    """
+    from django.conf import settings
+
+    repo = str(settings.BASE_DIR)
+    db = settings.DATABASES["default"]
+    reports = {}
+    with tempfile.TemporaryDirectory(prefix="minishop-loadtest-") as tmp:
+        for label, rev in (("A", rev_a), ("B", rev_b)):
+            tree = os.path.join(tmp, label)
+            subprocess.run(["git", "-C", repo, "worktree", "add", "--detach", tree, rev], check=True,
+                           capture_output=True)
+            try:
+                env = dict(os.environ)
+                if db["ENGINE"].endswith("sqlite3"):
+                    copy = os.path.join(tree, "db.sqlite3")
+                    with sqlite3.connect(str(db["NAME"])) as src, sqlite3.connect(copy) as dst:
+                        src.backup(dst)
+                    env["DJANGO_SQLITE_PATH"] = copy
+                else:
+                    log(f"warning: {db['ENGINE']} is shared by both runs; writes from A are visible to B")
+                subprocess.run([sys.executable, "manage.py", "migrate", "--noinput", "-v", "0"], cwd=tree,
+                               env=env, check=True)
+                out = os.path.join(tmp, f"{label}.json")
+                log(f"running {label} ({rev}) ...")
+                subprocess.run([sys.executable, os.path.abspath(__file__), "--project", tree, "--json-out", out,
+                                *_passthrough_args(options)], cwd=tree, env=env, check=True)
+                with open(out, encoding="utf-8") as fh:
+                    reports[label] = json.load(fh)
+            finally:
+                subprocess.run(["git", "-C", repo, "worktree", "remove", "--force", tree], capture_output=True)
+                shutil.rmtree(tree, ignore_errors=True)
+    return reports["A"], reports["B"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Storefront load generator (standalone).")
+    parser.add_argument("--project", default=".", help="Checkout to load (directory containing manage.py).")
+    add_arguments(parser)
+    options = vars(parser.parse_args(argv))
+
+    project = os.path.abspath(options.pop("project"))
+    sys.path.insert(0, project)
+    os.chdir(project)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "minishop.settings")
+    import django
+
+    django.setup()
+    report = run_load(options)
+    print(format_report(report))
+    if options["json_out"]:
+        with open(options["json_out"], "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
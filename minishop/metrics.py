@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+import functools
+import ipaddress
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connections
+from django.http import FileResponse, HttpResponse, HttpResponseForbidden
+from django.utils.module_loading import import_string
+
+
+# Request duration buckets, in seconds.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED_ROUTE = "<unmatched>"
+
+_CACHE_READS = ("get", "get_many")
+_CACHE_WRITES = ("set", "set_many", "add", "get_or_set", "delete", "delete_many", "incr", "decr", "touch")
+
+
+@dataclass
+class RequestStats:
+    db_time: float = 0.0
+    db_queries: int = 0
+    cache_time: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    template_time: float = 0.0
+    # Guards against counting nested calls (get_many -> get, include -> render).
+    depth: int = 0
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("minishop_request_stats", default=None)
+
+
+def current_stats() -> RequestStats | None:
+    return _current.get()
+
+
+class _Timed:
+    """Times the outermost instrumented call; returns the stats or None."""
+
+    def __enter__(self):
+        stats = _current.get()
+        self.outer = stats is not None and stats.depth == 0
+        if stats is not None:
+            stats.depth += 1
+        self.stats = stats
+        self.started = time.perf_counter()
+        return stats if self.outer else None
+
+    def __exit__(self, *exc):
+        if self.stats is not None:
+            self.stats.depth -= 1
+        self.elapsed = time.perf_counter() - self.started
+        return False
+
+
+def _wrap_cache_method(cls, name):
+    original = getattr(cls, name)
+
+    @functools.wraps(original)
+    def wrapper(self, *args, **kwargs):
+        timer = _Timed()
+        with timer as stats:
+            result = original(self, *args, **kwargs)
+        if stats is not None:
+            stats.cache_time += timer.elapsed
+            if name == "get":
+                default = args[1] if len(args) > 1 else kwargs.get("default")
+                if result is default:
+                    stats.cache_misses += 1
+                else:
+                    stats.cache_hits += 1
+            elif name == "get_many":
+                requested = len(list(args[0] if args else kwargs.get("keys", ())))
+                stats.cache_hits += len(result)
+                stats.cache_misses += max(0, requested - len(result))
+        return result
+
+    setattr(cls, name, wrapper)
+
+
+def _wrap_template_render(cls):
+    original = cls.render
+
+    @functools.wraps(original)
+    def render(self, *args, **kwargs):
+        timer = _Timed()
+        with timer as stats:
+            result = original(self, *args, **kwargs)
+        if stats is not None:
+            stats.template_time += timer.elapsed
+        return result
+
+    cls.render = render
+
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+def install_instrumentation() -> None:
+    """Wraps the configured cache backends and the template backend once per process."""
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        from django.template.backends.django import Template
+
+        backends = {import_string(config["BACKEND"]) for config in settings.CACHES.values()}
+        for cls in backends:
+            # get_many is only counted for backends that implement it natively;
+            # BaseCache.get_many falls back to get(), which is counted itself.
+            for name in _CACHE_READS + _CACHE_WRITES:
+                if name in vars(cls) or name == "get":
+                    _wrap_cache_method(cls, name)
+        _wrap_template_render(Template)
+        _installed = True
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    stats = _current.get()
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if stats is not None:
+            stats.db_time += time.perf_counter() - started
+            stats.db_queries += 1
+
+
+class MetricsRegistry:
+    """
+    In-process aggregates rendered in the Prometheus text format. Each worker
+    process keeps its own registry, so scrape every worker (or run one).
+    """
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms: dict[tuple[str, str], list] = {}
+        self._requests: dict[tuple[str, str, str], int] = {}
+        self._totals: dict[tuple[str, str], dict[str, float]] = {}
+
+    def observe(self, route: str, method: str, status: int, duration: float, stats: RequestStats) -> None:
+        key = (route, method)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                # [per-bucket counts..., count, sum]
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if duration <= bound:
+                    histogram[i] += 1
+            histogram[-2] += 1
+            histogram[-1] += duration
+
+            status_key = (route, method, f"{status // 100}xx")
+            self._requests[status_key] = self._requests.get(status_key, 0) + 1
+
+            totals = self._totals.setdefault(key, dict.fromkeys(
+                ("db_seconds", "db_queries", "cache_seconds", "cache_hits", "cache_misses", "template_seconds"), 0
+            ))
+            totals["db_seconds"] += stats.db_time
+            totals["db_queries"] += stats.db_queries
+            totals["cache_seconds"] += stats.cache_time
+            totals["cache_hits"] += stats.cache_hits
+            totals["cache_misses"] += stats.cache_misses
+            totals["template_seconds"] += stats.template_time
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._requests.clear()
+            self._totals.clear()
+
+    def render(self) -> str:
+        with self._lock:
+            histograms = {k: list(v) for k, v in self._histograms.items()}
+            requests = dict(self._requests)
+            totals = {k: dict(v) for k, v in self._totals.items()}
+
+        lines = [
+            "# HELP minishop_request_duration_seconds Wall time per request, by route.",
+            "# TYPE minishop_request_duration_seconds histogram",
+        ]
+        for (route, method), values in sorted(histograms.items()):
+            labels = f'route="{_escape(route)}",method="{method}"'
+            for bound, count in zip(self.buckets, values):
+                lines.append(f'minishop_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'minishop_request_duration_seconds_bucket{{{labels},le="+Inf"}} {values[-2]}')
+            lines.append(f"minishop_request_duration_seconds_count{{{labels}}} {values[-2]}")
+            lines.append(f"minishop_request_duration_seconds_sum{{{labels}}} {values[-1]:.6f}")
+
+        lines += [
+            "# HELP minishop_requests_total Requests by route, method and status class.",
+            "# TYPE minishop_requests_total counter",
+        ]
+        for (route, method, status), count in sorted(requests.items()):
+            lines.append(f'minishop_requests_total{{route="{_escape(route)}",method="{method}",status="{status}"}} {count}')
+
+        for field, help_text in (
+            ("db_seconds", "Time spent in database queries."),
+            ("db_queries", "Database queries executed."),
+            ("cache_seconds", "Time spent in cache calls."),
+            ("cache_hits", "Cache reads that found a value."),
+            ("cache_misses", "Cache reads that found nothing."),
+            ("template_seconds", "Time spent rendering templates."),
+        ):
+            name = f"minishop_request_{field}_total"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for (route, method), values in sorted(totals.items()):
+                value = values[field]
+                value = f"{value:.6f}" if field.endswith("seconds") else str(int(value))
+                lines.append(f'{name}{{route="{_escape(route)}",method="{method}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+
+
+def route_label(request) -> str:
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return UNMATCHED_ROUTE
+    return match.view_name or match.route or UNMATCHED_ROUTE
+
+
+def server_timing(total: float, stats: RequestStats) -> str:
+    return ", ".join((
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.db_queries} queries"',
+        f'cache;dur={stats.cache_time * 1000:.1f};desc="{stats.cache_hits} hits, {stats.cache_misses} misses"',
+        f"tpl;dur={stats.template_time * 1000:.1f}",
+        f"total;dur={total * 1000:.1f}",
+    ))
+
+
+def _observe_when_streamed(request, response, started: float, stats: RequestStats):
+    """Wraps a streamed body so the request is recorded once its last chunk is sent."""
+    content = response.streaming_content
+
+    def observe():
+        registry.observe(route_label(request), request.method, response.status_code, time.perf_counter() - started, stats)
+
+    if response.is_async:
+        async def wrapped():
+            try:
+                async for chunk in content:
+                    yield chunk
+            finally:
+                observe()
+    else:
+        def wrapped():
+            try:
+                yield from content
+            finally:
+                observe()
+    return wrapped()
+
+
+class MetricsMiddleware:
+    """
+    Records wall time, DB time/queries (via execute_wrapper), cache hits,
+    misses and time, and template render time for every request. Adds a
+    Server-Timing header and feeds the /metrics registry. Place it first.
+
+    Streamed responses (server-sent events) are recorded when the stream
+    ends, so their duration covers every event; DB/cache/template totals
+    and Server-Timing still cover only the view call.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "METRICS_ENABLED", True)
+        if self.enabled:
+            install_instrumentation()
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_db_wrapper))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - started
+
+        if response.streaming and not isinstance(response, FileResponse):
+            response.streaming_content = _observe_when_streamed(request, response, started, stats)
+        else:
+            registry.observe(route_label(request), request.method, response.status_code, total, stats)
+        if getattr(settings, "METRICS_SERVER_TIMING", True):
+            response["Server-Timing"] = server_timing(total, stats)
+        return response
+
+
+def _client_allowed(request) -> bool:
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token:
+        return request.headers.get("Authorization", "") == f"Bearer {token}"
+    # Behind a same-host reverse proxy every client looks like loopback, so the
+    # address check is only trusted in development.
+    if not settings.DEBUG:
+        return False
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(net, strict=False) for net in settings.METRICS_ALLOWED_IPS)
+
+
+def metrics_view(request):
+    if not _client_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import html
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+
+from minishop.metrics import route_label
+
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_PARAM = "_profile"
+FOLDED_SUFFIX = ".folded"
+
+# Caps how many requests a process profiles at once; extra ones just run unprofiled.
+_slots = threading.BoundedSemaphore(int(getattr(settings, "PROFILING_MAX_CONCURRENT", 2)))
+_write_lock = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for one thread: a helper thread snapshots the target
+    thread's stack every `interval` seconds and counts collapsed stacks
+    (``root;caller;leaf``). Frames above `root_code` are dropped.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005, root_code=None):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.root_code = root_code
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="minishop-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None and frame.f_code is not self.root_code:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                self.stacks[";".join(reversed(labels))] += 1
+                self.samples += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+def profiles_dir() -> Path:
+    return Path(settings.PROFILING_DIR)
+
+
+def profile_name(route: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", route).strip("._") or "root"
+
+
+def save_profile(route: str, stacks: Counter) -> bool:
+    """Appends collapsed stacks for `route`; skipped once the file hits PROFILING_MAX_BYTES (0 = no limit)."""
+    if not stacks:
+        return False
+    path = profiles_dir() / f"{profile_name(route)}{FOLDED_SUFFIX}"
+    with _write_lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        max_bytes = getattr(settings, "PROFILING_MAX_BYTES", 0)
+        if max_bytes and path.exists() and path.stat().st_size >= max_bytes:
+            return False
+        with open(path, "a", encoding="utf-8") as fh:
+            fh.write("".join(f"{stack} {count}\n" for stack, count in stacks.items()))
+    return True
+
+
+def list_profiles() -> list[dict]:
+    directory = profiles_dir()
+    if not directory.is_dir():
+        return []
+    out = []
+    for path in sorted(directory.glob(f"*{FOLDED_SUFFIX}")):
+        stat = path.stat()
+        out.append({
+            "name": path.name[: -len(FOLDED_SUFFIX)],
+            "samples": sum(load_profile(path.name[: -len(FOLDED_SUFFIX)]).values()),
+            "size": stat.st_size,
+            "modified": stat.st_mtime,
+        })
+    return out
+
+
+def _profile_path(name: str) -> Path:
+    if name != profile_name(name):
+        raise FileNotFoundError(name)
+    return profiles_dir() / f"{name}{FOLDED_SUFFIX}"
+
+
+def load_profile(name: str) -> Counter:
+    """Merged collapsed stacks for a stored profile."""
+    stacks: Counter[str] = Counter()
+    with open(_profile_path(name), encoding="utf-8") as fh:
+        for line in fh:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if stack and count.isdigit():
+                stacks[stack] += int(count)
+    return stacks
+
+
+def delete_profile(name: str) -> None:
+    _profile_path(name).unlink(missing_ok=True)
+
+
+def folded_text(stacks: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items()))
+
+
+def flamegraph_svg(stacks: Counter, title: str = "", width: int = 1200, row: int = 16) -> str:
+    """Renders collapsed stacks as a static icicle-style flamegraph (root on top)."""
+    tree: dict = {}
+    for stack, count in stacks.items():
+        node = tree
+        for label in stack.split(";"):
+            entry = node.setdefault(label, [0, {}])
+            entry[0] += count
+            node = entry[1]
+    total = sum(entry[0] for entry in tree.values()) or 1
+    rects = []
+    depth_max = 0
+
+    def walk(node, x, depth):
+        nonlocal depth_max
+        depth_max = max(depth_max, depth)
+        for label, (count, children) in sorted(node.items()):
+            w = width * count / total
+            if w >= 0.5:
+                hue = 20 + zlib.crc32(label.encode()) % 40
+                name = html.escape(label)
+                text = name if w > 40 else ""
+                rects.append(
+                    f'<g><title>{name} ({count} samples, {count * 100 / total:.1f}%)</title>'
+                    f'<rect x="{x:.1f}" y="{(depth + 1) * row}" width="{w:.1f}" height="{row - 1}" '
+                    f'fill="hsl({hue},90%,60%)"/>'
+                    f'<text x="{x + 3:.1f}" y="{(depth + 2) * row - 4}" font-size="11" '
+                    f'textLength="{max(w - 6, 0):.0f}" lengthAdjust="spacingAndGlyphs">{text}</text></g>'
+                )
+                walk(children, x, depth + 1)
+            x += w
+
+    walk(tree, 0.0, 0)
+    height = (depth_max + 2) * row
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="monospace">'
+        f'<text x="4" y="{row - 4}" font-size="12">{html.escape(title)} - {total} samples</text>'
+        + "".join(rects)
+        + "</svg>"
+    )
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a request when a superuser asks for it (``X-Profile: 1`` header
+    or ``?_profile=1``) or, for everyone, on roughly 1 in
+    PROFILING_SAMPLE_EVERY requests. Collapsed stacks are appended per route
+    under PROFILING_DIR and browsable from the admin dashboard.
+    Must sit below AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def _wants_profile(self, request) -> bool:
+        if not getattr(settings, "PROFILING_ENABLED", False):
+            return False
+        # Only touch request.user when asked, so other requests skip the user lookup.
+        if request.headers.get(PROFILE_HEADER) == "1" or request.GET.get(PROFILE_PARAM) == "1":
+            user = getattr(request, "user", None)
+            if user is not None and user.is_superuser:
+                return True
+        every = int(getattr(settings, "PROFILING_SAMPLE_EVERY", 0))
+        return every > 0 and random.random() * every < 1
+
+    def __call__(self, request):
+        if not self._wants_profile(request) or not _slots.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            profiler = SamplingProfiler(
+                threading.get_ident(),
+                interval=settings.PROFILING_INTERVAL_MS / 1000,
+                root_code=ProfilingMiddleware.__call__.__code__,
+            )
+            started = time.perf_counter()
+            with profiler:
+                response = self.get_response(request)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        finally:
+            _slots.release()
+
+        route = route_label(request)
+        save_profile(route, profiler.stacks)
+        response[PROFILE_HEADER] = f'route="{profile_name(route)}"; samples={profiler.samples}; dur={elapsed_ms:.1f}'
+        return response
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import logging
+import re
+import time
+import traceback
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connections
+
+
+_LOGGER = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)*\s*\)")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IGNORED = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+
+class NPlusOneError(AssertionError):
+    """Raised in strict mode when one SQL template repeats within a request."""
+
+
+def sql_template(sql: str) -> str:
+    """Normalises SQL so queries differing only in parameters compare equal."""
+    sql = _STRING.sub("?", sql)
+    sql = _IN_LIST.sub("(%s, ...)", sql)
+    return _NUMBER.sub("?", sql)
+
+
+def _app_stack(limit: int = 8) -> list[str]:
+    """The innermost project frames (no Django, site-packages or this module)."""
+    base = str(settings.BASE_DIR)
+    frames = [
+        f"{frame.filename[len(base) + 1:]}:{frame.lineno} in {frame.name}"
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(base)
+        and "site-packages" not in frame.filename
+        and not frame.filename.endswith(("querywatch.py", "metrics.py"))
+    ]
+    return frames[-limit:]
+
+
+@dataclass
+class RepeatedQuery:
+    sql: str
+    count: int
+    stack: list[str]
+
+    def __str__(self):
+        where = "\n  ".join(self.stack) or "(no project frames)"
+        return f"{self.count}x {self.sql}\n  {where}"
+
+
+class QueryWatch:
+    """
+    execute_wrapper that logs slow queries and flags SQL templates executed
+    `threshold` or more times (N+1 patterns), with the project stack that
+    issued them. In strict mode the offending query raises NPlusOneError.
+    """
+
+    def __init__(self, threshold: int = 5, slow_ms: float = 0, strict: bool = False, label: str = ""):
+        self.threshold = threshold
+        self.slow_ms = slow_ms
+        self.strict = strict
+        self.label = label
+        self.counts: Counter[str] = Counter()
+        self.repeated: dict[str, RepeatedQuery] = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if self.slow_ms and elapsed_ms >= self.slow_ms:
+            _LOGGER.warning(
+                "slow query %.1fms [%s] %s\n  %s", elapsed_ms, self.label, sql, "\n  ".join(_app_stack())
+            )
+        if sql.lstrip().upper().startswith(_IGNORED):
+            return result
+
+        template = sql_template(sql)
+        self.counts[template] += 1
+        count = self.counts[template]
+        if count == self.threshold:
+            finding = self.repeated[template] = RepeatedQuery(template, count, _app_stack())
+            if self.strict:
+                raise NPlusOneError(f"Repeated query [{self.label}]: {finding}")
+            _LOGGER.warning("repeated query [%s] %s", self.label, finding)
+        elif count > self.threshold:
+            self.repeated[template].count = count
+        return result
+
+
+@contextmanager
+def watch_queries(threshold: int | None = None, slow_ms: float | None = None, strict: bool | None = None,
+                  label: str = ""):
+    """Applies a QueryWatch to every database connection inside the block."""
+    watch = QueryWatch(
+        threshold=settings.QUERY_WATCH_THRESHOLD if threshold is None else threshold,
+        slow_ms=settings.QUERY_WATCH_SLOW_MS if slow_ms is None else slow_ms,
+        strict=settings.QUERY_WATCH_STRICT if strict is None else strict,
+        label=label,
+    )
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(watch))
+        yield watch
+
+
+class QueryWatchMiddleware:
+    """Runs each request under watch_queries() when QUERY_WATCH_ENABLED is set."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, "QUERY_WATCH_ENABLED", False):
+            return self.get_response(request)
+        with watch_queries(label=f"{request.method} {request.path}"):
+            return self.get_response(request)
@@ -73,11 +73,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'minishop.metrics.MetricsMiddleware',
+    'minishop.querywatch.QueryWatchMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'home.http_cache.CacheHeadersMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'minishop.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -108,20 +112,54 @@ WSGI_APPLICATION = 'minishop.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DJANGO_DB_ENGINE picks the profile: "sqlite" (default) or "mysql".
+DB_ENGINE = (os.getenv("DJANGO_DB_ENGINE") or "sqlite").strip().lower()
+
+if DB_ENGINE == "sqlite":
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv("DJANGO_SQLITE_PATH") or BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                # Seconds a writer waits on the file lock (sqlite busy_timeout).
+                'timeout': int(os.getenv("DJANGO_SQLITE_BUSY_TIMEOUT", "20") or 20),
+                # WAL lets readers run alongside the single writer; NORMAL
+                # sync is durable across app crashes in WAL mode.
+                'init_command': "PRAGMA journal_mode=WAL;PRAGMA synchronous=NORMAL",
+                # Take the write lock at BEGIN so busy_timeout applies instead
+                # of failing on a read-to-write lock upgrade.
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
     }
-    # 'default': {
-    #     'ENGINE': 'django.db.backends.mysql',
-    #     'NAME': 'minishop_db',
-    #     'USER': 'root',
-    #     'PASSWORD': 'root',
-    #     'HOST': '127.0.0.1',
-    #     'PORT': '3306',
-    # }
-}
+elif DB_ENGINE == "mysql":
+    _mysql = {
+        'ENGINE': 'django.db.backends.mysql',
+        'NAME': os.getenv("DJANGO_DB_NAME", "minishop_db"),
+        'USER': os.getenv("DJANGO_DB_USER", "root"),
+        'PASSWORD': os.getenv("DJANGO_DB_PASSWORD", ""),
+        'HOST': os.getenv("DJANGO_DB_HOST", "127.0.0.1"),
+        'PORT': os.getenv("DJANGO_DB_PORT", "3306"),
+        # Persistent connections, checked before reuse.
+        'CONN_MAX_AGE': int(os.getenv("DJANGO_DB_CONN_MAX_AGE", "60") or 60),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'charset': 'utf8mb4'},
+    }
+    DATABASES = {'default': _mysql}
+    _replica_host = os.getenv("DJANGO_DB_REPLICA_HOST")
+    if _replica_host:
+        DATABASES['replica'] = {
+            **_mysql,
+            'HOST': _replica_host,
+            'PORT': os.getenv("DJANGO_DB_REPLICA_PORT") or _mysql['PORT'],
+            'TEST': {'MIRROR': 'default'},
+        }
+else:
+    raise RuntimeError("DJANGO_DB_ENGINE must be 'sqlite' or 'mysql'")
+
+# Sends reads inside minishop.db_routers.read_replica() to the "replica"
+# alias when one is configured (recommendations, search).
+DATABASE_ROUTERS = ['minishop.db_routers.ReplicaRouter']
 
 
 # Password validation
@@ -170,7 +208,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Optional compression
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
-# Caching (speeds up recommendations/home sections)
+# Caching (speeds up recommendations/home sections). LocMemCache is per
+# process; set DJANGO_REDIS_URL to share one cache between workers.
+REDIS_URL = os.getenv("DJANGO_REDIS_URL", "").strip()
 CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
@@ -178,6 +218,84 @@ CACHES = {
         "TIMEOUT": int(os.getenv("DJANGO_CACHE_TIMEOUT", "120") or 120),
     }
 }
+if REDIS_URL:
+    CACHES["default"].update(BACKEND="django.core.cache.backends.redis.RedisCache", LOCATION=REDIS_URL)
+
+# Sessions: "db", "cached_db" (cache in front of the DB), "cache" or
+# "signed_cookies". Compare them with `manage.py bench_sessions`. The
+# cache-backed engines need a shared cache, so the default is "cached_db"
+# only when DJANGO_REDIS_URL is set.
+SESSION_ENGINE_CHOICES = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "cache": "django.contrib.sessions.backends.cache",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+_session_backend = (os.getenv("DJANGO_SESSION_ENGINE") or ("cached_db" if REDIS_URL else "db")).strip().lower()
+if _session_backend not in SESSION_ENGINE_CHOICES:
+    raise RuntimeError(
+        f"DJANGO_SESSION_ENGINE must be one of {', '.join(SESSION_ENGINE_CHOICES)}"
+    )
+if _session_backend in ("cached_db", "cache") and not REDIS_URL:
+    raise RuntimeError(
+        f"DJANGO_SESSION_ENGINE={_session_backend} needs a shared cache: set DJANGO_REDIS_URL "
+        "(each worker would otherwise read sessions from its own LocMemCache)"
+    )
+SESSION_ENGINE = SESSION_ENGINE_CHOICES[_session_backend]
+
+# HTTP caching: max-age for anonymous catalog pages and public JSON APIs
+HTTP_CACHE_MAX_AGE = int(os.getenv("DJANGO_HTTP_CACHE_MAX_AGE", "60") or 60)
+
+# Anonymous full-page cache (cart count and CSRF token are filled per request)
+PAGE_CACHE_ENABLED = _env_bool("DJANGO_PAGE_CACHE", default=True)
+PAGE_CACHE_TIMEOUT = int(os.getenv("DJANGO_PAGE_CACHE_TIMEOUT", "300") or 300)
+
+# Per-request metrics: Server-Timing header and Prometheus text at /metrics
+METRICS_ENABLED = _env_bool("DJANGO_METRICS", default=True)
+METRICS_SERVER_TIMING = _env_bool("DJANGO_SERVER_TIMING", default=DEBUG)
+# Scrapers send "Authorization: Bearer <token>"; /metrics answers 403 without one unless DEBUG
+# is on, where these networks may scrape instead.
+METRICS_TOKEN = os.getenv("DJANGO_METRICS_TOKEN", "")
+METRICS_ALLOWED_IPS = _env_list("DJANGO_METRICS_ALLOWED_IPS", default=["127.0.0.1/32", "::1/128"])
+
+# Tracing spans (minishop.tracing): share of traces recorded, a minimum duration
+# to export, and the JSON-lines file (logged at INFO when empty)
+TRACING_SAMPLE_RATE = float(os.getenv("DJANGO_TRACING_SAMPLE_RATE", "0") or 0)
+TRACING_SLOW_MS = float(os.getenv("DJANGO_TRACING_SLOW_MS", "0") or 0)
+TRACING_EXPORT_PATH = os.getenv("DJANGO_TRACING_EXPORT_PATH", "")
+TRACING_EXPORTER = "minishop.tracing.export_jsonl"
+
+# Sampling profiler: superusers opt in per request with "X-Profile: 1" or ?_profile=1;
+# PROFILING_SAMPLE_EVERY=N also profiles ~1 in N requests (0 = never);
+# PROFILING_MAX_BYTES caps each route's stack file (0 = no limit)
+PROFILING_ENABLED = _env_bool("DJANGO_PROFILING", default=True)
+PROFILING_SAMPLE_EVERY = int(os.getenv("DJANGO_PROFILING_SAMPLE_EVERY", "0") or 0)
+PROFILING_INTERVAL_MS = float(os.getenv("DJANGO_PROFILING_INTERVAL_MS", "5") or 5)
+PROFILING_MAX_CONCURRENT = int(os.getenv("DJANGO_PROFILING_MAX_CONCURRENT", "2") or 2)
+PROFILING_MAX_BYTES = int(os.getenv("DJANGO_PROFILING_MAX_BYTES", str(5 * 1024 * 1024)) or 0)
+PROFILING_DIR = os.getenv("DJANGO_PROFILING_DIR") or BASE_DIR / "profiles"
+
+# Slow query log and N+1 detector: flags SQL templates repeated QUERY_WATCH_THRESHOLD
+# times in one request; strict mode raises instead of logging (for tests and CI)
+QUERY_WATCH_ENABLED = _env_bool("DJANGO_QUERY_WATCH", default=DEBUG)
+QUERY_WATCH_THRESHOLD = int(os.getenv("DJANGO_QUERY_WATCH_THRESHOLD", "5") or 5)
+QUERY_WATCH_SLOW_MS = float(os.getenv("DJANGO_SLOW_QUERY_MS", "200") or 0)
+QUERY_WATCH_STRICT = _env_bool("DJANGO_QUERY_WATCH_STRICT", default=False)
+
+# Image derivatives: WebP thumb/card/detail variants stored under MEDIA_ROOT/<dir>,
+# built on upload and, when lazy, on the first render that needs them
+IMAGE_DERIVATIVES_DIR = os.getenv("DJANGO_IMAGE_DERIVATIVES_DIR", "derived")
+IMAGE_DERIVATIVES_LAZY = _env_bool("DJANGO_IMAGE_DERIVATIVES_LAZY", default=True)
+IMAGE_DERIVATIVE_QUALITY = int(os.getenv("DJANGO_IMAGE_DERIVATIVE_QUALITY", "80") or 80)
+IMAGE_DERIVATIVE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Bulk product import: per-row error files offered for download after an import
+PRODUCT_IMPORT_DIR = os.getenv("DJANGO_PRODUCT_IMPORT_DIR") or BASE_DIR / "imports"
+PRODUCT_BULK_UPDATE_MAX = int(os.getenv("DJANGO_PRODUCT_BULK_UPDATE_MAX", "10000") or 10000)
+
+# Chatbot: when the local intent parser finds nothing actionable, let the
+# browser ask the remote (Pico) model instead of answering directly
+ASSISTANT_REMOTE_FALLBACK = _env_bool("DJANGO_ASSISTANT_REMOTE_FALLBACK", default=True)
 
 # Logging
 LOG_LEVEL = os.getenv("DJANGO_LOG_LEVEL", "INFO").upper()
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import functools
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from minishop.metrics import current_stats
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Span:
+    __slots__ = ("trace", "name", "span_id", "parent_id", "attrs", "started", "start_time", "duration_ms", "_queries")
+
+    def __init__(self, trace: "_Trace", name: str, parent_id: str | None, attrs: dict):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attrs = attrs
+        self.start_time = time.time()
+        self.duration_ms = 0.0
+        stats = current_stats()
+        self._queries = stats.db_queries if stats is not None else None
+        self.started = time.perf_counter()
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def finish(self, error: BaseException | None) -> None:
+        self.duration_ms = (time.perf_counter() - self.started) * 1000
+        stats = current_stats()
+        if self._queries is not None and stats is not None:
+            self.attrs["db_queries"] = stats.db_queries - self._queries
+        if error is not None:
+            self.attrs["error"] = type(error).__name__
+
+    def as_dict(self) -> dict:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start_time, 6),
+            "duration_ms": round(self.duration_ms, 3),
+            "attrs": self.attrs,
+        }
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attrs) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _Trace:
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex
+        self.spans: list[Span] = []
+
+
+# None: no trace open. NOOP_SPAN: inside an unsampled trace. Span: the open span.
+_current: ContextVar[Span | _NoopSpan | None] = ContextVar("minishop_trace_span", default=None)
+
+
+class trace:
+    """
+    Records a span around a block (``with trace("name", key=value) as span``)
+    or a function (``@trace("name")``). The outermost span starts a trace,
+    sampled at TRACING_SAMPLE_RATE; unsampled traces cost one ContextVar
+    lookup per span. Finished traces go to TRACING_EXPORTER.
+    """
+
+    __slots__ = ("name", "attrs", "span", "token")
+
+    def __init__(self, name: str, **attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.span = self.token = None
+        parent = _current.get()
+        if parent is NOOP_SPAN:
+            return NOOP_SPAN
+        if parent is None:
+            rate = getattr(settings, "TRACING_SAMPLE_RATE", 0.0)
+            if rate <= 0 or (rate < 1 and random.random() >= rate):
+                self.token = _current.set(NOOP_SPAN)
+                return NOOP_SPAN
+            span = Span(_Trace(), self.name, None, dict(self.attrs))
+        else:
+            span = Span(parent.trace, self.name, parent.span_id, dict(self.attrs))
+        self.span = span
+        self.token = _current.set(span)
+        return span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.token is not None:
+            _current.reset(self.token)
+        span = self.span
+        if span is not None:
+            span.finish(exc)
+            span.trace.spans.append(span)
+            if span.parent_id is None:
+                _export(span)
+        return False
+
+    def __call__(self, func):
+        name, attrs = self.name, self.attrs
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with trace(name, **attrs):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+
+def current_span() -> Span | _NoopSpan:
+    span = _current.get()
+    return span if span is not None else NOOP_SPAN
+
+
+_export_lock = threading.Lock()
+
+
+def export_jsonl(spans: list[dict]) -> None:
+    """Appends one JSON object per trace to TRACING_EXPORT_PATH, or logs it."""
+    line = json.dumps({"trace_id": spans[0]["trace_id"], "spans": spans}, default=str)
+    path = getattr(settings, "TRACING_EXPORT_PATH", "")
+    if not path:
+        _LOGGER.info("trace %s", line)
+        return
+    with _export_lock:
+        with open(path, "a", encoding="utf-8") as fh:
+            fh.write(line + "\n")
+
+
+def _export(root: Span) -> None:
+    if root.duration_ms < getattr(settings, "TRACING_SLOW_MS", 0):
+        return
+    # Root first, then children in start order.
+    spans = sorted(root.trace.spans, key=lambda s: (s.parent_id is not None, s.started))
+    exporter = import_string(getattr(settings, "TRACING_EXPORTER", "minishop.tracing.export_jsonl"))
+    try:
+        exporter([s.as_dict() for s in spans])
+    except Exception:
+        _LOGGER.exception("Could not export trace %s", root.trace.trace_id)
@@ -21,6 +21,7 @@ from django.conf.urls.static import static
 from django.views.generic import RedirectView
 from django.http import HttpResponse
 from shop import views as shop_views
+from minishop.metrics import metrics_view
 
 
 def favicon(request):
@@ -29,6 +30,7 @@ def favicon(request):
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('favicon.ico', favicon),
+    path('metrics', metrics_view, name='metrics'),
     # Backward-compatible redirects for template links/bookmarks
     path('index.html', RedirectView.as_view(pattern_name='home', permanent=False)),
     path('cart.html', RedirectView.as_view(pattern_name='cart', permanent=False)),
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 22:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0014_product_hot_query_indexes'),
+        ('payment', '0004_delete_cartitem'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at', 'status'], name='payment_ord_created_ae1077_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['product', 'order', 'quantity'], name='payment_ord_product_0717e2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='refund',
+            index=models.Index(fields=['created_at'], name='payment_ref_created_4a5a64_idx'),
+        ),
+    ]
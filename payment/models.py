@@ -66,6 +66,12 @@ class Order(models.Model):
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Dashboard day/week windows, optionally narrowed by status.
+            models.Index(fields=['created_at', 'status']),
+        ]
     
     def save(self, *args, **kwargs):
         if not self.order_number:
@@ -96,6 +102,12 @@ class OrderItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Co-purchase lookups: product -> orders, covered without the table.
+            models.Index(fields=['product', 'order', 'quantity']),
+        ]
+
     def save(self, *args, **kwargs):
         self.total = self.price * self.quantity
         super().save(*args, **kwargs)
@@ -137,6 +149,11 @@ class Refund(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     notes = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+
     def save(self, *args, **kwargs):
         if self.is_completed and not self.processed_at:
             self.processed_at = timezone.now()
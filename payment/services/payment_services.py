@@ -13,7 +13,7 @@ import os
 import json
 import stripe
 from cart.models import CartItem
-from cart.services.cart_services import get_user_cart
+from cart.services.cart_services import get_session_cart, get_user_cart
 from decimal import Decimal, ROUND_HALF_UP
 import logging
 
@@ -37,17 +37,17 @@ class CheckoutServices:
                 db_cart_items.delete()
 
         if not used_db_cart:
-            cart = request.session.get('cart') or {}
-            for _item_id, item in cart.items():
-                try:
-                    product = Product.objects.get(id=item['id'])
-                except Product.DoesNotExist:
-                    raise Product.DoesNotExist(f"Product does not exist. Product ID: {item['id']}")
+            cart = get_session_cart(request)
+            products = Product.objects.in_bulk(cart.keys())
+            for product_id, quantity in cart.items():
+                product = products.get(product_id)
+                if product is None:
+                    raise Product.DoesNotExist(f"Product does not exist. Product ID: {product_id}")
                 OrderItem.objects.create(
                     order=order,
                     product=product,
-                    quantity=int(item['quantity']),
-                    price=Decimal(str(item['price'])),
+                    quantity=quantity,
+                    price=product.price,
                 )
             request.session.pop('cart', None)  # Remove cart from session
             request.session.modified = True  # Mark session as changed for saving
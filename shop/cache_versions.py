@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.cache import cache
+
+
+# Version counters are microsecond timestamps, so a version doubles as a
+# "last changed" time and a re-initialised counter never goes backwards.
+# Keys use the cache's default timeout, so a process that missed a bump (the
+# default LocMemCache is per-process) converges within one timeout.
+CATALOG_VERSION_KEY = "ver:catalog"
+CATEGORY_TREE_VERSION_KEY = "ver:category_tree"
+
+
+def _user_version_key(user_id: int) -> str:
+    return f"ver:u:{user_id}"
+
+
+def _now_version() -> int:
+    return time.time_ns() // 1000
+
+
+def _get_version(key: str) -> int:
+    value = cache.get(key)
+    if isinstance(value, int):
+        return value
+    value = _now_version()
+    if not cache.add(key, value):
+        current = cache.get(key)
+        if isinstance(current, int):
+            return current
+        cache.set(key, value)
+    return value
+
+
+def _bump_version(key: str) -> int:
+    current = cache.get(key)
+    value = _now_version()
+    if isinstance(current, int) and current >= value:
+        value = current + 1
+    cache.set(key, value)
+    return value
+
+
+def get_catalog_version() -> int:
+    return _get_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version() -> int:
+    return _bump_version(CATALOG_VERSION_KEY)
+
+
+def get_category_tree_version() -> int:
+    return _get_version(CATEGORY_TREE_VERSION_KEY)
+
+
+def bump_category_tree_version() -> int:
+    return _bump_version(CATEGORY_TREE_VERSION_KEY)
+
+
+def get_user_generation(user_id: int) -> int:
+    return _get_version(_user_version_key(user_id))
+
+
+def bump_user_generation(user_id: int) -> int:
+    return _bump_version(_user_version_key(user_id))
+
+
+def version_to_datetime(version: int) -> datetime:
+    return datetime.fromtimestamp(version / 1_000_000, tz=dt_timezone.utc)
@@ -2,8 +2,11 @@ from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from cart.models import CartItem
+from dashboard.models import Category, Product
+from dashboard.signals import products_bulk_changed
+from shop.cache_versions import bump_catalog_version, bump_category_tree_version
 from shop.models import LikedProduct, ProductInterest
-from shop.recommendations import _invalidate_user_recs_cache
+from shop.recommendations import _invalidate_user_recs_cache, invalidate_anonymous_recs_cache
 
 
 @receiver(post_save, sender=ProductInterest)
@@ -22,3 +25,24 @@ def invalidate_recs_on_cart_change(sender, instance, **kwargs):
 @receiver(post_delete, sender=LikedProduct)
 def invalidate_recs_on_like_change(sender, instance, **kwargs):
     _invalidate_user_recs_cache(instance.user_id)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def bump_catalog_version_on_product_change(sender, instance, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_versions_on_category_change(sender, instance, **kwargs):
+    bump_category_tree_version()
+    bump_catalog_version()
+
+
+@receiver(products_bulk_changed, sender=Product)
+def invalidate_catalog_on_bulk_change(sender, product_ids, fields, **kwargs):
+    # One coalesced bump for listings, page caches and search ETags; per-user
+    # recommendations already drop out-of-stock products when read.
+    bump_catalog_version()
+    invalidate_anonymous_recs_cache()
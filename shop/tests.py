@@ -1,7 +1,19 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.cache import cache
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
 
 from dashboard.models import Category, Product
+from home.page_cache import CART_COUNT_HOLE, CSRF_TOKEN_HOLE
+from minishop import metrics
+from minishop.db_routers import ReplicaRouter, read_replica
+from shop.models import LikedProduct, ProductInterest
 from shop.recommendations import get_recommended_products
 
 # Create your tests here.
@@ -35,3 +47,212 @@ class RecommendationDiversityTests(TestCase):
         self.assertTrue(len(cats) <= 5)
         self.assertTrue(cats.count(cat_a.id) <= 2)
         self.assertTrue(cats.count(cat_b.id) <= 2)
+
+
+@override_settings(IMAGE_DERIVATIVES_LAZY=False)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name="Cat C", slug="cat-c")
+        self.product = Product.objects.create(
+            name="Lamp",
+            slug="lamp",
+            description="desk lamp",
+            price="25.00",
+            quantity=3,
+            image="product/lamp.png",
+            category=self.category,
+        )
+
+    def test_product_search_api_answers_304_until_catalog_changes(self):
+        url = reverse("api_product_search") + "?q=lamp"
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn("public", first["Cache-Control"])
+        etag = first["ETag"]
+
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+
+        self.product.price = "30.00"
+        self.product.save()
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], etag)
+
+    def test_anonymous_product_page_is_public_and_varies_on_cookie(self):
+        response = self.client.get(reverse("product_public", kwargs={"slug": "lamp"}))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Cookie", response["Vary"])
+        self.assertTrue(response.has_header("Last-Modified"))
+
+        cached = self.client.get(
+            reverse("product_public", kwargs={"slug": "lamp"}),
+            HTTP_IF_NONE_MATCH=response["ETag"],
+        )
+        self.assertEqual(cached.status_code, 304)
+
+    def test_signed_in_pages_stay_private(self):
+        user = User.objects.create_user(username="shopper", password="pw-12345")
+        self.client.force_login(user)
+        response = self.client.get(reverse("shop"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("private", response["Cache-Control"])
+
+    def test_revalidated_product_page_still_records_interest(self):
+        user = User.objects.create_user(username="revisit", password="pw-12345")
+        self.client.force_login(user)
+        url = reverse("product_public", kwargs={"slug": "lamp"})
+        # Keep the viewer generation steady so the second request can revalidate.
+        with mock.patch("shop.views.record_product_interest"):
+            etag = self.client.get(url)["ETag"]
+
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(ProductInterest.objects.get(user=user, product=self.product).score, 1)
+
+
+@override_settings(IMAGE_DERIVATIVES_LAZY=False)
+class AnonymousPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name="Cat P", slug="cat-p")
+        self.product = Product.objects.create(
+            name="Mug",
+            slug="mug",
+            description="coffee mug",
+            price="8.00",
+            quantity=5,
+            category=self.category,
+            image="product/mug.png",
+        )
+
+    def test_second_anonymous_request_is_served_from_cache_with_holes_filled(self):
+        url = reverse("shop")
+        first = self.client.get(url)
+        self.assertEqual(first["X-Page-Cache"], "miss")
+
+        self.client.get(reverse("cart_add", kwargs={"product_id": self.product.id}), follow=True)
+        second = self.client.get(url)
+        self.assertEqual(second["X-Page-Cache"], "hit")
+        body = second.content.decode()
+        self.assertIn("[1]", body)
+        self.assertNotIn(CART_COUNT_HOLE, body)
+        self.assertNotIn(CSRF_TOKEN_HOLE, body)
+
+    def test_product_change_invalidates_cached_pages(self):
+        url = reverse("product_detail", kwargs={"product_id": self.product.id})
+        self.client.get(url)
+        self.product.name = "Big Mug"
+        self.product.save()
+        response = self.client.get(url)
+        self.assertEqual(response["X-Page-Cache"], "miss")
+        self.assertContains(response, "Big Mug")
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    def test_reads_go_to_replica_only_inside_block(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Product))
+        with read_replica():
+            self.assertIsNone(router.db_for_read(Product))
+        databases = {**settings.DATABASES, "replica": settings.DATABASES["default"]}
+        with override_settings(DATABASES=databases):
+            with read_replica():
+                self.assertEqual(router.db_for_read(Product), "replica")
+                self.assertIsNone(router.db_for_write(Product))
+            self.assertIsNone(router.db_for_read(Product))
+            self.assertFalse(router.allow_migrate("replica", "shop"))
+
+    def test_recommendations_queryset_is_pinned_to_replica(self):
+        cache.set("recs:anon:2", [1, 2])
+        self.addCleanup(cache.delete, "recs:anon:2")
+        databases = {**settings.DATABASES, "replica": settings.DATABASES["default"]}
+        with override_settings(DATABASES=databases):
+            self.assertEqual(get_recommended_products(None, n=2).db, "replica")
+        self.assertEqual(get_recommended_products(None, n=2).db, "default")
+
+
+@override_settings(METRICS_SERVER_TIMING=True, IMAGE_DERIVATIVES_LAZY=False)
+class MetricsMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.registry.reset()
+        self.product = Product.objects.create(
+            name="Kettle",
+            slug="kettle",
+            description="electric kettle",
+            price="30.00",
+            quantity=4,
+            category=Category.objects.create(name="Cat M", slug="cat-m"),
+            image="product/kettle.png",
+        )
+
+    def test_server_timing_reports_db_cache_and_template_time(self):
+        response = self.client.get(reverse("product_public", args=[self.product.slug]))
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertRegex(timing, r'cache;dur=[\d.]+;desc="\d+ hits, [1-9]\d* misses"')
+        self.assertRegex(timing, r"tpl;dur=[\d.]+, total;dur=[\d.]+")
+
+    @override_settings(METRICS_TOKEN="scrape-me")
+    def test_metrics_endpoint_exposes_per_route_histogram(self):
+        self.client.get(reverse("product_public", args=[self.product.slug]))
+        self.client.get(reverse("product_public", args=[self.product.slug]))
+        body = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer scrape-me").content.decode()
+        self.assertIn(
+            'minishop_request_duration_seconds_count{route="product_public",method="GET"} 2', body
+        )
+        self.assertIn('minishop_requests_total{route="product_public",method="GET",status="2xx"} 2', body)
+        self.assertRegex(body, r'minishop_request_cache_hits_total\{route="product_public",method="GET"\} [1-9]')
+
+    @override_settings(METRICS_TOKEN="scrape-me")
+    def test_metrics_endpoint_requires_token_when_configured(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer scrape-me")
+        self.assertEqual(response.status_code, 200)
+
+    def test_metrics_endpoint_refuses_loopback_without_token_outside_debug(self):
+        self.assertEqual(self.client.get(reverse("metrics"), REMOTE_ADDR="127.0.0.1").status_code, 403)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.client.get(reverse("metrics"), REMOTE_ADDR="127.0.0.1").status_code, 200)
+
+
+class RecommendationTracingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="tracer", password="pw-12345")
+        category = Category.objects.create(name="Cat T", slug="cat-t")
+        for i in range(6):
+            product = Product.objects.create(
+                name=f"T{i}", slug=f"t-{i}", description="t", price="5.00", quantity=5, category=category
+            )
+        LikedProduct.objects.create(user=self.user, product=product)
+        self.export_path = os.path.join(tempfile.mkdtemp(), "traces.jsonl")
+
+    def _traces(self):
+        if not os.path.exists(self.export_path):
+            return []
+        with open(self.export_path, encoding="utf-8") as fh:
+            return [json.loads(line) for line in fh]
+
+    def test_sampled_trace_records_a_span_per_stage(self):
+        with override_settings(TRACING_SAMPLE_RATE=1.0, TRACING_EXPORT_PATH=self.export_path):
+            list(get_recommended_products(self.user, n=3))
+        [trace] = self._traces()
+        root, *children = trace["spans"]
+        self.assertEqual(root["name"], "recommendations")
+        self.assertEqual(root["attrs"]["cache"], "miss")
+        self.assertEqual(root["attrs"]["user_id"], self.user.id)
+        self.assertTrue(all(span["parent_id"] == root["span_id"] for span in children))
+        self.assertLessEqual(
+            {"recs.interest_load", "recs.signal_load", "recs.seed_scoring", "recs.similar_users",
+             "recs.co_purchase", "recs.category_pool", "recs.fallback", "recs.diversity"},
+            {span["name"] for span in children},
+        )
+
+    def test_unsampled_and_fast_traces_are_not_exported(self):
+        with override_settings(TRACING_SAMPLE_RATE=0, TRACING_EXPORT_PATH=self.export_path):
+            get_recommended_products(self.user, n=3)
+        with override_settings(TRACING_SAMPLE_RATE=1.0, TRACING_SLOW_MS=60_000, TRACING_EXPORT_PATH=self.export_path):
+            get_recommended_products(self.user, n=3)
+        self.assertEqual(self._traces(), [])
@@ -1,33 +1,52 @@
 from django.shortcuts import get_object_or_404, redirect, render
 from django.conf import settings
-from django.db import connection, reset_queries
 import logging
-import os
-import time
-import uuid
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
 from django.urls import reverse
 from decimal import Decimal, InvalidOperation
 from dashboard.models import ( Category, Product)
-from django.db.models import Case, Count, IntegerField, Q, Value, When
+from django.db.models import Case, Count, IntegerField, Prefetch, Q, Value, When
 from django.core.paginator import Paginator
 from shop.services.shop_services import ShopServices
 from shop.recommendations import get_recommended_products, record_product_interest
 from shop.services.like_services import liked_product_ids_for_user
+from dashboard.services.image_services import variant_url
 from shop.models import LikedProduct
+from home.http_cache import catalog_api_condition, catalog_page_condition, product_page_condition
+from home.page_cache import anonymous_page_cache
+from minishop.db_routers import read_replica
 # Create your views here.
 
 _LOGGER = logging.getLogger(__name__)
 
 
-def _obs_enabled() -> bool:
-    return bool(getattr(settings, "DEBUG", False) or os.getenv("RECS_OBS", "").strip() == "1")
+def _category_tree_data():
+    subcategories = Prefetch('subcategories', queryset=Category.objects.order_by('-id'))
+    category = Category.objects.filter(parent__isnull=True).prefetch_related(subcategories).order_by('-id')
+    category_data = []
 
+    for cat in category:
+        sub_categories = cat.subcategories.all()
+        category_data.append({
+            'id': cat.id,
+            'name': cat.name,
+            'slug': cat.slug,
+            'parent': cat.parent_id,
+            'sub_count': len(sub_categories),
+            'sub_categories': [
+                {
+                    'id': sub_cat.id,
+                    'name': sub_cat.name,
+                    'slug': sub_cat.slug,
+                    'parent': sub_cat.parent_id,
+                }
+                for sub_cat in sub_categories
+            ],
+        })
+    return category_data
 
-def _get_request_id(request) -> str:
-    return request.META.get("HTTP_X_REQUEST_ID") or uuid.uuid4().hex
 
 def _parse_decimal_param(value):
     value = (value or "").strip()
@@ -39,6 +58,8 @@ def _parse_decimal_param(value):
         return None
 
 
+@catalog_page_condition
+@anonymous_page_cache
 def shop(request):
     highlight_id = request.GET.get('highlight')
     highlight_product_id = int(highlight_id) if (highlight_id and highlight_id.isdigit()) else None
@@ -68,28 +89,7 @@ def shop(request):
     qs = request.GET.copy()
     qs.pop("page", None)
     querystring = qs.urlencode()
-    category = Category.objects.filter(parent__isnull=True).prefetch_related('subcategories').order_by('-id')
-    category_data = []
-
-    for cat in category:
-        cat_data = {
-            'id': cat.id,
-            'name': cat.name,
-            'slug': cat.slug,
-            'parent': cat.parent.id if cat.parent else None,
-            'sub_count': cat.subcategories.count(),
-            'sub_categories': []
-        }
-
-        for sub_cat in cat.subcategories.all().order_by('-id'):
-            cat_data['sub_categories'].append({
-                'id': sub_cat.id,
-                'name': sub_cat.name,
-                'slug': sub_cat.slug,
-                'parent': sub_cat.parent.id if sub_cat.parent else None
-            })
-
-        category_data.append(cat_data)
+    category_data = _category_tree_data()
     context={
         'category_data':category_data,
         'products':products,
@@ -103,6 +103,8 @@ def product_detail_by_slug(request, slug):
     product = get_object_or_404(Product.objects.select_related("category"), slug=slug)
     return redirect("product_detail", product_id=product.id)
 
+@product_page_condition("slug")
+@anonymous_page_cache
 def product_public(request, slug):
     """
     Public product detail URL: /product/<slug>/
@@ -110,28 +112,11 @@ def product_public(request, slug):
     """
     product = get_object_or_404(Product.objects.select_related("category"), slug=slug)
     record_product_interest(request.user, product, weight=1)
-    if _obs_enabled():
-        request_id = _get_request_id(request)
-        reset_queries()
-        start = time.perf_counter()
-        recommended_products = (
-            get_recommended_products(request.user, n=5)
-            .exclude(id=product.id)
-            .select_related("category")
-        )
-        elapsed_ms = (time.perf_counter() - start) * 1000.0
-        _LOGGER.info(
-            "recs_obs request_id=%s view=product_public elapsed_ms=%.2f db_queries=%s",
-            request_id,
-            elapsed_ms,
-            len(connection.queries),
-        )
-    else:
-        recommended_products = (
-            get_recommended_products(request.user, n=5)
-            .exclude(id=product.id)
-            .select_related("category")
-        )
+    recommended_products = (
+        get_recommended_products(request.user, n=5)
+        .exclude(id=product.id)
+        .select_related("category")
+    )
     context = {
         "product": product,
         "recommended_products": recommended_products,
@@ -142,31 +127,16 @@ def product_public(request, slug):
     return render(request, "shop/product_detail.html", context)
 
 
+@product_page_condition("product_id")
+@anonymous_page_cache
 def product_detail(request, product_id):
     product = get_object_or_404(Product.objects.select_related("category"), id=product_id)
     record_product_interest(request.user, product, weight=1)
-    if _obs_enabled():
-        request_id = _get_request_id(request)
-        reset_queries()
-        start = time.perf_counter()
-        recommended_products = (
-            get_recommended_products(request.user, n=5)
-            .exclude(id=product.id)
-            .select_related("category")
-        )
-        elapsed_ms = (time.perf_counter() - start) * 1000.0
-        _LOGGER.info(
-            "recs_obs request_id=%s view=product_detail elapsed_ms=%.2f db_queries=%s",
-            request_id,
-            elapsed_ms,
-            len(connection.queries),
-        )
-    else:
-        recommended_products = (
-            get_recommended_products(request.user, n=5)
-            .exclude(id=product.id)
-            .select_related("category")
-        )
+    recommended_products = (
+        get_recommended_products(request.user, n=5)
+        .exclude(id=product.id)
+        .select_related("category")
+    )
     context = {
         'product': product,
         'recommended_products': recommended_products,
@@ -176,6 +146,8 @@ def product_detail(request, product_id):
     }
     return render(request, 'shop/product_detail.html', context)
 
+@catalog_page_condition
+@anonymous_page_cache
 def category_products(request, slug):
     shop_service = ShopServices()
     success, message, products = shop_service.get_category_products(request, slug)
@@ -184,28 +156,7 @@ def category_products(request, slug):
     qs = request.GET.copy()
     qs.pop("page", None)
     querystring = qs.urlencode()
-    category = Category.objects.filter(parent__isnull=True).prefetch_related('subcategories').order_by('-id')
-    category_data = []
-
-    for cat in category:
-        cat_data = {
-            'id': cat.id,
-            'name': cat.name,
-            'slug': cat.slug,
-            'parent': cat.parent.id if cat.parent else None,
-            'sub_count': cat.subcategories.count(),
-            'sub_categories': []
-        }
-
-        for sub_cat in cat.subcategories.all().order_by('-id'):
-            cat_data['sub_categories'].append({
-                'id': sub_cat.id,
-                'name': sub_cat.name,
-                'slug': sub_cat.slug,
-                'parent': sub_cat.parent.id if sub_cat.parent else None
-            })
-
-        category_data.append(cat_data)
+    category_data = _category_tree_data()
     context={
         'products':products,
         'category_data':category_data,
@@ -238,16 +189,19 @@ def product_search(request):
 
     paginator = Paginator(products_qs, 10)
     page_number = request.GET.get("page")
-    products = paginator.get_page(page_number)
+    with read_replica():
+        products = paginator.get_page(page_number)
+        product_ids = [p.id for p in products]
 
     context = {
         "query": query,
         "products": products,
-        "liked_product_ids": liked_product_ids_for_user(request.user, [p.id for p in products] if products else []),
+        "liked_product_ids": liked_product_ids_for_user(request.user, product_ids),
     }
     return render(request, "shop/search_results.html", context)
 
 
+@catalog_api_condition
 def api_product_search(request):
     """
     JSON API for product suggestions.
@@ -292,11 +246,12 @@ def api_product_search(request):
         if max_price is not None:
             products_qs = products_qs.filter(price__lte=max_price)
 
-    products = list(products_qs[:5])
+    with read_replica():
+        products = list(products_qs[:5])
 
     results = []
     for product in products:
-        image_url = product.image.url if getattr(product, "image", None) else ""
+        image_url = variant_url(product.image, "card") if getattr(product, "image", None) else ""
         if image_url:
             image_url = request.build_absolute_uri(image_url)
 